@@ -0,0 +1,219 @@
+"""ASGI frontend to the plucode module.
+
+Serves the Dialogflow webhook of main.google() from an event loop, so a
+single instance answers many concurrent conversations. Other paths are
+served by the Flask application when uvicorn is installed.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import time
+
+try:
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+except ImportError:
+    # Only the webhook is served without uvicorn
+    WSGIMiddleware = None
+
+import main
+from lib import plucode
+
+_MAX_BODY_SIZE = 1024 * 1024
+"""Integer maximum number of bytes in a request body."""
+
+_API_KEY_HEADER = main._API_KEY_HEADER.lower().encode('latin-1')
+"""Bytes lowercase name of the request header holding an API key."""
+
+_FALLBACK_APP = None
+"""ASGI application serving paths other than the webhook, or None."""
+if WSGIMiddleware is not None:
+    _FALLBACK_APP = WSGIMiddleware(main.app)
+
+def _parse_authorization(value):
+    """Return the credentials of an HTTP basic Authorization header.
+
+    Args:
+        value: Bytes Authorization header value, or None without one.
+    Returns:
+        Tuple of (string username, string password), both None if value is
+        not valid HTTP basic authentication.
+    """
+    if value is None:
+        return (None, None)
+    scheme, _, credentials = value.partition(b' ')
+    if scheme.lower() != b'basic':
+        return (None, None)
+    try:
+        decoded = base64.b64decode(credentials.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        return (None, None)
+    username, separator, password = decoded.decode(
+        'utf-8', 'replace').partition(':')
+    if len(separator) <= 0:
+        return (None, None)
+    return (username, password)
+
+def _parse_json(headers, body):
+    """Return the decoded JSON request body like flask.Request.get_json.
+
+    Args:
+        headers: Dictionary mapping a lowercase bytes header name to its
+            bytes value.
+        body: Bytes request body.
+    Returns:
+        Decoded JSON body, or None when the content type does not indicate
+        JSON or parsing failed.
+    """
+    mimetype = headers.get(b'content-type', b'').split(b';')[0].strip().lower()
+    if (mimetype != b'application/json') and (not mimetype.endswith(b'+json')):
+        return None
+    try:
+        return json.loads(body.decode('utf-8'))
+    except ValueError:
+        return None
+
+async def _read_body(receive):
+    """Return the request body, or None if it is too large.
+
+    Args:
+        receive: ASGI receive awaitable callable.
+    Returns:
+        Bytes request body, or None if it exceeds _MAX_BODY_SIZE.
+    """
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return b''
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > _MAX_BODY_SIZE:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+async def _send_response(send, status, body, content_type, headers=()):
+    """Send a complete HTTP response.
+
+    Args:
+        send: ASGI send awaitable callable.
+        status: Integer HTTP status code.
+        body: Bytes response body.
+        content_type: String content type of body.
+        headers: Optional iterable of additional (bytes name, bytes value)
+            header tuples.
+    """
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('latin-1'))
+        ] + list(headers)
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _send_error(send, status, headers=()):
+    """Send an HTTP error response with an empty body.
+
+    Args:
+        send: ASGI send awaitable callable.
+        status: Integer HTTP status code.
+        headers: Optional iterable of additional (bytes name, bytes value)
+            header tuples.
+    """
+    await _send_response(send, status, b'', 'text/plain; charset=utf-8',
+                         headers)
+
+async def _lifespan(receive, send):
+    """Acknowledge the ASGI lifespan startup and shutdown events.
+
+    Args:
+        receive: ASGI receive awaitable callable.
+        send: ASGI send awaitable callable.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def _get_catalog():
+    """Return the current catalog after checking its file for changes.
+
+    Reloading parses the catalog file, so it runs in a thread instead of
+    holding up the other requests of the event loop.
+
+    Returns:
+        Catalog from plucode.get_catalog().
+    """
+    watcher = main._WATCHER
+    if (watcher is not None) and watcher.due():
+        await asyncio.get_running_loop().run_in_executor(None, watcher.check)
+    return plucode.get_catalog()
+
+async def google(scope, receive, send):
+    """Look up a PLU code or find a PLU code by description.
+
+    Args:
+        scope: ASGI HTTP connection scope.
+        receive: ASGI receive awaitable callable.
+        send: ASGI send awaitable callable.
+    """
+    start = time.perf_counter()
+    headers = {name.lower(): value for name, value in scope['headers']}
+    address = None
+    if scope.get('client') is not None:
+        address = scope['client'][0]
+    api_key = headers.get(_API_KEY_HEADER)
+    if api_key is not None:
+        api_key = api_key.decode('latin-1')
+    username, password = _parse_authorization(headers.get(b'authorization'))
+    if not main._is_allowed(address, username, password, api_key):
+        return await _send_error(send, 401, [
+            (b'www-authenticate', b'Basic realm="Authentication Required"')])
+
+    if scope['method'] != 'POST':
+        return await _send_error(send, 405, [(b'allow', b'POST')])
+
+    authorized = time.perf_counter()
+    body = await _read_body(receive)
+    if body is None:
+        return await _send_error(send, 413)
+    request_json = _parse_json(headers, body)
+    parsed = time.perf_counter()
+    # Lookups only take microseconds, so they run on the event loop
+    catalog = await _get_catalog()
+    text, choices, outcome = main._answer(request_json, catalog)
+    answered = time.perf_counter()
+    body = main._google_response_body(text, choices=choices)
+    encoded = time.perf_counter()
+    main._get_metrics().record(
+        outcome, [authorized - start, parsed - authorized, answered - parsed,
+                  encoded - answered, encoded - start])
+    await _send_response(send, 200, body, 'application/json; charset=utf-8')
+
+async def app(scope, receive, send):
+    """ASGI application serving the webhook at the root path.
+
+    Args:
+        scope: ASGI connection scope.
+        receive: ASGI receive awaitable callable.
+        send: ASGI send awaitable callable.
+    """
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise ValueError('Unsupported ASGI scope type {0}.'.format(
+            scope['type']))
+    if scope['path'] == '/':
+        return await google(scope, receive, send)
+    if _FALLBACK_APP is not None:
+        return await _FALLBACK_APP(scope, receive, send)
+    await _send_error(send, 404)
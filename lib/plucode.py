@@ -1,9 +1,21 @@
 """Look up a PLU code or find a PLU code by description."""
 
+import array
+import bisect
+import collections
 import csv
+import hashlib
+import heapq
+import io
 import json
+import mmap
 import os.path
 import re
+import struct
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
 _CODE_CARRIER_PHRASES = [
@@ -59,6 +71,134 @@ _DESCRIPTION_EXAMPLES = [
 _KEYWORD_PATTERN = re.compile(r"""(?P<keyword>[\w']+)""", re.VERBOSE)
 """Regular expression pattern to pull out keywords."""
 
+_NON_DIGIT_PATTERN = re.compile(r'\D')
+"""Regular expression pattern matching non-digit characters."""
+
+_SPOKEN_NUMBERS = {
+    'zero': 0,
+    'oh': 0,
+    'o': 0,
+    'one': 1,
+    'two': 2,
+    'three': 3,
+    'four': 4,
+    'five': 5,
+    'six': 6,
+    'seven': 7,
+    'eight': 8,
+    'nine': 9,
+    'ten': 10,
+    'eleven': 11,
+    'twelve': 12,
+    'thirteen': 13,
+    'fourteen': 14,
+    'fifteen': 15,
+    'sixteen': 16,
+    'seventeen': 17,
+    'eighteen': 18,
+    'nineteen': 19,
+    'twenty': 20,
+    'thirty': 30,
+    'forty': 40,
+    'fourty': 40,
+    'fifty': 50,
+    'sixty': 60,
+    'seventy': 70,
+    'eighty': 80,
+    'ninety': 90
+}
+"""Dictionary mapping a string spoken number word to its integer value."""
+
+_SPOKEN_SCALES = {
+    'hundred': 100,
+    'thousand': 1000
+}
+"""Dictionary mapping a string spoken scale word to its integer value."""
+
+_SPOKEN_REPEATS = {
+    'double': 2,
+    'triple': 3
+}
+"""Dictionary mapping a string spoken repeat word to its integer count."""
+
+_SPOKEN_SEPARATORS = str.maketrans('-,', '  ')
+"""Translation table turning word separators into spaces."""
+
+_SPOKEN_MAX_DIGITS = 5
+"""Integer maximum number of digits of a PLU code, past which spoken text is
+not read any further."""
+
+_SCORE_WHOLE_WORD = 2.0
+"""Float score of a keyword that is a whole word of the description."""
+
+_SCORE_SUBSTRING = 1.0
+"""Float score of a keyword that is only part of a word of the description."""
+
+_SCORE_COMMODITY = 1.0
+"""Float score added when a keyword is part of the commodity, the last word."""
+
+_SCORE_POSITION = 0.5
+"""Float score divided by 1 plus the position of the first matching word."""
+
+_SCORE_LENGTH = 0.1
+"""Float score subtracted per word of the description."""
+
+_FUZZY_DISTANCES = [(5, 0), (7, 1)]
+"""List of (integer keyword length, integer edit distance) tuples giving the
+number of typos tolerated in keywords shorter than each length."""
+
+_FUZZY_MAX_DISTANCE = 2
+"""Integer number of typos tolerated in longer keywords."""
+
+_PHONETIC_INITIALS = {
+    'ae': 'e',
+    'gn': 'n',
+    'kn': 'n',
+    'pn': 'n',
+    'wr': 'r',
+    'wh': 'w',
+    'x': 's'
+}
+"""Dictionary mapping a string word beginning to its pronounced letters."""
+
+_PHONETIC_CODES = {
+    'sch': 'SK', 'tch': 'X', 'cia': 'X', 'tia': 'X', 'tio': 'X',
+    'sia': 'X', 'sio': 'X', 'dge': 'J', 'dgi': 'J', 'dgy': 'J',
+    'ch': 'X', 'sh': 'X', 'th': '0', 'ph': 'F', 'ck': 'K',
+    'ci': 'S', 'ce': 'S', 'cy': 'S', 'gi': 'J', 'ge': 'J',
+    'gy': 'J', 'gh': '', 'gn': 'N', 'mb': 'M',
+    'b': 'B', 'c': 'K', 'd': 'T', 'f': 'F', 'g': 'K', 'j': 'J',
+    'k': 'K', 'l': 'L', 'm': 'M', 'n': 'N', 'p': 'P', 'q': 'K',
+    'r': 'R', 's': 'S', 't': 'T', 'v': 'F', 'x': 'KS', 'z': 'S'
+}
+"""Dictionary mapping string letters to their string sound in the style of
+Metaphone, the longest letters matching first. Vowels, h, w and y are only
+kept as the first letter, and letters without a sound are skipped."""
+
+_PHONETIC_MAX_LETTERS = max([len(letters) for letters in _PHONETIC_CODES])
+"""Integer number of letters of the longest key of _PHONETIC_CODES."""
+
+_PHONETIC_MIN_LENGTH = 3
+"""Integer minimum length of a keyword looked up by sound."""
+
+_STEM_SUFFIXES = [
+    ("'s", ''),
+    ('ies', 'y'),
+    ('oes', 'o'),
+    ('sses', 'ss'),
+    ('shes', 'sh'),
+    ('ches', 'ch'),
+    ('xes', 'x'),
+    ('ss', 'ss'),
+    ('us', 'us'),
+    ('s', '')
+]
+"""List of (string plural suffix, string singular suffix) tuples, the first
+ending a word replaced unless the stem gets too short."""
+
+_STEM_MIN_LENGTH = 3
+"""Integer minimum length of a stem."""
+
 _PLU_MAP = {
     "3000": "alkmene apples",
     "3001": "small aurora southern rose apples",
@@ -1165,179 +1305,3006 @@ _PLU_MAP = {
 }
 """Dictionary mapping a string numeric PLU code to a string description."""
 
-def get_code(keywords):
-    """Return a list of string numeric PLU codes matching keywords.
+CatalogDiff = collections.namedtuple('CatalogDiff',
+                                     ['added', 'changed', 'removed'])
+"""Named tuple of the changes between a catalog and new records.
+
+Attributes:
+    added: Dictionary mapping each new string PLU code to its description.
+    changed: Dictionary mapping each string PLU code whose description
+        changed to its new description.
+    removed: Sorted list of string PLU codes without a record.
+"""
+
+def _fingerprint(description):
+    """Return the bytes fingerprint of the string description."""
+    return hashlib.blake2b(description.encode('utf-8'),
+                           digest_size=8).digest()
+
+def fingerprint_map(plu_map):
+    """Return the fingerprints of a dictionary of PLU codes.
 
     Args:
-        keywords: List of string keywords describing the PLU code.
+        plu_map: Dictionary mapping a string PLU code to a string description.
     Returns:
-        List of string numeric PLU codes matching keywords in ascending order.
+        Dictionary mapping a string PLU code to the bytes fingerprint of its
+        description.
     """
-    keyword_set = set([keyword.strip().lower() for keyword in keywords
-                       if (isinstance(keyword, str) and
-                           (len(keyword.strip()) > 0))])
-    is_organic = False
-    if 'organic' in keyword_set:
-        is_organic = True
-        keyword_set.remove('organic')
+    return {code: _fingerprint(description)
+            for code, description in plu_map.items()}
 
-    if len(keyword_set) <= 0:
-        return []
+def diff_catalog(fingerprints, records):
+    """Return the changes between a previously built catalog and records.
 
-    match_set = set()
-    for code, description in _PLU_MAP.items():
-        for keyword in keyword_set:
-            if keyword not in description:
+    Args:
+        fingerprints: Dictionary mapping a string PLU code to the bytes
+            fingerprint of its description, as returned by fingerprint_map().
+        records: Iterable of every (string PLU code, string description)
+            tuple of the new catalog, such as returned by iter_csv().
+    Returns:
+        CatalogDiff.
+    """
+    if not isinstance(fingerprints, dict):
+        raise TypeError('fingerprints must be a dictionary.')
+    added = {}
+    changed = {}
+    seen = set()
+    for code, description in records:
+        seen.add(code)
+        fingerprint = fingerprints.get(code)
+        if fingerprint is None:
+            added[code] = description
+        elif fingerprint != _fingerprint(description):
+            changed[code] = description
+    removed = sorted([code for code in fingerprints if code not in seen])
+    return CatalogDiff(added, changed, removed)
+
+def _organic_description(description):
+    """Return the description of the organic variety of description.
+
+    Args:
+        description: String description of a PLU code.
+    Returns:
+        String description of the organic PLU code.
+    """
+    if 'napa' in description:
+        # Easter egg
+        return 'organic ' + description + '. Over 9000!'
+    return 'organic ' + description
+
+def _fuzzy_distance(keyword):
+    """Return the number of typos tolerated in keyword.
+
+    Short keywords are within a typo or two of too many unrelated words to
+    be corrected reliably.
+
+    Args:
+        keyword: String keyword.
+    Returns:
+        Integer maximum edit distance.
+    """
+    for length, distance in _FUZZY_DISTANCES:
+        if len(keyword) < length:
+            return distance
+    return _FUZZY_MAX_DISTANCE
+
+def _deletions(word, distance):
+    """Return every string obtained by deleting up to distance characters.
+
+    Args:
+        word: String word.
+        distance: Integer maximum number of characters to delete.
+    Returns:
+        Set of strings including word itself.
+    """
+    deletions = set([word])
+    frontier = deletions
+    for _ in range(distance):
+        frontier = set([w[:i] + w[i + 1:]
+                        for w in frontier for i in range(len(w))])
+        deletions |= frontier
+    return deletions
+
+def _edit_distance(a, b):
+    """Return the number of typos between two strings.
+
+    A typo is an inserted, deleted or substituted character, or two
+    transposed adjacent characters.
+
+    Args:
+        a: String.
+        b: String.
+    Returns:
+        Integer optimal string alignment distance between a and b.
+    """
+    before = previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, row = previous, row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(previous[j] + 1, row[j - 1] + 1,
+                         previous[j - 1] + cost)
+            if ((i > 1) and (j > 1) and (a[i - 1] == b[j - 2]) and
+                (a[i - 2] == b[j - 1])):
+                row[j] = min(row[j], before[j - 2] + 1)
+    return row[-1]
+
+def _stem(token):
+    """Return the singular form of a token.
+
+    Args:
+        token: String lowercase token matching _KEYWORD_PATTERN.
+    Returns:
+        String stem, token itself when it does not look plural.
+    """
+    for suffix, replacement in _STEM_SUFFIXES:
+        if (token.endswith(suffix) and
+            (len(token) - len(suffix) + len(replacement) >= _STEM_MIN_LENGTH)):
+            return token[:len(token) - len(suffix)] + replacement
+    return token
+
+def _phonetic_key(word):
+    """Return a key shared by words that sound alike.
+
+    Args:
+        word: String lowercase word.
+    Returns:
+        String phonetic key, empty when word has no letters.
+    """
+    word = ''.join([c for c in word if 'a' <= c <= 'z'])
+    if len(word) <= 0:
+        return ''
+    for initial, letters in _PHONETIC_INITIALS.items():
+        if word.startswith(initial):
+            word = letters + word[len(initial):]
+            break
+    key = []
+    if word[0] in 'aeiouhwy':
+        key.append(word[0].upper())
+    i = len(key)
+    while i < len(word):
+        if (i > 0) and (word[i] == word[i - 1]):
+            # Doubled letters sound like one
+            i += 1
+            continue
+        for length in range(_PHONETIC_MAX_LETTERS, 0, -1):
+            letters = word[i:i + length]
+            sound = _PHONETIC_CODES.get(letters)
+            if sound is not None:
+                key.append(sound)
+                i += len(letters)
                 break
         else:
+            i += 1
+    return ''.join(key)
+
+class _Catalog(object):
+    """Queries shared by the catalogs searched by this module.
+
+    Subclasses store the catalog and answer the queries built on top of
+    get_description(), match(), _match(), match_stems(), find_postings(),
+    correct(), sounds_like(), _words(), _get_code_range() and _complete().
+    """
+
+    def _match_keywords(self, keyword_set, is_organic, stem=False):
+        """Return a list of string numeric PLU codes matching normalized
+        keywords.
+
+        Args:
+            keyword_set: Frozenset of non-empty lowercase string keywords.
+            is_organic: Boolean flag indicating whether to return organic
+                codes.
+            stem: Optional boolean flag indicating whether to match whole
+                words regardless of plurals.
+                Defaults to False which matches substrings.
+        Returns:
+            List of string numeric PLU codes matching keywords in ascending
+            order.
+        """
+        if len(keyword_set) <= 0:
+            return []
+
+        # Results of replaced indexes never match the key
+        key = (self, keyword_set, is_organic, stem)
+        codes = _CODE_CACHE.get(key)
+        if codes is None:
+            if stem:
+                codes = self.match_stems(keyword_set)
+            else:
+                codes = self.match(keyword_set)
             if is_organic:
                 # Add the organic prefix
-                match_set.add('9' + code)
+                codes = ['9' + code for code in codes]
+            codes = tuple(codes)
+            _CODE_CACHE.put(key, codes)
+        return list(codes)
+
+    def get_code(self, keywords, stem=False):
+        """Return a list of string numeric PLU codes matching keywords.
+
+        Args:
+            keywords: List of string keywords describing the PLU code.
+            stem: Optional boolean flag indicating whether to match whole
+                words regardless of plurals.
+                Defaults to False which matches substrings.
+        Returns:
+            List of string numeric PLU codes matching keywords in ascending
+            order.
+        """
+        keyword_set, is_organic = _normalize_keywords(keywords)
+        return self._match_keywords(keyword_set, is_organic, stem)
+
+    def get_codes_many(self, queries):
+        """Return a list of the PLU codes matching each query.
+
+        Keywords are normalized once across all queries and each distinct
+        normalized query is only matched once.
+
+        Args:
+            queries: Iterable of lists of string keywords describing PLU
+                codes.
+        Returns:
+            List of lists of string numeric PLU codes in ascending order, one
+            per query in the order of queries.
+        """
+        normalized = {}
+        results = {}
+        codes_list = []
+        for keywords in queries:
+            key = _normalize_keywords(keywords, normalized)
+            if key not in results:
+                results[key] = self._match_keywords(*key)
+            codes_list.append(list(results[key]))
+        return codes_list
+
+    def get_descriptions_many(self, codes):
+        """Return a list of the description for each code.
+
+        Each distinct code is only sanitized and looked up once.
+
+        Args:
+            codes: Iterable of string numeric PLU codes.
+        Returns:
+            List of string descriptions, one per code in the order of codes.
+        """
+        results = {}
+        descriptions = []
+        for code in codes:
+            if not isinstance(code, str):
+                raise TypeError('code must be a string.')
+            if code not in results:
+                results[code] = self.get_description(code)
+            descriptions.append(results[code])
+        return descriptions
+
+    def score(self, code, keyword_set):
+        """Return the relevance of the description of code to keyword_set.
+
+        Whole words score more than parts of words, words describing the
+        commodity and earlier words score more, and every word of the
+        description scores a little less, so generic descriptions come first.
+
+        Args:
+            code: String 4 digit PLU code in the catalog.
+            keyword_set: Set of non-empty lowercase string keywords.
+        Returns:
+            Float relevance score.
+        """
+        tokens = self._words(code)
+        score = -_SCORE_LENGTH * len(tokens)
+        for keyword in keyword_set:
+            for position, token in enumerate(tokens):
+                if keyword in token:
+                    if keyword == token:
+                        score += _SCORE_WHOLE_WORD
+                    else:
+                        score += _SCORE_SUBSTRING
+                    score += _SCORE_POSITION / (1 + position)
+                    break
+            if keyword in tokens[-1]:
+                score += _SCORE_COMMODITY
+        return score
+
+    def search(self, keywords, limit=10):
+        """Return the most relevant PLU codes matching keywords.
+
+        Only the codes matching every keyword are scored, and the best are
+        kept in a heap of size limit instead of sorting every match.
+
+        Args:
+            keywords: List of string keywords describing the PLU code.
+            limit: Optional integer maximum number of codes to return.
+                Defaults to 10.
+        Returns:
+            List of string numeric PLU codes, most relevant first, with ties
+            in ascending order.
+        """
+        if (not isinstance(limit, int)) or isinstance(limit, bool):
+            raise TypeError('limit must be a non-negative integer.')
+        if limit < 0:
+            raise ValueError('limit must be a non-negative integer.')
+        keyword_set, is_organic = _normalize_keywords(keywords)
+        if (len(keyword_set) <= 0) or (limit <= 0):
+            return []
+
+        codes = heapq.nsmallest(
+            limit, self._match(keyword_set),
+            key=lambda code: (-self.score(code, keyword_set), code))
+        if is_organic:
+            # Add the organic prefix
+            return ['9' + code for code in codes]
+        return codes
+
+    def rank(self, codes, keywords, limit=10):
+        """Return the most relevant of the PLU codes found for keywords.
+
+        Unlike search(), the codes may have been found by stem or with typos
+        corrected, so keywords are scored corrected and with their stems.
+
+        Args:
+            codes: List of string numeric PLU codes found for keywords, such
+                as returned by get_code() or get_code_fuzzy().
+            keywords: List of string keywords describing the PLU code.
+            limit: Optional integer maximum number of codes to return.
+                Defaults to 10.
+        Returns:
+            List of string numeric PLU codes, most relevant first, with ties
+            in ascending order.
+        """
+        if not isinstance(codes, list):
+            raise TypeError('codes must be a list of string PLU codes.')
+        if (not isinstance(limit, int)) or isinstance(limit, bool):
+            raise TypeError('limit must be a non-negative integer.')
+        if limit < 0:
+            raise ValueError('limit must be a non-negative integer.')
+        keyword_set, is_organic = _normalize_keywords(keywords)
+        if (len(codes) <= 0) or (limit <= 0):
+            return []
+        keyword_set = self._correct_keywords(keyword_set)
+        keyword_set = keyword_set.union([_stem(keyword)
+                                         for keyword in keyword_set])
+
+        # Strip the organic prefix
+        prefix = '9' if is_organic else ''
+        codes = heapq.nsmallest(
+            limit, [code[len(prefix):] for code in codes],
+            key=lambda code: (-self.score(code, keyword_set), code))
+        return [prefix + code for code in codes]
+
+    def get_code_fuzzy(self, keywords):
+        """Return a list of string numeric PLU codes matching keywords or,
+        if there are none, matching keywords with their typos corrected.
+
+        Only keywords that are not part of any token are corrected, by
+        spelling first and then by sound.
+
+        Args:
+            keywords: List of string keywords describing the PLU code.
+        Returns:
+            List of string numeric PLU codes matching keywords in ascending
+            order.
+        """
+        keyword_set, is_organic = _normalize_keywords(keywords)
+        codes = self._match_keywords(keyword_set, is_organic)
+        if len(codes) > 0:
+            return codes
+
+        corrected = self._correct_keywords(keyword_set)
+        if corrected == keyword_set:
+            return []
+        return self._match_keywords(corrected, is_organic)
+
+    def _correct_keywords(self, keyword_set):
+        """Return keyword_set with the typos of its keywords corrected.
+
+        Only keywords that are not part of any token are corrected, by
+        spelling first and then by sound.
+
+        Args:
+            keyword_set: Frozenset of non-empty lowercase string keywords.
+        Returns:
+            Frozenset of string keywords.
+        """
+        corrected = set()
+        for keyword in keyword_set:
+            if (_KEYWORD_PATTERN.fullmatch(keyword) and
+                (len(self.find_postings(keyword)) <= 0)):
+                token = self.correct(keyword)
+                if token is None:
+                    token = self.sounds_like(keyword)
+                if token is not None:
+                    keyword = token
+            corrected.add(keyword)
+        return frozenset(corrected)
+
+    def get_code_range(self, first, last, organic=False):
+        """Return the PLU codes from first to last.
+
+        The codes are kept sorted, so the range is found with two binary
+        searches.
+
+        Args:
+            first: String 4 digit PLU code beginning the range.
+            last: String 4 digit PLU code ending the range, included.
+            organic: Optional boolean flag indicating whether to return
+                organic codes.
+                Defaults to False.
+        Returns:
+            List of string numeric PLU codes in ascending order.
+        """
+        for code in [first, last]:
+            if not isinstance(code, str):
+                raise TypeError('first and last must be strings.')
+            if (len(code) != 4) or (not code.isdecimal()):
+                raise ValueError('first and last must be 4 digit PLU codes.')
+        codes = self._get_code_range(first, last)
+        if organic:
+            # Add the organic prefix
+            return ['9' + code for code in codes]
+        return codes
+
+    def get_code_prefix(self, prefix, organic=False):
+        """Return the PLU codes beginning with prefix.
+
+        Args:
+            prefix: String of up to 4 digits.
+            organic: Optional boolean flag indicating whether to return
+                organic codes.
+                Defaults to False.
+        Returns:
+            List of string numeric PLU codes in ascending order.
+        """
+        if not isinstance(prefix, str):
+            raise TypeError('prefix must be a string.')
+        if (len(prefix) > 4) or (len(prefix) > 0 and not prefix.isdecimal()):
+            raise ValueError('prefix must be up to 4 digits.')
+        return self.get_code_range(prefix.ljust(4, '0'), prefix.ljust(4, '9'),
+                                   organic)
+
+    def complete(self, prefix, limit=10):
+        """Return the words or PLU codes beginning with prefix.
+
+        The words and codes are kept sorted, so the completions are found
+        with a binary search for prefix followed by at most limit others.
+
+        Args:
+            prefix: String beginning of a word, or of a PLU code when it only
+                has digits.
+            limit: Optional integer maximum number of completions to return.
+                Defaults to 10.
+        Returns:
+            List of string words of descriptions or string numeric PLU codes
+            in ascending order.
+        """
+        if not isinstance(prefix, str):
+            raise TypeError('prefix must be a string.')
+        if (not isinstance(limit, int)) or isinstance(limit, bool):
+            raise TypeError('limit must be a non-negative integer.')
+        if limit < 0:
+            raise ValueError('limit must be a non-negative integer.')
+        prefix = prefix.strip().lower()
+        if (len(prefix) <= 0) or (limit <= 0):
+            return []
+        return self._complete(prefix, limit)
+
+class _Index(_Catalog):
+    """Search indexes derived from a dictionary of PLU code descriptions.
+
+    Attributes:
+        plu_map: Dictionary mapping a string numeric PLU code to a string
+            description.
+        postings: Dictionary mapping a string token to a sorted tuple of
+            string numeric PLU codes whose description contains the token.
+        codes: Sorted list of the string numeric PLU codes.
+        tokens: Sorted list of the string tokens of every description.
+        stems: Dictionary mapping a string stem to a sorted tuple of string
+            numeric PLU codes whose description contains a token with that
+            stem.
+        suffixes: Sorted list of (suffix, token) tuples for every suffix of
+            every token, so the tokens containing a substring are found with
+            a binary search instead of a scan.
+        trigrams: Dictionary mapping a string of 3 characters to a frozenset
+            of string numeric PLU codes whose description contains it.
+        descriptions: Dictionary mapping every valid 4 or 5 digit string
+            form of a PLU code to the description get_description returns.
+        words: Dictionary mapping a string numeric PLU code to the tuple of
+            the whitespace separated words of its description.
+        fingerprints: Dictionary mapping a string numeric PLU code to the
+            bytes fingerprint of its description.
+        phonetics: Dictionary mapping a string phonetic key to a sorted
+            tuple of the tokens with that key.
+        deletions: Dictionary mapping every string obtained by deleting up
+            to _FUZZY_MAX_DISTANCE characters from a token to a sorted tuple
+            of those tokens.
+        longest: Integer length of the longest token.
+    """
+
+    def __init__(self, plu_map):
+        """Build the indexes for a copy of plu_map.
+
+        Args:
+            plu_map: Dictionary mapping a string numeric PLU code to a string
+                description.
+        """
+        if not isinstance(plu_map, dict):
+            raise TypeError('plu_map must be a dictionary.')
+        self.plu_map = dict(plu_map)
+        plu_map = self.plu_map
+
+        postings = {}
+        trigrams = {}
+        for code, description in plu_map.items():
+            for token in _KEYWORD_PATTERN.findall(description):
+                postings.setdefault(token, set()).add(code)
+            for i in range(len(description) - 2):
+                trigrams.setdefault(description[i:i + 3], set()).add(code)
+        self.postings = {token: tuple(sorted(codes))
+                         for token, codes in postings.items()}
+        self.codes = sorted(plu_map)
+        self.tokens = sorted(self.postings)
+        stems = {}
+        for token, codes in postings.items():
+            stems.setdefault(_stem(token), set()).update(codes)
+        self.stems = {stem: tuple(sorted(codes))
+                      for stem, codes in stems.items()}
+        self.suffixes = sorted([(token[i:], token)
+                                for token in self.postings
+                                for i in range(len(token))])
+        self.trigrams = {trigram: frozenset(codes)
+                         for trigram, codes in trigrams.items()}
+        phonetics = {}
+        for token in self.postings:
+            phonetics.setdefault(_phonetic_key(token), []).append(token)
+        self.phonetics = {key: tuple(sorted(tokens))
+                          for key, tokens in phonetics.items()}
+        deletions = {}
+        for token in self.postings:
+            for deletion in _deletions(token, _FUZZY_MAX_DISTANCE):
+                deletions.setdefault(deletion, []).append(token)
+        self.deletions = {deletion: tuple(sorted(tokens))
+                          for deletion, tokens in deletions.items()}
+        self.longest = max([len(token) for token in self.postings] + [0])
+
+        descriptions = {}
+        for code, description in plu_map.items():
+            descriptions[code] = description
+            for prefix in '012345678':
+                descriptions[prefix + code] = description
+            # Organic prefix
+            descriptions['9' + code] = _organic_description(description)
+        self.descriptions = descriptions
+        self.words = {code: tuple(description.split())
+                      for code, description in plu_map.items()}
+        self.fingerprints = fingerprint_map(plu_map)
+        self._version = None
+
+    def add(self, code, description):
+        """Add code to the indexes in place.
+
+        Args:
+            code: String numeric PLU code not in plu_map.
+            description: String description of code.
+        """
+        if code in self.plu_map:
+            raise ValueError('PLU code {0} is already indexed.'.format(code))
+        self.plu_map[code] = description
+        bisect.insort(self.codes, code)
+        for token in set(_KEYWORD_PATTERN.findall(description)):
+            if token in self.postings:
+                codes = list(self.postings[token])
+                bisect.insort(codes, code)
+                self.postings[token] = tuple(codes)
             else:
-                match_set.add(code)
-    return sorted(match_set)
+                self.postings[token] = (code,)
+                bisect.insort(self.tokens, token)
+                for i in range(len(token)):
+                    bisect.insort(self.suffixes, (token[i:], token))
+                key = _phonetic_key(token)
+                tokens = list(self.phonetics.get(key, ()))
+                bisect.insort(tokens, token)
+                self.phonetics[key] = tuple(tokens)
+                for deletion in _deletions(token, _FUZZY_MAX_DISTANCE):
+                    tokens = list(self.deletions.get(deletion, ()))
+                    bisect.insort(tokens, token)
+                    self.deletions[deletion] = tuple(tokens)
+                self.longest = max(self.longest, len(token))
+        for stem in set([_stem(token) for token in
+                         _KEYWORD_PATTERN.findall(description)]):
+            codes = list(self.stems.get(stem, ()))
+            bisect.insort(codes, code)
+            self.stems[stem] = tuple(codes)
+        for i in range(len(description) - 2):
+            trigram = description[i:i + 3]
+            self.trigrams[trigram] = self.trigrams.get(
+                trigram, frozenset()).union([code])
+        self.descriptions[code] = description
+        for prefix in '012345678':
+            self.descriptions[prefix + code] = description
+        self.descriptions['9' + code] = _organic_description(description)
+        self.words[code] = tuple(description.split())
+        self.fingerprints[code] = _fingerprint(description)
+        self._version = None
 
-def _sanitize_code(code):
-    """Return code with non-digit characters removed.
+    def remove(self, code):
+        """Remove code from the indexes in place.
+
+        Args:
+            code: String numeric PLU code in plu_map.
+        """
+        if code not in self.plu_map:
+            raise ValueError('PLU code {0} is not indexed.'.format(code))
+        description = self.plu_map.pop(code)
+        del self.codes[bisect.bisect_left(self.codes, code)]
+        for token in set(_KEYWORD_PATTERN.findall(description)):
+            codes = tuple([c for c in self.postings[token] if c != code])
+            if len(codes) > 0:
+                self.postings[token] = codes
+                continue
+            del self.postings[token]
+            del self.tokens[bisect.bisect_left(self.tokens, token)]
+            for i in range(len(token)):
+                del self.suffixes[
+                    bisect.bisect_left(self.suffixes, (token[i:], token))]
+            key = _phonetic_key(token)
+            tokens = tuple([t for t in self.phonetics[key] if t != token])
+            if len(tokens) > 0:
+                self.phonetics[key] = tokens
+            else:
+                del self.phonetics[key]
+            for deletion in _deletions(token, _FUZZY_MAX_DISTANCE):
+                tokens = tuple([t for t in self.deletions[deletion]
+                                if t != token])
+                if len(tokens) > 0:
+                    self.deletions[deletion] = tokens
+                else:
+                    del self.deletions[deletion]
+            if len(token) >= self.longest:
+                self.longest = max([len(t) for t in self.tokens] + [0])
+        for stem in set([_stem(token) for token in
+                         _KEYWORD_PATTERN.findall(description)]):
+            codes = tuple([c for c in self.stems[stem] if c != code])
+            if len(codes) > 0:
+                self.stems[stem] = codes
+            else:
+                del self.stems[stem]
+        for trigram in set([description[i:i + 3]
+                            for i in range(len(description) - 2)]):
+            codes = self.trigrams[trigram].difference([code])
+            if len(codes) > 0:
+                self.trigrams[trigram] = codes
+            else:
+                del self.trigrams[trigram]
+        for prefix in '0123456789':
+            del self.descriptions[prefix + code]
+        del self.descriptions[code]
+        del self.words[code]
+        del self.fingerprints[code]
+        self._version = None
+
+    def apply(self, diff):
+        """Patch the indexes in place with the changes in diff.
+
+        Args:
+            diff: CatalogDiff against plu_map.
+        """
+        for code in list(diff.removed) + list(diff.changed):
+            self.remove(code)
+        for changes in [diff.added, diff.changed]:
+            for code, description in changes.items():
+                self.add(code, description)
+
+    def copy(self):
+        """Return a copy of the indexes that can be patched independently."""
+        index = _Index.__new__(_Index)
+        index.plu_map = dict(self.plu_map)
+        index.postings = dict(self.postings)
+        index.codes = list(self.codes)
+        index.tokens = list(self.tokens)
+        index.stems = dict(self.stems)
+        index.suffixes = list(self.suffixes)
+        index.trigrams = dict(self.trigrams)
+        index.phonetics = dict(self.phonetics)
+        index.deletions = dict(self.deletions)
+        index.longest = self.longest
+        index.descriptions = dict(self.descriptions)
+        index.words = dict(self.words)
+        index.fingerprints = dict(self.fingerprints)
+        index._version = None
+        return index
+
+    def version(self):
+        """Return a string identifying the contents of the indexes.
+
+        Returns:
+            String hexadecimal digest of every PLU code and the fingerprint
+            of its description, equal for indexes of equal dictionaries.
+        """
+        if self._version is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for code in self.codes:
+                digest.update(code.encode('utf-8') + b'\x00')
+                digest.update(self.fingerprints[code])
+            self._version = digest.hexdigest()
+        return self._version
+
+    def updated(self, diff):
+        """Return new indexes with the changes in diff, leaving these intact.
+
+        Small changes patch a copy of the indexes, larger ones rebuild them.
+
+        Args:
+            diff: CatalogDiff against plu_map.
+        Returns:
+            _Index.
+        """
+        count = len(diff.added) + len(diff.changed) + len(diff.removed)
+        if count * 4 > len(self.plu_map):
+            plu_map = dict(self.plu_map)
+            for code in diff.removed:
+                del plu_map[code]
+            plu_map.update(diff.added)
+            plu_map.update(diff.changed)
+            return _Index(plu_map)
+        index = self.copy()
+        index.apply(diff)
+        return index
+
+    def find_postings(self, keyword, limit=None):
+        """Return the postings of the tokens containing keyword.
+
+        Args:
+            keyword: String keyword matching _KEYWORD_PATTERN.
+            limit: Optional integer total number of postings at which to stop.
+                Defaults to None which is no limit.
+        Returns:
+            List of sorted tuples of string numeric PLU codes, one per token
+            containing keyword, or None when the total number of postings
+            reaches limit.
+        """
+        postings = self.postings
+        suffixes = self.suffixes
+        tokens = set()
+        posting_lists = []
+        count = 0
+        i = bisect.bisect_left(suffixes, (keyword,))
+        while (i < len(suffixes)) and suffixes[i][0].startswith(keyword):
+            token = suffixes[i][1]
+            if token not in tokens:
+                tokens.add(token)
+                posting_lists.append(postings[token])
+                count += len(postings[token])
+                if (limit is not None) and (count >= limit):
+                    return None
+            i += 1
+        return posting_lists
+
+    def find_candidates(self, substring):
+        """Return the codes whose description may contain substring.
+
+        Every trigram of substring must occur in the description, which is
+        necessary but not sufficient, so candidates still need verifying.
+
+        Args:
+            substring: String of 3 or more characters.
+        Returns:
+            Set of string numeric PLU codes.
+        """
+        trigrams = self.trigrams
+        code_sets = sorted([trigrams.get(substring[i:i + 3], frozenset())
+                            for i in range(len(substring) - 2)], key=len)
+        candidates = set(code_sets[0])
+        for code_set in code_sets[1:]:
+            if len(candidates) <= 0:
+                break
+            candidates.intersection_update(code_set)
+        return candidates
+
+    def match(self, keyword_set):
+        """Return a list of string numeric PLU codes matching keyword_set.
+
+        A code matches when every keyword is a substring of its description.
+        Keywords that are single tokens are answered exactly by the postings
+        of the tokens containing them. Other keywords are narrowed down by
+        their trigrams and verified against the surviving descriptions.
+
+        Args:
+            keyword_set: Set of non-empty lowercase string keywords.
+        Returns:
+            List of string numeric PLU codes in ascending order.
+        """
+        return sorted(self._match(keyword_set))
+
+    def _match(self, keyword_set):
+        """Return the string numeric PLU codes matching keyword_set.
+
+        Args:
+            keyword_set: Set of non-empty lowercase string keywords.
+        Returns:
+            Iterable of string numeric PLU codes in no particular order, for
+            callers ordering them another way.
+        """
+        plu_map = self.plu_map
+        # Keywords matching at least as many postings as there are codes
+        # are not selective, so they are verified instead
+        limit = len(plu_map)
+        selective = []
+        remaining = []
+        for keyword in keyword_set:
+            if _KEYWORD_PATTERN.fullmatch(keyword):
+                if len(keyword) < 2:
+                    # Single characters occur in nearly every description
+                    remaining.append(keyword)
+                    continue
+                posting_lists = self.find_postings(keyword, limit)
+                if posting_lists is None:
+                    remaining.append(keyword)
+                    continue
+                count = sum([len(codes) for codes in posting_lists])
+            else:
+                remaining.append(keyword)
+                if len(keyword) < 3:
+                    continue
+                posting_lists = [self.find_candidates(keyword)]
+                count = len(posting_lists[0])
+            if count <= 0:
+                return []
+            selective.append((count, keyword, posting_lists))
+
+        # Intersect from the rarest keyword up
+        selective.sort(key=lambda t: t[0])
+        candidates = None
+        for count, keyword, posting_lists in selective:
+            if candidates is None:
+                candidates = set(posting_lists[0])
+                for codes in posting_lists[1:]:
+                    candidates.update(codes)
+            else:
+                matches = set()
+                for codes in posting_lists:
+                    matches.update(codes)
+                candidates.intersection_update(matches)
+            if len(candidates) <= 0:
+                return []
+        if candidates is None:
+            candidates = plu_map.keys()
+
+        if len(remaining) <= 0:
+            return candidates
+        matches = []
+        for code in candidates:
+            description = plu_map[code]
+            for keyword in remaining:
+                if keyword not in description:
+                    break
+            else:
+                matches.append(code)
+        return matches
+
+    def match_stems(self, keyword_set):
+        """Return a list of string numeric PLU codes matching keyword_set
+        by whole words, regardless of plurals.
+
+        A code matches when every token of every keyword has the stem of a
+        token of its description.
+
+        Args:
+            keyword_set: Set of non-empty lowercase string keywords.
+        Returns:
+            List of string numeric PLU codes in ascending order.
+        """
+        stems = self.stems
+        posting_lists = []
+        for keyword in keyword_set:
+            for token in _KEYWORD_PATTERN.findall(keyword):
+                codes = stems.get(_stem(token))
+                if codes is None:
+                    return []
+                posting_lists.append(codes)
+        if len(posting_lists) <= 0:
+            return []
+
+        # Intersect from the rarest stem up
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for codes in posting_lists[1:]:
+            candidates.intersection_update(codes)
+            if len(candidates) <= 0:
+                return []
+        return sorted(candidates)
+
+    def correct(self, keyword):
+        """Return the token closest to a misspelled keyword.
+
+        The tokens within the tolerated number of typos share a deletion
+        with keyword, so they are looked up in a dictionary of deletions
+        instead of comparing keyword to every token.
+
+        Args:
+            keyword: String lowercase keyword.
+        Returns:
+            String token with the fewest typos from keyword, the most PLU
+            codes, then first in alphabetical order, or None when no token
+            is close enough.
+        """
+        if not isinstance(keyword, str):
+            raise TypeError('keyword must be a string.')
+        distance = _fuzzy_distance(keyword)
+        if distance <= 0:
+            return None
+        if keyword in self.postings:
+            return keyword
+        # Longer keywords are too far from every token, and their deletions
+        # grow with the square of their length
+        if len(keyword) > self.longest + distance:
+            return None
+
+        best = None
+        seen = set()
+        for deletion in _deletions(keyword, distance):
+            for token in self.deletions.get(deletion, ()):
+                if token in seen:
+                    continue
+                seen.add(token)
+                typos = _edit_distance(keyword, token)
+                if typos > distance:
+                    continue
+                key = (typos, -len(self.postings[token]), token)
+                if (best is None) or (key < best):
+                    best = key
+        if best is None:
+            return None
+        return best[2]
+
+    def sounds_like(self, keyword):
+        """Return the token sounding most like a misheard keyword.
+
+        Args:
+            keyword: String lowercase keyword.
+        Returns:
+            String token with the same phonetic key as keyword and typos in
+            at most half of its letters, with the fewest typos, the most PLU
+            codes, then first in alphabetical order, or None when no token
+            sounds alike.
+        """
+        if not isinstance(keyword, str):
+            raise TypeError('keyword must be a string.')
+        if len(keyword) < _PHONETIC_MIN_LENGTH:
+            return None
+        if keyword in self.postings:
+            return keyword
+        best = None
+        for token in self.phonetics.get(_phonetic_key(keyword), ()):
+            typos = _edit_distance(keyword, token)
+            # Vowels are not part of the key, so too many typos means
+            # another word with the same consonants
+            if typos * 2 > len(keyword):
+                continue
+            key = (typos, -len(self.postings[token]), token)
+            if (best is None) or (key < best):
+                best = key
+        if best is None:
+            return None
+        return best[2]
+
+    def _words(self, code):
+        """Return the tuple of the string words of the description of code."""
+        return self.words[code]
+
+    def _get_code_range(self, first, last):
+        """Return the list of the 4 digit PLU codes from first to last."""
+        return self.codes[bisect.bisect_left(self.codes, first):
+                          bisect.bisect_right(self.codes, last)]
+
+    def _complete(self, prefix, limit):
+        """Return up to limit of the tokens or codes beginning with prefix."""
+        words = self.codes if prefix.isdecimal() else self.tokens
+        i = bisect.bisect_left(words, prefix)
+        completions = []
+        for word in words[i:i + limit]:
+            if not word.startswith(prefix):
+                break
+            completions.append(word)
+        return completions
+
+    def get_description(self, code):
+        """Return the description for code.
+
+        Args:
+            code: String numeric PLU code.
+        Returns:
+            String description for code.
+        """
+        return self.descriptions.get(_sanitize_code(code), '')
+
+_INDEX = None
+"""_Index or CompactCatalog searched by this module, replaced but never
+modified in place, or None until the first lookup, update_catalog() or
+set_catalog() provides it."""
+
+_UPDATE_LOCK = threading.Lock()
+"""Lock serializing the building and replacement of _INDEX."""
+
+def _get_index():
+    """Return _INDEX, indexing the built-in catalog on first use.
+
+    Importing this module does not pay for indexing a catalog that a
+    catalog file may replace right away.
 
-    Args:
-        code: String containing digit and other characters.
     Returns:
-        String containing only digit characters.
+        _Index, or CompactCatalog installed by set_catalog().
     """
-    if not isinstance(code, str):
-        raise TypeError('code must be a string.')
-    return re.sub('[^\d]', '', code)
+    global _INDEX
+    index = _INDEX
+    if index is None:
+        with _UPDATE_LOCK:
+            if _INDEX is None:
+                _INDEX = _Index(_PLU_MAP)
+            index = _INDEX
+    return index
 
-def get_description(code):
-    """Return the description for code.
+def get_catalog():
+    """Return the catalog searched by this module.
+
+    The catalog is never modified in place, so looking up everything a
+    request needs through it gives consistent results even while the
+    module catalog is being replaced.
+
+    Returns:
+        Catalog with the get_code(), get_codes_many(), get_description()
+        and get_descriptions_many() methods of this module, an _Index or the
+        CompactCatalog installed by set_catalog().
+    """
+    return _get_index()
+
+def update_catalog(records):
+    """Replace the catalog searched by this module with records.
+
+    Only the codes that were added, changed or removed since the catalog
+    was built are re-indexed, in a copy that then replaces the catalog. An
+    empty catalog is refused with ValueError, as it is much more likely a
+    truncated file than a store without produce.
 
     Args:
-        code: String numeric PLU code.
+        records: Iterable of every (string PLU code, string description)
+            tuple of the new catalog, such as returned by iter_csv().
     Returns:
-        String description for code.
+        CatalogDiff of the applied changes.
     """
-    code = _sanitize_code(code)
-    length = len(code)
-    if length < 4:
-        return ''
-    if length > 5:
-        return ''
+    global _INDEX
+    with _UPDATE_LOCK:
+        index = _INDEX
+        if isinstance(index, _Index):
+            fingerprints = index.fingerprints
+        else:
+            plu_map = _PLU_MAP if index is None else index.to_map()
+            fingerprints = fingerprint_map(plu_map)
+        diff = diff_catalog(fingerprints, records)
+        if len(fingerprints) - len(diff.removed) + len(diff.added) <= 0:
+            raise ValueError('records must not be empty.')
+        if not isinstance(index, _Index):
+            # Index the new catalog once instead of the current one first
+            plu_map = dict(plu_map)
+            for code in diff.removed:
+                del plu_map[code]
+            plu_map.update(diff.added)
+            plu_map.update(diff.changed)
+            _INDEX = _Index(plu_map)
+            _CODE_CACHE.clear()
+        elif len(diff.added) + len(diff.changed) + len(diff.removed) > 0:
+            _INDEX = index.updated(diff)
+            _CODE_CACHE.clear()
+    return diff
 
-    is_organic = False
-    if length == 5:
-        if code.startswith('9'):
-            # Organic prefix
-            is_organic = True
-        code = code[1:]
+def set_catalog(catalog):
+    """Replace the catalog searched by this module with catalog as is.
 
-    # At this point, code is 4 digits
-    if code in _PLU_MAP:
-        description = _PLU_MAP[code]
-        if is_organic:
-            if 'napa' in description:
-                # Easter egg
-                description += '. Over 9000!'
-            return 'organic ' + description
+    Unlike update_catalog(), nothing is indexed: lookups are answered from
+    the buffers of catalog, such as a binary catalog file memory-mapped by
+    load_catalog(), so memory stays flat as the catalog grows. Correcting
+    typos compares keywords to every token instead, and is slower. An
+    empty catalog is refused with ValueError, like update_catalog().
+
+    Args:
+        catalog: CompactCatalog.
+    Returns:
+        CatalogDiff of the applied changes.
+    """
+    global _INDEX
+    if not isinstance(catalog, CompactCatalog):
+        raise TypeError('catalog must be a CompactCatalog.')
+    if len(catalog) <= 0:
+        raise ValueError('catalog must not be empty.')
+    with _UPDATE_LOCK:
+        index = _INDEX
+        if isinstance(index, _Index):
+            fingerprints = index.fingerprints
         else:
-            return description
-    else:
-        return ''
+            plu_map = _PLU_MAP if index is None else index.to_map()
+            fingerprints = fingerprint_map(plu_map)
+        diff = diff_catalog(fingerprints, catalog.items())
+        _INDEX = catalog
+        _CODE_CACHE.clear()
+    return diff
 
-def parse_csv(path, delimiter=','):
-    """Parse the PLU code CSV text file at path.
+def read_catalog(path):
+    """Return an iterator of the records in the catalog file at path.
+
+    Files ending in ".csv" are PLU code CSV text files, files ending in
+    ".jsonl" are JSON Lines as written by write_jsonl(), and any other file
+    is a binary catalog file. Iterating raises ValueError on a malformed
+    file or record.
 
     Args:
-        path: String path to the PLU code CSV text file.
-        delimiter: Optional string delimiter in the CSV text file.
-            Defaults to ",".
+        path: String path of the catalog file.
+    Returns:
+        Iterator of (string PLU code, string description) tuples.
     """
     if not isinstance(path, str):
-        raise TypeError(
-            'path must be a valid string path to a CSV text file.')
+        raise TypeError('path must be a valid string path to a catalog file.')
     if not os.path.isfile(path):
         raise ValueError(
-            'path must be a valid string path to a CSV text file.')
-    if not isinstance(delimiter, str):
-        raise TypeError('delimiter must be an 1 character string.')
-    if len(delimiter) != 1:
-        raise ValueError('delimiter must be an 1 character string.')
+            'path must be a valid string path to a catalog file.')
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return iter_csv(path)
+    if extension == '.jsonl':
+        return _iter_jsonl(path)
+    return load_catalog(path).items()
 
-    keyword_list = []
-    keyword_set = set()
-    plu_map = {}
-    with open(path, encoding='utf-8', newline='') as f:
-        reader = csv.DictReader(f, delimiter=delimiter)
-        for row in reader:
-            code = _sanitize_code(row.get('PLU'))
-            commodity = row.get('COMMODITY').strip().lower()
-            variety = row.get('VARIETY').strip().lower()
-            if 'retailer' in variety:
-                continue
-            size = row.get('SIZE').strip().lower()
-            aka = row.get('AKA').strip().lower()
+def _iter_jsonl(path):
+    """Yield the records in the JSON Lines catalog file at path.
 
-            if not code.isdigit():
-                continue
-            if len(code) != 4:
-                continue
-            if code in plu_map:
-                print('PLU code {0} is already defined!'.format(code))
+    Every record must have a 4 digit code and a non-empty lowercase
+    description, like the records of iter_csv().
+    """
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if len(line.strip()) <= 0:
                 continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                record = {}
+            code = record.get('code')
+            description = record.get('description')
+            if ((not isinstance(code, str)) or (not code.isascii()) or
+                (not code.isdigit()) or (len(code) != 4) or
+                (not isinstance(description, str)) or
+                (len(description.strip()) <= 0) or
+                (description != description.lower())):
+                raise ValueError(
+                    '{0} line {1} is not a catalog record.'.format(path,
+                                                                   number))
+            yield (code, description)
 
-            columns = [_KEYWORD_PATTERN.finditer(variety),
-                       _KEYWORD_PATTERN.finditer(aka),
-                       _KEYWORD_PATTERN.finditer(commodity)]
-            if (len(size) > 0) and (not size.startswith('all')):
-                columns.insert(0, _KEYWORD_PATTERN.finditer(size))
-
-            keyword_list.clear()
-            keyword_set.clear()
-            for iterator in columns:
-                for match in iterator:
-                    keyword = match.group('keyword')
-                    if (isinstance(keyword, str) and (len(keyword) > 0) and
-                        (keyword not in keyword_set)):
-                        keyword_list.append(keyword)
-                        keyword_set.add(keyword)
-
-            plu_map[code] = ' '.join(keyword_list)
-
-    for code in sorted(plu_map.keys()):
-        # Use json to backslashreplace non-ASCII characters
-        print('    "{0}": {1},'.format(code, json.dumps(plu_map[code])))
+class CatalogWatcher(object):
+    """Replace the catalog searched by this module when a file changes.
 
+    Attributes:
+        path: String path of the watched catalog file.
+        interval: Float minimum number of seconds between checks.
+        compact: Boolean flag indicating whether the module searches the
+            file as a CompactCatalog instead of indexing it.
+        mtime: Integer modification time in nanoseconds of the last loaded
+            or rejected file, or None before the first load.
+    """
 
-class _UnitTest(unittest.TestCase):
-    def test_KEYWORD_PATTERN(self):
-        """Test the regular expression pattern pulling out keywords."""
-        for value in ['', '...', '---', '    ']:
-            self.assertIsNone(_KEYWORD_PATTERN.search(value))
-        for value, expected in [
-            ('foobar', ['foobar']),
-            ('foo bar', ['foo', 'bar']),
-            ('foo bar baz', ['foo', 'bar', 'baz']),
-            ("foo's bar", ["foo's", 'bar']),
-            ("d'estivale apples", ["d'estivale", 'apples']),
-            ('3-7 lbs', ['3', '7', 'lbs']),
-            ('3-pack (3 pints)', ['3', 'pack', '3', 'pints'])]:
-            self.assertEqual(_KEYWORD_PATTERN.findall(value), expected)
-        for value in _PLU_MAP.values():
-            self.assertEqual(_KEYWORD_PATTERN.findall(value), value.split())
+    def __init__(self, path, interval=5.0, compact=False):
+        """Watch the catalog file at path without loading it yet.
 
-    def test_PLU_MAP(self):
-        """Test the dictionary mapping a PLU code to its description."""
-        self.assertIsInstance(_PLU_MAP, dict)
-        for code, description in _PLU_MAP.items():
-            self.assertIsInstance(code, str)
-            self.assertTrue(code.isdigit())
-            self.assertEqual(len(code), 4)
-            self.assertTrue(code.startswith(('3', '4')))
-            self.assertEqual(code.strip().lower(), code)
+        Args:
+            path: String path of the catalog file, see read_catalog().
+            interval: Optional float minimum number of seconds between
+                checks. Defaults to 5.0.
+            compact: Optional boolean flag indicating whether to install
+                the file with set_catalog(), memory-mapping binary catalog
+                files, instead of indexing it with update_catalog().
+                Defaults to False.
+        """
+        if not isinstance(path, str):
+            raise TypeError('path must be a string path.')
+        if (not isinstance(interval, (int, float))) or isinstance(interval,
+                                                                   bool):
+            raise TypeError('interval must be a non-negative number.')
+        if interval < 0:
+            raise ValueError('interval must be a non-negative number.')
+        if not isinstance(compact, bool):
+            raise TypeError('compact must be a boolean.')
+        self.path = path
+        self.interval = interval
+        self.compact = compact
+        self.mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def due(self):
+        """Return whether check() would look at the catalog file now.
+
+        Returns:
+            Boolean flag indicating whether interval has elapsed since the
+            last check.
+        """
+        return time.monotonic() >= self._next_check
+
+    def check(self):
+        """Reload the catalog file if it changed since it was loaded.
+
+        Requests made while another thread is checking or reloading carry on
+        with the current catalog instead of waiting. A file that cannot be
+        loaded is reported on stderr and the current catalog is kept until
+        the file changes again.
+
+        Returns:
+            CatalogDiff of the applied changes, or None if the file was not
+            reloaded.
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._next_check = now + self.interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                # Keep the current catalog while the file is missing
+                return None
+            if mtime == self.mtime:
+                return None
+            try:
+                return self._reload(mtime)
+            except (OSError, ValueError) as error:
+                print('Could not reload {0}: {1}'.format(self.path, error),
+                      file=sys.stderr)
+                self.mtime = mtime
+                return None
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """Reload the catalog file unconditionally.
+
+        Returns:
+            CatalogDiff of the applied changes.
+        """
+        with self._lock:
+            return self._reload(os.stat(self.path).st_mtime_ns)
+
+    def _reload(self, mtime):
+        """Reload the catalog file with modification time mtime."""
+        extension = os.path.splitext(self.path)[1].lower()
+        if not self.compact:
+            diff = update_catalog(read_catalog(self.path))
+        elif extension in ['.csv', '.jsonl']:
+            diff = set_catalog(
+                CompactCatalog.from_map(dict(read_catalog(self.path))))
+        else:
+            diff = set_catalog(load_catalog(self.path))
+        self.mtime = mtime
+        return diff
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+"""Named tuple of get_code result cache statistics."""
+
+class _LRUCache(object):
+    """Thread-safe least recently used cache with statistics.
+
+    Attributes:
+        maxsize: Integer maximum number of entries, 0 disables the cache.
+        hits: Integer number of lookups that found an entry.
+        misses: Integer number of lookups that did not find an entry.
+        evictions: Integer number of entries evicted to respect maxsize.
+    """
+
+    def __init__(self, maxsize):
+        """Create an empty cache.
+
+        Args:
+            maxsize: Integer maximum number of entries, 0 disables the cache.
+        """
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.maxsize = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.resize(maxsize)
+
+    def get(self, key):
+        """Return the value cached for key, or None if there is none.
+
+        Args:
+            key: Hashable key.
+        Returns:
+            Cached value or None.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Cache value for key, evicting the least recently used entries.
+
+        Args:
+            key: Hashable key.
+            value: Value other than None.
+        """
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize):
+        """Change the maximum number of entries.
+
+        Args:
+            maxsize: Integer maximum number of entries, 0 disables the cache.
+        """
+        if (not isinstance(maxsize, int)) or isinstance(maxsize, bool):
+            raise TypeError('maxsize must be a non-negative integer.')
+        if maxsize < 0:
+            raise ValueError('maxsize must be a non-negative integer.')
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def _evict(self):
+        """Evict the least recently used entries beyond maxsize."""
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def info(self):
+        """Return a CacheInfo of the cache statistics."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._entries))
+
+_CODE_CACHE = _LRUCache(1024)
+"""_LRUCache of get_code results keyed by normalized keywords."""
+
+def cache_info():
+    """Return a CacheInfo of the get_code result cache statistics."""
+    return _CODE_CACHE.info()
+
+def cache_clear():
+    """Remove every cached get_code result and reset the statistics."""
+    _CODE_CACHE.clear()
+
+def set_cache_size(maxsize):
+    """Change the maximum number of cached get_code results.
+
+    Args:
+        maxsize: Integer maximum number of results, 0 disables the cache.
+    """
+    _CODE_CACHE.resize(maxsize)
+
+def _normalize_keywords(keywords, normalized=None):
+    """Return the normalized form of keywords.
+
+    Args:
+        keywords: List of string keywords describing the PLU code.
+        normalized: Optional dictionary mapping a string keyword to its
+            normalized form, shared between calls to skip repeated work.
+            Defaults to None which normalizes every keyword.
+    Returns:
+        Tuple of (frozenset of non-empty lowercase string keywords other than
+        "organic", boolean flag indicating whether "organic" was a keyword).
+    """
+    if normalized is None:
+        normalized = {}
+    keyword_set = set()
+    for keyword in keywords:
+        if not isinstance(keyword, str):
+            continue
+        if keyword not in normalized:
+            normalized[keyword] = keyword.strip().lower()
+        keyword_set.add(normalized[keyword])
+    keyword_set.discard('')
+    is_organic = False
+    if 'organic' in keyword_set:
+        is_organic = True
+        keyword_set.remove('organic')
+    return (frozenset(keyword_set), is_organic)
+
+def get_code(keywords, stem=False):
+    """Return a list of string numeric PLU codes matching keywords.
+
+    Args:
+        keywords: List of string keywords describing the PLU code.
+        stem: Optional boolean flag indicating whether to match whole words
+            regardless of plurals.
+            Defaults to False which matches substrings.
+    Returns:
+        List of string numeric PLU codes matching keywords in ascending order.
+    """
+    return _get_index().get_code(keywords, stem)
+
+def get_codes_many(queries):
+    """Return a list of the PLU codes matching each query.
+
+    Keywords are normalized once across all queries and each distinct
+    normalized query is only matched once.
+
+    Args:
+        queries: Iterable of lists of string keywords describing PLU codes.
+    Returns:
+        List of lists of string numeric PLU codes in ascending order, one per
+        query in the order of queries.
+    """
+    return _get_index().get_codes_many(queries)
+
+def search(keywords, limit=10):
+    """Return the most relevant PLU codes matching keywords.
+
+    Args:
+        keywords: List of string keywords describing the PLU code.
+        limit: Optional integer maximum number of codes to return.
+            Defaults to 10.
+    Returns:
+        List of string numeric PLU codes, most relevant first.
+    """
+    return _get_index().search(keywords, limit)
+
+def rank(codes, keywords, limit=10):
+    """Return the most relevant of the PLU codes found for keywords.
+
+    Args:
+        codes: List of string numeric PLU codes found for keywords.
+        keywords: List of string keywords describing the PLU code.
+        limit: Optional integer maximum number of codes to return.
+            Defaults to 10.
+    Returns:
+        List of string numeric PLU codes, most relevant first.
+    """
+    return _get_index().rank(codes, keywords, limit)
+
+def correct(keyword):
+    """Return the word of a description closest to a misspelled keyword.
+
+    Args:
+        keyword: String lowercase keyword.
+    Returns:
+        String word, or None when no word is close enough.
+    """
+    return _get_index().correct(keyword)
+
+def sounds_like(keyword):
+    """Return the word of a description sounding most like a misheard keyword.
+
+    Args:
+        keyword: String lowercase keyword.
+    Returns:
+        String word, or None when no word sounds alike.
+    """
+    return _get_index().sounds_like(keyword)
+
+def get_code_fuzzy(keywords):
+    """Return a list of string numeric PLU codes matching keywords or, if
+    there are none, matching keywords with their typos corrected.
+
+    Args:
+        keywords: List of string keywords describing the PLU code.
+    Returns:
+        List of string numeric PLU codes matching keywords in ascending order.
+    """
+    return _get_index().get_code_fuzzy(keywords)
+
+def get_code_range(first, last, organic=False):
+    """Return the PLU codes from first to last.
+
+    Args:
+        first: String 4 digit PLU code beginning the range.
+        last: String 4 digit PLU code ending the range, included.
+        organic: Optional boolean flag indicating whether to return organic
+            codes.
+            Defaults to False.
+    Returns:
+        List of string numeric PLU codes in ascending order.
+    """
+    return _get_index().get_code_range(first, last, organic)
+
+def get_code_prefix(prefix, organic=False):
+    """Return the PLU codes beginning with prefix.
+
+    Args:
+        prefix: String of up to 4 digits.
+        organic: Optional boolean flag indicating whether to return organic
+            codes.
+            Defaults to False.
+    Returns:
+        List of string numeric PLU codes in ascending order.
+    """
+    return _get_index().get_code_prefix(prefix, organic)
+
+def complete(prefix, limit=10):
+    """Return the words or PLU codes beginning with prefix.
+
+    Args:
+        prefix: String beginning of a word, or of a PLU code when it only has
+            digits.
+        limit: Optional integer maximum number of completions to return.
+            Defaults to 10.
+    Returns:
+        List of string words of descriptions or string numeric PLU codes in
+        ascending order.
+    """
+    return _get_index().complete(prefix, limit)
+
+def _sanitize_code(code):
+    """Return code with non-digit characters removed.
+
+    Args:
+        code: String containing digit and other characters.
+    Returns:
+        String containing only digit characters.
+    """
+    if not isinstance(code, str):
+        raise TypeError('code must be a string.')
+    # str.isdecimal() accepts the same characters as \d
+    if code.isdecimal():
+        return code
+    # Spoken codes are commonly transcribed with spaces between digits
+    code = code.replace(' ', '')
+    if code.isdecimal():
+        return code
+    return _NON_DIGIT_PATTERN.sub('', code)
+
+def parse_spoken_code(text):
+    """Return the digits of a PLU code spoken in text.
+
+    Digits and number words are read in a single pass over the words of
+    text, so "nine four oh one one" is "94011" and "forty-eleven" is "4011".
+    Scale words add up like ordinary numbers, so "four thousand eleven" is
+    "4011", and "double" or "triple" repeat the following digit. Other words
+    and non-digit characters are ignored.
+
+    Args:
+        text: String PLU code as spoken.
+    Returns:
+        String containing only digit characters, empty when text has more
+        than _SPOKEN_MAX_DIGITS digits.
+    """
+    if not isinstance(text, str):
+        raise TypeError('text must be a string.')
+    if text.isdecimal():
+        if len(text) > _SPOKEN_MAX_DIGITS:
+            return ''
+        return text
+
+    groups = []
+    # Tens word waiting for an optional ones word, as in "forty one"
+    tens = None
+    # Running total and current value after a scale word, otherwise None
+    total = None
+    current = 0
+    repeat = 1
+    for word in text.lower().translate(_SPOKEN_SEPARATORS).split():
+        # Every group has at least 1 digit
+        if len(groups) > _SPOKEN_MAX_DIGITS:
+            return ''
+        value = _SPOKEN_NUMBERS.get(word)
+        if value is not None:
+            if total is not None:
+                if (((value < 10) and (current % 10 == 0)) or
+                    ((value >= 10) and (current % 100 == 0))):
+                    current += value
+                    continue
+                groups.append(str(total + current))
+                total = None
+            if value < 10:
+                if (tens is not None) and (repeat == 1):
+                    groups.append(str(tens + value))
+                    tens = None
+                else:
+                    if tens is not None:
+                        groups.append(str(tens))
+                        tens = None
+                    groups.append(str(value) * repeat)
+            else:
+                if tens is not None:
+                    groups.append(str(tens))
+                    tens = None
+                if value < 20:
+                    groups.append(str(value))
+                else:
+                    tens = value
+            repeat = 1
+        elif word in _SPOKEN_SCALES:
+            scale = _SPOKEN_SCALES[word]
+            if total is None:
+                if tens is not None:
+                    groups.append(str(tens))
+                    tens = None
+                # The scale applies to the number spoken before it
+                total = 0
+                current = int(groups.pop()) if len(groups) > 0 else 0
+            if scale < 1000:
+                current = (current or 1) * scale
+            else:
+                total = ((total + current) or 1) * scale
+                current = 0
+            if total + current >= 10 ** _SPOKEN_MAX_DIGITS:
+                return ''
+            repeat = 1
+        elif word in _SPOKEN_REPEATS:
+            repeat = _SPOKEN_REPEATS[word]
+        else:
+            digits = _sanitize_code(word)
+            if len(digits) > _SPOKEN_MAX_DIGITS:
+                return ''
+            if len(digits) > 0:
+                if tens is not None:
+                    groups.append(str(tens))
+                    tens = None
+                if total is not None:
+                    groups.append(str(total + current))
+                    total = None
+                groups.append(digits)
+                repeat = 1
+    if tens is not None:
+        groups.append(str(tens))
+    if total is not None:
+        groups.append(str(total + current))
+    code = ''.join(groups)
+    if len(code) > _SPOKEN_MAX_DIGITS:
+        return ''
+    return code
+
+def _benchmark_sanitize_code(number=100000):
+    """Print the time _sanitize_code takes against an uncompiled re.sub.
+
+    Args:
+        number: Optional integer number of calls to time per example.
+            Defaults to 100000.
+    """
+    import timeit
+
+    def reference(code):
+        return re.sub(r'[^\d]', '', code)
+
+    for value in _CODE_EXAMPLES + [' 4011 ', '4011.', '#4011']:
+        if reference(value) != _sanitize_code(value):
+            raise AssertionError(
+                '_sanitize_code({0!r}) differs from re.sub.'.format(value))
+        before = timeit.timeit(lambda: reference(value), number=number)
+        after = timeit.timeit(lambda: _sanitize_code(value), number=number)
+        print('{0!r:>26}: {1:6.0f} ns -> {2:6.0f} ns ({3:.1f}x)'.format(
+            value, before / number * 1e9, after / number * 1e9,
+            before / after))
+
+def get_description(code):
+    """Return the description for code.
+
+    Args:
+        code: String numeric PLU code.
+    Returns:
+        String description for code.
+    """
+    return _get_index().get_description(code)
+
+def get_descriptions_many(codes):
+    """Return a list of the description for each code.
+
+    Each distinct code is only sanitized and looked up once.
+
+    Args:
+        codes: Iterable of string numeric PLU codes.
+    Returns:
+        List of string descriptions, one per code in the order of codes.
+    """
+    return _get_index().get_descriptions_many(codes)
+
+_CATALOG_MAGIC = b'PLUC'
+"""Bytes identifying a binary catalog file."""
+
+_CATALOG_VERSION = 1
+"""Integer version of the binary catalog file format."""
+
+_CATALOG_SECTIONS = [
+    ('codes', 'H'),
+    ('description_offsets', 'I'),
+    ('descriptions', 'B'),
+    ('token_offsets', 'I'),
+    ('tokens', 'B'),
+    ('posting_offsets', 'I'),
+    ('postings', 'I')
+]
+"""List of (CompactCatalog attribute, array type code) tuples in file order."""
+
+_CATALOG_HEADER = struct.Struct('<4sHH' + 'II' * len(_CATALOG_SECTIONS))
+"""Struct of the binary catalog header.
+
+The header holds the magic bytes, the format version, 2 reserved bytes, and
+the offset and length in bytes of each section. Sections follow the header
+as little-endian arrays aligned to 4 bytes.
+"""
+
+class CompactCatalog(_Catalog):
+    """PLU codes and descriptions packed into arrays and byte strings.
+
+    A CompactCatalog holds the same information as a dictionary like
+    _PLU_MAP in a few contiguous buffers instead of two Python strings per
+    code, so memory stays flat as the catalog grows. It answers the same
+    queries as an _Index without building one, so set_catalog() can make
+    this module search it.
+
+    Attributes:
+        codes: Sorted sequence of integer PLU codes.
+        description_offsets: Sequence of integer offsets into descriptions,
+            where the description of codes[i] spans description_offsets[i]
+            to description_offsets[i + 1].
+        descriptions: Bytes-like UTF-8 descriptions in the order of codes.
+        token_offsets: Sequence of integer offsets into tokens, where token
+            i spans token_offsets[i] to token_offsets[i + 1] including a
+            trailing newline.
+        tokens: Bytes of the sorted UTF-8 description tokens, each followed
+            by a newline.
+        posting_offsets: Sequence of integer offsets into postings, where
+            the postings of token i span posting_offsets[i] to
+            posting_offsets[i + 1].
+        postings: Sequence of integer indexes into codes of the codes whose
+            description contains each token, in ascending order per token.
+    """
+
+    def __init__(self, codes, description_offsets, descriptions,
+                 token_offsets, tokens, posting_offsets, postings):
+        """Create a catalog from its buffers.
+
+        Any buffers supporting len() and indexing, such as arrays or
+        memoryviews, can back a catalog. tokens must support find().
+        """
+        if len(description_offsets) != len(codes) + 1:
+            raise ValueError('description_offsets must have one more '
+                             'entry than codes.')
+        if len(posting_offsets) != len(token_offsets):
+            raise ValueError('posting_offsets must have as many entries as '
+                             'token_offsets.')
+        self.codes = codes
+        self.description_offsets = description_offsets
+        self.descriptions = descriptions
+        self.token_offsets = token_offsets
+        self.tokens = tokens
+        self.posting_offsets = posting_offsets
+        self.postings = postings
+        self._version = None
+
+    @classmethod
+    def from_map(cls, plu_map):
+        """Return a CompactCatalog holding plu_map.
+
+        Args:
+            plu_map: Dictionary mapping a string 4 digit PLU code to a string
+                description.
+        Returns:
+            CompactCatalog.
+        """
+        if not isinstance(plu_map, dict):
+            raise TypeError('plu_map must be a dictionary.')
+        codes = array.array('H')
+        description_offsets = array.array('I', [0])
+        descriptions = bytearray()
+        token_codes = {}
+        for i, code in enumerate(sorted(plu_map.keys())):
+            if ((not isinstance(code, str)) or (not code.isdigit()) or
+                (len(code) != 4)):
+                raise ValueError('PLU codes must be 4 digit strings.')
+            description = plu_map[code]
+            codes.append(int(code))
+            descriptions.extend(description.encode('utf-8'))
+            description_offsets.append(len(descriptions))
+            for token in set(_KEYWORD_PATTERN.findall(description)):
+                token_codes.setdefault(token, []).append(i)
+
+        token_offsets = array.array('I', [0])
+        tokens = bytearray()
+        posting_offsets = array.array('I', [0])
+        postings = array.array('I')
+        for token in sorted(token_codes.keys()):
+            tokens.extend(token.encode('utf-8'))
+            tokens.append(ord('\n'))
+            token_offsets.append(len(tokens))
+            postings.extend(token_codes[token])
+            posting_offsets.append(len(postings))
+        return cls(codes, description_offsets, bytes(descriptions),
+                   token_offsets, bytes(tokens), posting_offsets, postings)
+
+    def __len__(self):
+        """Return the integer number of PLU codes."""
+        return len(self.codes)
+
+    def _description(self, i):
+        """Return the string description of codes[i]."""
+        return str(self.descriptions[self.description_offsets[i]:
+                                     self.description_offsets[i + 1]],
+                   'utf-8')
+
+    def items(self):
+        """Yield (string PLU code, string description) tuples in code order."""
+        for i, code in enumerate(self.codes):
+            yield ('{0:04d}'.format(code), self._description(i))
+
+    def to_map(self):
+        """Return a dictionary mapping string PLU codes to descriptions."""
+        return dict(self.items())
+
+    def get_description(self, code):
+        """Return the description for code.
+
+        Args:
+            code: String numeric PLU code.
+        Returns:
+            String description for code.
+        """
+        code = _sanitize_code(code)
+        length = len(code)
+        if (length < 4) or (length > 5):
+            return ''
+        is_organic = (length == 5) and code.startswith('9')
+        value = int(code[-4:])
+        i = bisect.bisect_left(self.codes, value)
+        if (i >= len(self.codes)) or (self.codes[i] != value):
+            return ''
+        if is_organic:
+            return _organic_description(self._description(i))
+        return self._description(i)
+
+    def _find_postings(self, keyword, limit=None):
+        """Return the postings ranges of the tokens containing keyword.
+
+        Args:
+            keyword: String keyword matching _KEYWORD_PATTERN.
+            limit: Optional integer total number of postings at which to stop.
+                Defaults to None which is no limit.
+        Returns:
+            List of (start, end) integer ranges into postings, or None when
+            the total number of postings reaches limit.
+        """
+        needle = keyword.encode('utf-8')
+        tokens = self.tokens
+        token_offsets = self.token_offsets
+        posting_offsets = self.posting_offsets
+        ranges = []
+        count = 0
+        start = tokens.find(needle)
+        while start >= 0:
+            i = bisect.bisect_right(token_offsets, start) - 1
+            posting_range = (posting_offsets[i], posting_offsets[i + 1])
+            ranges.append(posting_range)
+            count += posting_range[1] - posting_range[0]
+            if (limit is not None) and (count >= limit):
+                return None
+            # Resume after the matched token so it is only counted once
+            start = tokens.find(needle, token_offsets[i + 1])
+        return ranges
+
+    def find_postings(self, keyword, limit=None):
+        """Return the postings of the tokens containing keyword.
+
+        Args:
+            keyword: String keyword matching _KEYWORD_PATTERN.
+            limit: Optional integer total number of postings at which to stop.
+                Defaults to None which is no limit.
+        Returns:
+            List of sorted tuples of string numeric PLU codes, one per token
+            containing keyword, or None when the total number of postings
+            reaches limit.
+        """
+        ranges = self._find_postings(keyword, limit)
+        if ranges is None:
+            return None
+        return [tuple([self._code(i) for i in self.postings[start:end]])
+                for start, end in ranges]
+
+    def match(self, keyword_set):
+        """Return a list of string numeric PLU codes matching keyword_set.
+
+        A code matches when every keyword is a substring of its description.
+        Keywords that are single tokens are answered by the postings of the
+        tokens containing them, found by searching the token bytes. Other
+        keywords are verified against the surviving descriptions.
+
+        Args:
+            keyword_set: Set of non-empty lowercase string keywords.
+        Returns:
+            List of string numeric PLU codes in ascending order.
+        """
+        return sorted(self._match(keyword_set))
+
+    def _match(self, keyword_set):
+        """Return the string numeric PLU codes matching keyword_set.
+
+        Args:
+            keyword_set: Set of non-empty lowercase string keywords.
+        Returns:
+            Iterable of string numeric PLU codes in no particular order, for
+            callers ordering them another way.
+        """
+        postings = self.postings
+        limit = len(self.codes)
+        selective = []
+        remaining = []
+        for keyword in keyword_set:
+            if (len(keyword) < 2) or (not _KEYWORD_PATTERN.fullmatch(keyword)):
+                remaining.append(keyword)
+                continue
+            ranges = self._find_postings(keyword, limit)
+            if ranges is None:
+                remaining.append(keyword)
+                continue
+            count = sum([end - start for start, end in ranges])
+            if count <= 0:
+                return []
+            selective.append((count, ranges))
+
+        # Intersect from the rarest keyword up
+        selective.sort(key=lambda t: t[0])
+        candidates = None
+        for count, ranges in selective:
+            matches = set()
+            for start, end in ranges:
+                matches.update(postings[start:end])
+            if candidates is None:
+                candidates = matches
+            else:
+                candidates.intersection_update(matches)
+            if len(candidates) <= 0:
+                return []
+        if candidates is None:
+            candidates = range(len(self.codes))
+
+        matches = []
+        for i in candidates:
+            if len(remaining) > 0:
+                description = self._description(i)
+                for keyword in remaining:
+                    if keyword not in description:
+                        break
+                else:
+                    matches.append(self._code(i))
+            else:
+                matches.append(self._code(i))
+        return matches
+
+    def match_stems(self, keyword_set):
+        """Return a list of string numeric PLU codes matching keyword_set
+        by whole words, regardless of plurals.
+
+        A code matches when every token of every keyword has the stem of a
+        token of its description. Singular and plural tokens only differ in
+        their last 2 characters, so the tokens with a stem are among the
+        few beginning with the rest of it.
+
+        Args:
+            keyword_set: Set of non-empty lowercase string keywords.
+        Returns:
+            List of string numeric PLU codes in ascending order.
+        """
+        postings = self.postings
+        posting_offsets = self.posting_offsets
+        posting_sets = []
+        for keyword in keyword_set:
+            for token in _KEYWORD_PATTERN.findall(keyword):
+                stem = _stem(token)
+                if len(stem) >= _STEM_MIN_LENGTH:
+                    prefix = stem[:len(stem) - 2]
+                else:
+                    prefix = stem
+                matches = set()
+                for i in self._find_tokens(prefix):
+                    if _stem(self._token(i)) == stem:
+                        matches.update(postings[posting_offsets[i]:
+                                                posting_offsets[i + 1]])
+                if len(matches) <= 0:
+                    return []
+                posting_sets.append(matches)
+        if len(posting_sets) <= 0:
+            return []
+
+        # Intersect from the rarest stem up
+        posting_sets.sort(key=len)
+        candidates = posting_sets[0]
+        for matches in posting_sets[1:]:
+            candidates.intersection_update(matches)
+            if len(candidates) <= 0:
+                return []
+        return [self._code(i) for i in sorted(candidates)]
+
+    def correct(self, keyword):
+        """Return the token closest to a misspelled keyword.
+
+        There is no dictionary of deletions, so keyword is compared to every
+        token with a length and letters within the tolerated number of typos.
+
+        Args:
+            keyword: String lowercase keyword.
+        Returns:
+            String token with the fewest typos from keyword, the most PLU
+            codes, then first in alphabetical order, or None when no token
+            is close enough.
+        """
+        if not isinstance(keyword, str):
+            raise TypeError('keyword must be a string.')
+        distance = _fuzzy_distance(keyword)
+        if distance <= 0:
+            return None
+        if self._has_token(keyword):
+            return keyword
+
+        best = None
+        letters = set(keyword)
+        for i in range(len(self.token_offsets) - 1):
+            token = self._token(i)
+            # A typo adds or removes at most 2 distinct letters
+            if ((abs(len(token) - len(keyword)) > distance) or
+                (len(letters.symmetric_difference(token)) > 2 * distance)):
+                continue
+            typos = _edit_distance(keyword, token)
+            if typos > distance:
+                continue
+            count = self.posting_offsets[i + 1] - self.posting_offsets[i]
+            key = (typos, -count, token)
+            if (best is None) or (key < best):
+                best = key
+        if best is None:
+            return None
+        return best[2]
+
+    def sounds_like(self, keyword):
+        """Return the token sounding most like a misheard keyword.
+
+        Args:
+            keyword: String lowercase keyword.
+        Returns:
+            String token with the same phonetic key as keyword and typos in
+            at most half of its letters, with the fewest typos, the most PLU
+            codes, then first in alphabetical order, or None when no token
+            sounds alike.
+        """
+        if not isinstance(keyword, str):
+            raise TypeError('keyword must be a string.')
+        if len(keyword) < _PHONETIC_MIN_LENGTH:
+            return None
+        if self._has_token(keyword):
+            return keyword
+        phonetic_key = _phonetic_key(keyword)
+        best = None
+        for i in range(len(self.token_offsets) - 1):
+            token = self._token(i)
+            if _phonetic_key(token) != phonetic_key:
+                continue
+            typos = _edit_distance(keyword, token)
+            # Vowels are not part of the key, so too many typos means
+            # another word with the same consonants
+            if typos * 2 > len(keyword):
+                continue
+            count = self.posting_offsets[i + 1] - self.posting_offsets[i]
+            key = (typos, -count, token)
+            if (best is None) or (key < best):
+                best = key
+        if best is None:
+            return None
+        return best[2]
+
+    def version(self):
+        """Return a string identifying the contents of the catalog.
+
+        Returns:
+            String hexadecimal digest equal to the version() of an _Index
+            of the same dictionary.
+        """
+        if self._version is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for code, description in self.items():
+                digest.update(code.encode('utf-8') + b'\x00')
+                digest.update(_fingerprint(description))
+            self._version = digest.hexdigest()
+        return self._version
+
+    def _code(self, i):
+        """Return the string 4 digit PLU code codes[i]."""
+        return '{0:04d}'.format(self.codes[i])
+
+    def _token(self, i):
+        """Return the string token i without its trailing newline."""
+        return str(self.tokens[self.token_offsets[i]:
+                               self.token_offsets[i + 1] - 1], 'utf-8')
+
+    def _find_tokens(self, prefix):
+        """Yield the integer indexes of the tokens beginning with prefix."""
+        needle = prefix.encode('utf-8')
+        tokens = self.tokens
+        token_offsets = self.token_offsets
+        count = len(token_offsets) - 1
+        # Binary search the first token not before prefix
+        low = 0
+        high = count
+        while low < high:
+            middle = (low + high) // 2
+            if tokens[token_offsets[middle]:
+                      token_offsets[middle + 1] - 1] < needle:
+                low = middle + 1
+            else:
+                high = middle
+        while (low < count) and tokens.startswith(needle, token_offsets[low]):
+            yield low
+            low += 1
+
+    def _has_token(self, token):
+        """Return whether token is one of the tokens."""
+        for i in self._find_tokens(token):
+            return self._token(i) == token
+        return False
+
+    def _words(self, code):
+        """Return the tuple of the string words of the description of code."""
+        i = bisect.bisect_left(self.codes, int(code))
+        return tuple(self._description(i).split())
+
+    def _get_code_range(self, first, last):
+        """Return the list of the 4 digit PLU codes from first to last."""
+        return [self._code(i)
+                for i in range(bisect.bisect_left(self.codes, int(first)),
+                               bisect.bisect_right(self.codes, int(last)))]
+
+    def _complete(self, prefix, limit):
+        """Return up to limit of the tokens or codes beginning with prefix."""
+        if prefix.isdecimal():
+            if (len(prefix) > 4) or (not prefix.isascii()):
+                return []
+            codes = self._get_code_range(prefix.ljust(4, '0'),
+                                         prefix.ljust(4, '9'))
+            return codes[:limit]
+        completions = []
+        for i in self._find_tokens(prefix):
+            if len(completions) >= limit:
+                break
+            completions.append(self._token(i))
+        return completions
+
+def write_catalog(catalog, path):
+    """Write catalog to a binary catalog file at path.
+
+    The file is written next to path and then moved over it, so readers
+    never see a partially written catalog.
+
+    Args:
+        catalog: CompactCatalog or dictionary mapping a string 4 digit PLU
+            code to a string description.
+        path: String path of the binary catalog file.
+    """
+    if not isinstance(catalog, CompactCatalog):
+        catalog = CompactCatalog.from_map(catalog)
+    if not isinstance(path, str):
+        raise TypeError('path must be a string path.')
+
+    sections = []
+    for name, typecode in _CATALOG_SECTIONS:
+        data = array.array(typecode, getattr(catalog, name))
+        if sys.byteorder != 'little':
+            data.byteswap()
+        sections.append(data.tobytes())
+    descriptors = []
+    offset = _CATALOG_HEADER.size
+    for data in sections:
+        offset += -offset % 4
+        descriptors.extend([offset, len(data)])
+        offset += len(data)
+
+    def write(f):
+        f.write(_CATALOG_HEADER.pack(_CATALOG_MAGIC, _CATALOG_VERSION, 0,
+                                     *descriptors))
+        for data, offset in zip(sections, descriptors[::2]):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+
+    _replace_file(path, write, mode='wb')
+
+def _replace_file(path, write, **kwargs):
+    """Write a file next to path and then move it over path.
+
+    Readers never see a partially written file, and path is left untouched
+    if writing fails.
+
+    Args:
+        path: String path of the file to write.
+        write: Callable writing the contents to the file object it is
+            passed.
+        **kwargs: Keyword arguments of tempfile.NamedTemporaryFile opening
+            the file, such as mode and encoding.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False,
+                                     **kwargs) as f:
+        try:
+            write(f)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+
+def load_catalog(path):
+    """Return a CompactCatalog memory-mapping the binary catalog file at path.
+
+    The catalog reads the file in place, so only the pages that lookups
+    touch are loaded, except for the small token section which is copied.
+
+    Args:
+        path: String path of the binary catalog file.
+    Returns:
+        CompactCatalog.
+    """
+    if not isinstance(path, str):
+        raise TypeError(
+            'path must be a valid string path to a binary catalog file.')
+    if not os.path.isfile(path):
+        raise ValueError(
+            'path must be a valid string path to a binary catalog file.')
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _CATALOG_HEADER.size:
+            raise ValueError('{0} is not a binary catalog file.'.format(path))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = _CATALOG_HEADER.unpack_from(mapped)
+    if header[0] != _CATALOG_MAGIC:
+        raise ValueError('{0} is not a binary catalog file.'.format(path))
+    if header[1] != _CATALOG_VERSION:
+        raise ValueError('{0} has unsupported catalog version {1}.'.format(
+            path, header[1]))
+    view = memoryview(mapped)
+    buffers = []
+    for i, (name, typecode) in enumerate(_CATALOG_SECTIONS):
+        offset, length = header[3 + 2 * i:5 + 2 * i]
+        itemsize = array.array(typecode).itemsize
+        if (offset + length > len(mapped)) or (length % itemsize != 0):
+            raise ValueError('{0} has a truncated {1} section.'.format(
+                path, name))
+        section = view[offset:offset + length]
+        if name == 'tokens':
+            # CompactCatalog needs find()
+            buffers.append(section.tobytes())
+        elif sys.byteorder == 'little':
+            buffers.append(section.cast(typecode))
+        else:
+            data = array.array(typecode, section.tobytes())
+            data.byteswap()
+            buffers.append(data)
+    return CompactCatalog(*buffers)
+
+_OUTPUT_FORMATS = ['python', 'jsonl', 'catalog', 'map']
+"""List of string output formats of parse_csv()."""
+
+_OUTPUT_EXTENSIONS = {
+    '.bin': 'catalog',
+    '.jsonl': 'jsonl',
+    '.py': 'python'
+}
+"""Dictionary mapping a lowercase string file extension to the string output
+format of parse_csv() it implies."""
+
+def _get_output_format(output):
+    """Return the output format implied by the extension of output.
+
+    Args:
+        output: String path of the file to write, or None for stdout.
+    Returns:
+        String output format, "python" for stdout, or None when the
+        extension of output does not imply one.
+    """
+    if output is None:
+        return 'python'
+    return _OUTPUT_EXTENSIONS.get(os.path.splitext(output)[1].lower())
+
+_CSV_COLUMNS = ['PLU', 'COMMODITY', 'VARIETY', 'SIZE', 'AKA']
+"""List of string names of the columns read from a PLU code CSV text file."""
+
+def _parse_row(row):
+    """Return the (code, description) record of a PLU code CSV row.
+
+    Args:
+        row: Dictionary mapping a string CSV column name to a string value.
+    Returns:
+        Tuple of (string 4 digit PLU code, string description), or None if
+        the row does not describe a standard PLU code.
+    """
+    code = _sanitize_code(row.get('PLU'))
+    commodity = row.get('COMMODITY').strip().lower()
+    variety = row.get('VARIETY').strip().lower()
+    if 'retailer' in variety:
+        return None
+    size = row.get('SIZE').strip().lower()
+    aka = row.get('AKA').strip().lower()
+
+    if not code.isdigit():
+        return None
+    if len(code) != 4:
+        return None
+
+    columns = [_KEYWORD_PATTERN.finditer(variety),
+               _KEYWORD_PATTERN.finditer(aka),
+               _KEYWORD_PATTERN.finditer(commodity)]
+    if (len(size) > 0) and (not size.startswith('all')):
+        columns.insert(0, _KEYWORD_PATTERN.finditer(size))
+
+    keyword_list = []
+    keyword_set = set()
+    for iterator in columns:
+        for match in iterator:
+            keyword = match.group('keyword')
+            if (isinstance(keyword, str) and (len(keyword) > 0) and
+                (keyword not in keyword_set)):
+                keyword_list.append(keyword)
+                keyword_set.add(keyword)
+    return (code, ' '.join(keyword_list))
+
+def iter_csv(path, delimiter=','):
+    """Return an iterator of the records in the PLU code CSV text file at path.
+
+    Rows are read and normalized one at a time. Rows repeating a PLU code
+    are reported on stderr and skipped.
+
+    Args:
+        path: String path to the PLU code CSV text file.
+        delimiter: Optional string delimiter in the CSV text file.
+            Defaults to ",".
+    Returns:
+        Iterator of (string 4 digit PLU code, string description) tuples in
+        file order.
+    """
+    if not isinstance(path, str):
+        raise TypeError(
+            'path must be a valid string path to a CSV text file.')
+    if not os.path.isfile(path):
+        raise ValueError(
+            'path must be a valid string path to a CSV text file.')
+    if not isinstance(delimiter, str):
+        raise TypeError('delimiter must be an 1 character string.')
+    if len(delimiter) != 1:
+        raise ValueError('delimiter must be an 1 character string.')
+    return _iter_csv(path, delimiter)
+
+def _iter_rows(path, delimiter):
+    """Yield every record in the PLU code CSV text file at path."""
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f, delimiter=delimiter, restval='')
+        missing = [column for column in _CSV_COLUMNS
+                   if column not in (reader.fieldnames or [])]
+        if len(missing) > 0:
+            raise ValueError('{0} is missing the {1} columns.'.format(
+                path, ', '.join(missing)))
+        for row in reader:
+            record = _parse_row(row)
+            if record is not None:
+                yield record
+
+def _read_records(path, delimiter):
+    """Return a list of every record in the PLU code CSV text file at path."""
+    return list(_iter_rows(path, delimiter))
+
+def _iter_csv(path, delimiter):
+    """Yield the records in the PLU code CSV text file at path."""
+    codes = set()
+    for record in _iter_rows(path, delimiter):
+        if record[0] in codes:
+            print('PLU code {0} is already defined!'.format(record[0]),
+                  file=sys.stderr)
+            continue
+        codes.add(record[0])
+        yield record
+
+def write_python(records, f):
+    """Write records to f as the lines of a Python dictionary literal.
+
+    The lines are sorted by code, so records are buffered.
+
+    Args:
+        records: Iterable of (string PLU code, string description) tuples.
+        f: Text file object to write to.
+    """
+    for code, description in sorted(records):
+        # Use json to backslashreplace non-ASCII characters
+        f.write('    "{0}": {1},\n'.format(code, json.dumps(description)))
+
+def write_jsonl(records, f):
+    """Write records to f as JSON Lines, one record at a time.
+
+    Args:
+        records: Iterable of (string PLU code, string description) tuples.
+        f: Text file object to write to.
+    """
+    for code, description in records:
+        f.write(json.dumps({'code': code, 'description': description}))
+        f.write('\n')
+
+def parse_csv(path, delimiter=',', output=None, output_format='python'):
+    """Parse the PLU code CSV text file at path.
+
+    Args:
+        path: String path to the PLU code CSV text file.
+        delimiter: Optional string delimiter in the CSV text file.
+            Defaults to ",".
+        output: Optional string path of the file to write.
+            Defaults to None which writes to stdout.
+        output_format: Optional string format of the output, one of
+            "python" for the lines of a Python dictionary literal, "jsonl"
+            for JSON Lines, "catalog" for a binary catalog file, or "map"
+            to return a dictionary instead of writing anything.
+            Defaults to "python".
+    Returns:
+        Dictionary mapping a string PLU code to a string description when
+        output_format is "map", otherwise None.
+    """
+    if (output is not None) and (not isinstance(output, str)):
+        raise TypeError('output must be a string path.')
+    if not isinstance(output_format, str):
+        raise TypeError('output_format must be one of {0}.'.format(
+            ', '.join(_OUTPUT_FORMATS)))
+    if output_format not in _OUTPUT_FORMATS:
+        raise ValueError('output_format must be one of {0}.'.format(
+            ', '.join(_OUTPUT_FORMATS)))
+    if (output_format == 'catalog') and (output is None):
+        raise ValueError('output is required for the catalog format.')
+    return _write_records(iter_csv(path, delimiter), output, output_format)
+
+def _write_records(records, output, output_format):
+    """Write records in output_format to output.
+
+    Args:
+        records: Iterable of (string PLU code, string description) tuples.
+        output: String path of the file to write, or None for stdout.
+        output_format: String output format in _OUTPUT_FORMATS.
+    Returns:
+        Dictionary mapping a string PLU code to a string description when
+        output_format is "map", otherwise None.
+    """
+    if output_format == 'map':
+        return dict(records)
+    if output_format == 'catalog':
+        write_catalog(dict(records), output)
+        return None
+    sink = write_python if output_format == 'python' else write_jsonl
+    if output is None:
+        sink(records, sys.stdout)
+    else:
+        _replace_file(output, lambda f: sink(records, f), mode='w',
+                      encoding='utf-8', newline='\n')
+    return None
+
+Duplicate = collections.namedtuple('Duplicate', [
+    'code', 'kept_path', 'kept_description', 'path', 'description'])
+"""Named tuple of a PLU code record discarded in favor of the record kept in
+the merged dictionary."""
+
+_MERGE_POLICIES = ['first', 'last', 'error']
+"""List of string policies for merging records that repeat a PLU code."""
+
+def ingest_csv(paths, delimiter=',', policy='last', processes=None):
+    """Parse many PLU code CSV text files into a single dictionary.
+
+    The files are parsed in parallel worker processes, then merged in the
+    order of paths and of the rows within each file, so the result does not
+    depend on which worker finishes first.
+
+    Args:
+        paths: List of string paths to PLU code CSV text files, such as the
+            master list followed by regional and store overrides.
+        delimiter: Optional string delimiter in the CSV text files.
+            Defaults to ",".
+        policy: Optional string policy for records that repeat a PLU code:
+            "first" keeps the earliest record, "last" keeps the latest
+            record so later files override earlier ones, and "error" raises
+            ValueError when the descriptions differ.
+            Defaults to "last".
+        processes: Optional integer number of worker processes.
+            Defaults to None which uses the number of CPUs.
+    Returns:
+        Tuple of (dictionary mapping a string PLU code to a string
+        description, list of Duplicate in merge order).
+    """
+    if not isinstance(paths, list):
+        raise TypeError('paths must be a list of string paths.')
+    for path in paths:
+        if not isinstance(path, str):
+            raise TypeError(
+                'path must be a valid string path to a CSV text file.')
+        if not os.path.isfile(path):
+            raise ValueError(
+                'path must be a valid string path to a CSV text file.')
+    if not isinstance(delimiter, str):
+        raise TypeError('delimiter must be an 1 character string.')
+    if len(delimiter) != 1:
+        raise ValueError('delimiter must be an 1 character string.')
+    if not isinstance(policy, str):
+        raise TypeError('policy must be one of {0}.'.format(
+            ', '.join(_MERGE_POLICIES)))
+    if policy not in _MERGE_POLICIES:
+        raise ValueError('policy must be one of {0}.'.format(
+            ', '.join(_MERGE_POLICIES)))
+    if processes is not None:
+        if (not isinstance(processes, int)) or isinstance(processes, bool):
+            raise TypeError('processes must be a positive integer.')
+        if processes < 1:
+            raise ValueError('processes must be a positive integer.')
+
+    delimiters = [delimiter] * len(paths)
+    if (processes == 1) or (len(paths) <= 1):
+        results = map(_read_records, paths, delimiters)
+    else:
+        # Only needed here and slow to import
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_read_records, paths, delimiters))
+
+    plu_map = {}
+    sources = {}
+    duplicates = []
+    for path, records in zip(paths, results):
+        for code, description in records:
+            if code not in plu_map:
+                plu_map[code] = description
+                sources[code] = path
+                continue
+            if (policy == 'error') and (plu_map[code] != description):
+                raise ValueError(
+                    'PLU code {0} in {1} conflicts with {2}.'.format(
+                        code, path, sources[code]))
+            if policy == 'last':
+                # The kept record is only known once every file is merged
+                duplicates.append(Duplicate(code, None, None, sources[code],
+                                            plu_map[code]))
+                plu_map[code] = description
+                sources[code] = path
+            else:
+                duplicates.append(Duplicate(code, sources[code],
+                                            plu_map[code], path, description))
+    if policy == 'last':
+        duplicates = [
+            duplicate._replace(kept_path=sources[duplicate.code],
+                               kept_description=plu_map[duplicate.code])
+            for duplicate in duplicates]
+    return (plu_map, duplicates)
+
+
+class _UnitTest(unittest.TestCase):
+    def test_KEYWORD_PATTERN(self):
+        """Test the regular expression pattern pulling out keywords."""
+        for value in ['', '...', '---', '    ']:
+            self.assertIsNone(_KEYWORD_PATTERN.search(value))
+        for value, expected in [
+            ('foobar', ['foobar']),
+            ('foo bar', ['foo', 'bar']),
+            ('foo bar baz', ['foo', 'bar', 'baz']),
+            ("foo's bar", ["foo's", 'bar']),
+            ("d'estivale apples", ["d'estivale", 'apples']),
+            ('3-7 lbs', ['3', '7', 'lbs']),
+            ('3-pack (3 pints)', ['3', 'pack', '3', 'pints'])]:
+            self.assertEqual(_KEYWORD_PATTERN.findall(value), expected)
+        for value in _PLU_MAP.values():
+            self.assertEqual(_KEYWORD_PATTERN.findall(value), value.split())
+
+    def test_PLU_MAP(self):
+        """Test the dictionary mapping a PLU code to its description."""
+        self.assertIsInstance(_PLU_MAP, dict)
+        for code, description in _PLU_MAP.items():
+            self.assertIsInstance(code, str)
+            self.assertTrue(code.isdigit())
+            self.assertEqual(len(code), 4)
+            self.assertTrue(code.startswith(('3', '4')))
+            self.assertEqual(code.strip().lower(), code)
             self.assertIsInstance(description, str)
             self.assertGreater(len(description), 0)
             self.assertEqual(description.strip().lower(), description)
 
+    def test_Index(self):
+        """Test the indexes answering keyword queries."""
+        self.assertRaises(TypeError, _Index, None)
+        self.assertRaises(TypeError, _Index, [])
+        index = _Index({'1234': "foo's bar", '2345': 'bar baz'})
+        self.assertEqual(index.postings, {
+            "foo's": ('1234',), 'bar': ('1234', '2345'), 'baz': ('2345',)})
+        self.assertEqual(sorted(index.find_postings('ba')),
+                         [('1234', '2345'), ('2345',)])
+        self.assertEqual(index.find_postings("o's"), [('1234',)])
+        self.assertEqual(index.find_postings('qux'), [])
+        self.assertIsNone(index.find_postings('ba', 3))
+        self.assertEqual(len(index.find_postings('ba', 4)), 2)
+        self.assertEqual(index.trigrams['r b'], {'2345'})
+        self.assertEqual(index.find_candidates('bar'), {'1234', '2345'})
+        self.assertEqual(index.find_candidates('s bar'), {'1234'})
+        self.assertEqual(index.find_candidates('foo bar'), set())
+        self.assertEqual(index.find_candidates('qux'), set())
+        self.assertEqual(len(index.descriptions), 22)
+        self.assertEqual(index.descriptions['1234'], "foo's bar")
+        self.assertEqual(index.descriptions['01234'], "foo's bar")
+        self.assertEqual(index.descriptions['82345'], 'bar baz')
+        self.assertEqual(index.descriptions['92345'], 'organic bar baz')
+        self.assertEqual(_Index({'1234': 'napa'}).descriptions['91234'],
+                         'organic napa. Over 9000!')
+        self.assertEqual(index.match({'ar'}), ['1234', '2345'])
+        self.assertEqual(index.match({'s bar'}), ['1234'])
+        self.assertEqual(index.match({'r b'}), ['2345'])
+        self.assertEqual(index.match({' '}), ['1234', '2345'])
+        self.assertEqual(index.match({'bar', 'qux'}), [])
+        for keywords in [['app'], ['les', 'red'], ['red apples'], ['d a'],
+                         ["d'e"], ["'"], ['3-7'], ['e', 'a', 'o'],
+                         ['red app', 'gala'], ['s a'], ['es r', 'ed'],
+                         ['baby', 'white'], ['pear'], ['pea', 'cap']]:
+            keyword_set = set(keywords)
+            expected = sorted([code for code, description in _PLU_MAP.items()
+                               if all([keyword in description
+                                       for keyword in keyword_set])])
+            self.assertEqual(get_catalog().match(keyword_set), expected)
+
+    def test_diff_catalog(self):
+        """Test finding the changes between a catalog and new records."""
+        for value in [None, 42, []]:
+            self.assertRaises(TypeError, diff_catalog, value, [])
+        fingerprints = fingerprint_map({'1234': 'foo', '2345': 'bar'})
+        self.assertEqual(set(fingerprints), {'1234', '2345'})
+        self.assertNotEqual(fingerprints['1234'], fingerprints['2345'])
+        self.assertEqual(diff_catalog({}, []), CatalogDiff({}, {}, []))
+        self.assertEqual(
+            diff_catalog(fingerprints, [('1234', 'foo'), ('2345', 'bar')]),
+            CatalogDiff({}, {}, []))
+        self.assertEqual(
+            diff_catalog(fingerprints, iter([('3456', 'baz'),
+                                             ('1234', 'qux')])),
+            CatalogDiff({'3456': 'baz'}, {'1234': 'qux'}, ['2345']))
+
+    def test_Index_apply(self):
+        """Test patching the indexes in place."""
+        plu_map = {'1234': "foo's bar", '2345': 'bar baz', '3456': 'qux'}
+        index = _Index(plu_map)
+        self.assertRaises(ValueError, index.add, '1234', 'foo')
+        self.assertRaises(ValueError, index.remove, '4567')
+        records = [('1234', "foo's bar"), ('2345', 'barn owl'),
+                   ('4567', 'baz quux')]
+        diff = diff_catalog(index.fingerprints, records)
+        self.assertEqual(diff, CatalogDiff({'4567': 'baz quux'},
+                                           {'2345': 'barn owl'}, ['3456']))
+        index.apply(diff)
+        self.assertEqual(plu_map['3456'], 'qux')
+        expected = _Index(dict(records))
+        for name in ['plu_map', 'codes', 'tokens', 'postings', 'stems',
+                     'suffixes', 'trigrams', 'phonetics', 'descriptions',
+                     'fingerprints', 'deletions', 'longest', 'words']:
+            self.assertEqual(getattr(index, name), getattr(expected, name))
+
+        index = _Index(_PLU_MAP)
+        records = [(code, description)
+                   for code, description in _PLU_MAP.items()
+                   if code not in ['4011', '4552']]
+        records.append(('4600', 'baby white eggplant'))
+        records.append(('3999', 'test napa'))
+        index.apply(diff_catalog(index.fingerprints, records))
+        expected = _Index(dict(records))
+        for name in ['plu_map', 'codes', 'tokens', 'postings', 'stems',
+                     'suffixes', 'trigrams', 'phonetics', 'descriptions',
+                     'fingerprints', 'deletions', 'longest', 'words']:
+            self.assertEqual(getattr(index, name), getattr(expected, name))
+
+        # Descriptions repeating a trigram
+        index = _Index({'1111': 'banana', '2222': 'apple'})
+        index.remove('1111')
+        self.assertEqual(index.trigrams, _Index({'2222': 'apple'}).trigrams)
+        index.add('1111', 'banana banana')
+        index.remove('2222')
+        self.assertEqual(index.trigrams,
+                         _Index({'1111': 'banana banana'}).trigrams)
+
+    def test_Index_updated(self):
+        """Test deriving patched indexes without touching the originals."""
+        index = _Index({'1234': "foo's bar", '2345': 'bar baz', '3456': 'qux'})
+        names = ['plu_map', 'codes', 'tokens', 'postings', 'stems',
+                 'suffixes', 'trigrams', 'phonetics', 'descriptions',
+                 'fingerprints', 'deletions', 'longest', 'words']
+        before = [repr(getattr(index, name)) for name in names]
+        for records in [[('1234', "foo's bar"), ('2345', 'bar baz'),
+                         ('3456', 'quux')],
+                        [('4567', 'baz quux')]]:
+            updated = index.updated(diff_catalog(index.fingerprints, records))
+            self.assertIsNot(updated, index)
+            expected = _Index(dict(records))
+            for name in names:
+                self.assertEqual(getattr(updated, name),
+                                 getattr(expected, name))
+            self.assertEqual([repr(getattr(index, name)) for name in names],
+                             before)
+
+    def test_Index_version(self):
+        """Test identifying the contents of the indexes."""
+        plu_map = {'1234': "foo's bar", '2345': 'bar baz'}
+        index = _Index(plu_map)
+        version = index.version()
+        self.assertRegex(version, '^[0-9a-f]{32}$')
+        self.assertEqual(index.version(), version)
+        reordered = dict(reversed(list(plu_map.items())))
+        self.assertEqual(_Index(reordered).version(), version)
+        self.assertEqual(index.copy().version(), version)
+        for value in [{'1234': "foo's bar"}, {'1234': 'foo bar',
+                                               '2345': 'bar baz'},
+                      {'1234': "foo's bar", '2345': 'bar baz', '3456': ''},
+                      {'123': "4foo's bar", '2345': 'bar baz'}]:
+            self.assertNotEqual(_Index(value).version(), version)
+
+        index.add('3456', 'qux')
+        self.assertNotEqual(index.version(), version)
+        self.assertEqual(index.version(),
+                         _Index(dict(index.plu_map)).version())
+        index.remove('3456')
+        self.assertEqual(index.version(), version)
+        updated = index.updated(CatalogDiff({}, {'2345': 'baz'}, []))
+        self.assertNotEqual(updated.version(), version)
+        self.assertEqual(index.version(), version)
+
+    def test_update_catalog(self):
+        """Test patching the catalog searched by this module."""
+        global _INDEX
+        index = _INDEX
+        try:
+            # Index the new catalog without indexing the built-in one first
+            _INDEX = None
+            records = list(_PLU_MAP.items()) + [('3999', 'test napa')]
+            self.assertEqual(update_catalog(records),
+                             CatalogDiff({'3999': 'test napa'}, {}, []))
+            self.assertEqual(get_catalog().plu_map, dict(records))
+            self.assertEqual(update_catalog(_PLU_MAP.items()),
+                             CatalogDiff({}, {}, ['3999']))
+            self.assertEqual(get_code(['napa']), ['4552'])
+            self.assertEqual(update_catalog(records),
+                             CatalogDiff({'3999': 'test napa'}, {}, []))
+            self.assertEqual(get_code(['napa']), ['3999', '4552'])
+            self.assertEqual(get_description('93999'),
+                             'organic test napa. Over 9000!')
+            catalog = get_catalog()
+            self.assertEqual(update_catalog(_PLU_MAP.items()),
+                             CatalogDiff({}, {}, ['3999']))
+            self.assertEqual(get_code(['napa']), ['4552'])
+            self.assertEqual(get_description('3999'), '')
+            self.assertIsNot(get_catalog(), catalog)
+            self.assertEqual(catalog.get_code(['napa']), ['3999', '4552'])
+            self.assertEqual(catalog.get_description('3999'), 'test napa')
+            self.assertEqual(update_catalog(_PLU_MAP.items()),
+                             CatalogDiff({}, {}, []))
+            catalog = get_catalog()
+            self.assertRaises(ValueError, update_catalog, [])
+            self.assertIs(get_catalog(), catalog)
+        finally:
+            _INDEX = index
+            cache_clear()
+
+    def test_set_catalog(self):
+        """Test searching a compact catalog from this module."""
+        for value in [None, _PLU_MAP, _Index(_PLU_MAP)]:
+            self.assertRaises(TypeError, set_catalog, value)
+        self.assertRaises(ValueError, set_catalog, CompactCatalog.from_map({}))
+
+        global _INDEX
+        index = _INDEX
+        try:
+            _INDEX = None
+            plu_map = dict(_PLU_MAP)
+            plu_map['3999'] = 'test napa'
+            catalog = CompactCatalog.from_map(plu_map)
+            self.assertEqual(set_catalog(catalog),
+                             CatalogDiff({'3999': 'test napa'}, {}, []))
+            self.assertIs(get_catalog(), catalog)
+            self.assertEqual(get_code(['napa']), ['3999', '4552'])
+            self.assertEqual(get_code(['napas'], stem=True), ['3999', '4552'])
+            self.assertEqual(get_code_fuzzy(['nappa']), ['3999', '4552'])
+            self.assertEqual(search(['napa']), ['3999', '4552'])
+            self.assertEqual(get_description('93999'),
+                             'organic test napa. Over 9000!')
+            self.assertEqual(complete('39'), ['3999'])
+            self.assertEqual(get_catalog().version(),
+                             _Index(plu_map).version())
+
+            self.assertRaises(ValueError, update_catalog, [])
+            self.assertIs(get_catalog(), catalog)
+            self.assertEqual(update_catalog(_PLU_MAP.items()),
+                             CatalogDiff({}, {}, ['3999']))
+            self.assertIsInstance(get_catalog(), _Index)
+            self.assertEqual(get_catalog().plu_map, _PLU_MAP)
+            self.assertEqual(get_code(['napa']), ['4552'])
+            self.assertEqual(catalog.get_code(['napa']), ['3999', '4552'])
+            self.assertEqual(set_catalog(catalog),
+                             CatalogDiff({'3999': 'test napa'}, {}, []))
+            self.assertEqual(get_code(['napa']), ['3999', '4552'])
+        finally:
+            _INDEX = index
+            cache_clear()
+
+    def test_get_catalog(self):
+        """Test the catalog searched by this module."""
+        global _INDEX
+        index = _INDEX
+        try:
+            _INDEX = None
+            catalog = get_catalog()
+            self.assertIsInstance(catalog, _Index)
+            self.assertEqual(catalog.plu_map, _PLU_MAP)
+            self.assertIs(get_catalog(), catalog)
+        finally:
+            _INDEX = index
+        catalog = get_catalog()
+        self.assertIs(catalog, _INDEX)
+        for code in ['4011', '94552', 'foobar']:
+            self.assertEqual(catalog.get_description(code),
+                             get_description(code))
+        for keywords in [['napa'], ['organic', 'white', 'baby'], []]:
+            self.assertEqual(catalog.get_code(keywords), get_code(keywords))
+        self.assertEqual(catalog.get_descriptions_many(['4011', '94552']),
+                         get_descriptions_many(['4011', '94552']))
+        self.assertEqual(catalog.get_codes_many([['napa'], ['foobar']]),
+                         get_codes_many([['napa'], ['foobar']]))
+
+    def test_read_catalog(self):
+        """Test reading the records of catalog files."""
+        for value in [None, 42, []]:
+            self.assertRaises(TypeError, read_catalog, value)
+        for value in ['', 'foobar', 'fo\u00f6b\u00e4r']:
+            self.assertRaises(ValueError, read_catalog, value)
+        records = [('4011', 'yellow cavendish bananas'),
+                   ('4552', 'napa chinese cabbage')]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plu.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write('PLU,COMMODITY,VARIETY,SIZE,AKA\n'
+                        '4011,Bananas,Yellow,,Cavendish\n'
+                        '4552,Cabbage,Napa,,Chinese\n')
+            self.assertEqual(list(read_catalog(path)), records)
+            path = os.path.join(directory, 'plu.JSONL')
+            with open(path, 'w', encoding='utf-8') as f:
+                write_jsonl(records, f)
+                f.write('\n')
+            self.assertEqual(list(read_catalog(path)), records)
+            path = os.path.join(directory, 'plu.bin')
+            write_catalog(dict(records), path)
+            self.assertEqual(list(read_catalog(path)), records)
+
+            path = os.path.join(directory, 'bad.csv')
+            for value in ['', 'PLU,COMMODITY,VARIETY\n4011,Bananas,Yellow\n']:
+                with open(path, 'w', encoding='utf-8', newline='') as f:
+                    f.write(value)
+                self.assertRaises(ValueError, list, read_catalog(path))
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write('PLU,COMMODITY,VARIETY,SIZE,AKA\n4011,Bananas\n')
+            self.assertEqual(list(read_catalog(path)), [('4011', 'bananas')])
+            path = os.path.join(directory, 'bad.jsonl')
+            for value in ['{"code": "4011"}', '{"code": "4011",',
+                          '["4011", "bananas"]',
+                          '{"code": 4011, "description": "bananas"}',
+                          '{"code": "banana", "description": "bananas"}',
+                          '{"code": "401", "description": "bananas"}',
+                          '{"code": "40111", "description": "bananas"}',
+                          '{"code": "\u0664011", "description": "bananas"}',
+                          '{"code": "4011", "description": "Bananas"}',
+                          '{"code": "4011", "description": " "}',
+                          '\xff']:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(value)
+                self.assertRaises(ValueError, list, read_catalog(path))
+
+    def test_CatalogWatcher(self):
+        """Test reloading the module catalog when its file changes."""
+        for value in [None, 42, []]:
+            self.assertRaises(TypeError, CatalogWatcher, value)
+        for value in [None, '1', True]:
+            self.assertRaises(TypeError, CatalogWatcher, 'plu.bin', value)
+        for value in [None, 1, 'yes']:
+            self.assertRaises(TypeError, CatalogWatcher, 'plu.bin', 0, value)
+        self.assertRaises(ValueError, CatalogWatcher, 'plu.bin', -1)
+
+        global _INDEX
+        index = _INDEX
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'plu.bin')
+                watcher = CatalogWatcher(path, 0)
+                self.assertIsNone(watcher.mtime)
+                self.assertIsNone(watcher.check())
+                self.assertRaises(OSError, watcher.reload)
+
+                write_catalog({'4011': 'bananas'}, path)
+                diff = watcher.check()
+                self.assertEqual(len(diff.removed), len(_PLU_MAP) - 1)
+                self.assertEqual(diff.changed, {'4011': 'bananas'})
+                self.assertEqual(watcher.mtime, os.stat(path).st_mtime_ns)
+                self.assertEqual(get_description('4011'), 'bananas')
+                self.assertEqual(get_code(['napa']), [])
+                self.assertIsNone(watcher.check())
+
+                write_catalog({'4011': 'bananas', '4552': 'napa'}, path)
+                os.utime(path, ns=(watcher.mtime + 1, watcher.mtime + 1))
+                self.assertEqual(watcher.check(),
+                                 CatalogDiff({'4552': 'napa'}, {}, []))
+                self.assertEqual(get_code(['napa']), ['4552'])
+                self.assertEqual(watcher.reload(), CatalogDiff({}, {}, []))
+
+                watcher = CatalogWatcher(path, 3600)
+                self.assertIsNotNone(watcher.check())
+                os.utime(path, ns=(watcher.mtime + 1, watcher.mtime + 1))
+                self.assertIsNone(watcher.check())
+
+                catalog = get_catalog()
+                for name, value in [('plu.jsonl', '{"code": "4011"}\n'),
+                                    ('plu.jsonl', '{"code": "banana", '
+                                                  '"description": "Yellow '
+                                                  'Bananas"}\n'),
+                                    ('plu.csv', 'PLU,COMMODITY\n'),
+                                    ('plu.csv', 'PLU,COMMODITY,VARIETY,SIZE,'
+                                                'AKA\n')]:
+                    path = os.path.join(directory, name)
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(value)
+                    watcher = CatalogWatcher(path, 0)
+                    stderr = sys.stderr
+                    try:
+                        sys.stderr = io.StringIO()
+                        self.assertIsNone(watcher.check())
+                        self.assertIn(path, sys.stderr.getvalue())
+                    finally:
+                        sys.stderr = stderr
+                    self.assertEqual(watcher.mtime,
+                                     os.stat(path).st_mtime_ns)
+                    self.assertIsNone(watcher.check())
+                    self.assertRaises(ValueError, watcher.reload)
+                    self.assertIs(get_catalog(), catalog)
+
+                # Serve the mapped file instead of indexing it
+                path = os.path.join(directory, 'plu.bin')
+                watcher = CatalogWatcher(path, 0, compact=True)
+                self.assertTrue(watcher.compact)
+                self.assertEqual(watcher.check(), CatalogDiff({}, {}, []))
+                catalog = get_catalog()
+                self.assertIsInstance(catalog, CompactCatalog)
+                self.assertEqual(catalog.to_map(),
+                                 {'4011': 'bananas', '4552': 'napa'})
+                self.assertEqual(get_code(['napa']), ['4552'])
+                self.assertEqual(get_code_fuzzy(['nappa']), ['4552'])
+                self.assertEqual(get_description('94011'), 'organic bananas')
+
+                write_catalog({}, path)
+                os.utime(path, ns=(watcher.mtime + 1, watcher.mtime + 1))
+                stderr = sys.stderr
+                try:
+                    sys.stderr = io.StringIO()
+                    self.assertIsNone(watcher.check())
+                    self.assertIn(path, sys.stderr.getvalue())
+                finally:
+                    sys.stderr = stderr
+                self.assertIs(get_catalog(), catalog)
+
+                path = os.path.join(directory, 'plu.jsonl')
+                with open(path, 'w', encoding='utf-8') as f:
+                    write_jsonl([('4011', 'bananas')], f)
+                watcher = CatalogWatcher(path, 0, compact=True)
+                self.assertEqual(watcher.check(),
+                                 CatalogDiff({}, {}, ['4552']))
+                self.assertIsInstance(get_catalog(), CompactCatalog)
+                self.assertEqual(get_code(['bananas']), ['4011'])
+        finally:
+            _INDEX = index
+            cache_clear()
+
     def test_get_code(self):
         """Test returning the PLU code matching a list of keywords."""
         for value in [None, 42]:
@@ -1368,6 +4335,355 @@ class _UnitTest(unittest.TestCase):
                       ['aubergine', 'White', 'Baby']]:
             self.assertEqual(get_code(value), ['4600'])
 
+    def test_correct(self):
+        """Test correcting the typos of a keyword."""
+        for value in [None, 42, ['bananna']]:
+            self.assertRaises(TypeError, correct, value)
+        for value in ['', 'foo', 'kiwy', 'foobar', 'qqqqqqqqqq']:
+            self.assertIsNone(correct(value))
+        for expected, value in [('banana', 'banana'),
+                                ('banana', 'bananna'),
+                                ('cantaloupe', 'cantalope'),
+                                ('avocados', 'avacado'),
+                                ('broccoli', 'brocolli'),
+                                ('zucchini', 'zuchini'),
+                                ('lettuce', 'lettcue')]:
+            self.assertEqual(correct(value), expected)
+
+        for value in ['a' * 1200, 'banana' * 200, 'cantaloupe' + 'x' * 5]:
+            self.assertIsNone(correct(value))
+
+        index = _Index({'1111': 'apple', '2222': 'grape'})
+        self.assertEqual(index.correct('appple'), 'apple')
+        self.assertEqual(index.longest, 5)
+        index.add('3333', 'watermelon')
+        self.assertEqual(index.longest, 10)
+        self.assertEqual(index.correct('watermellon'), 'watermelon')
+        self.assertIsNone(index.correct('watermellllon'))
+        index.remove('3333')
+        self.assertEqual(index.longest, 5)
+        self.assertIsNone(index.correct('watermellon'))
+        self.assertEqual(index.deletions,
+                         _Index({'1111': 'apple', '2222': 'grape'}).deletions)
+
+    def test_phonetic_key(self):
+        """Test the key shared by words that sound alike."""
+        for value in ['', "'", '42']:
+            self.assertEqual(_phonetic_key(value), '')
+        for words in [['pear', 'pair'], ['cherry', 'sherry'],
+                      ['broccoli', 'brocoli', 'brockolee'],
+                      ['phone', 'fone'], ['knob', 'nob'],
+                      ["leek's", 'leaks'], ['xigua', 'sigua']]:
+            self.assertEqual(len(set([_phonetic_key(w) for w in words])), 1)
+        for words in [['pear', 'pears'], ['time', 'thyme'],
+                      ['beet', 'bean']]:
+            self.assertEqual(len(set([_phonetic_key(w) for w in words])), 2)
+
+    def test_sounds_like(self):
+        """Test finding the word sounding like a keyword."""
+        for value in [None, 42, ['pair']]:
+            self.assertRaises(TypeError, sounds_like, value)
+        for value in ['', 'pa', 'kiwee', 'time', 'foobar']:
+            self.assertIsNone(sounds_like(value))
+        for expected, value in [('pear', 'pear'), ('pear', 'pair'),
+                                ('cherry', 'sherry'),
+                                ('broccoli', 'brockolee'),
+                                ('basil', 'bazil')]:
+            self.assertEqual(sounds_like(value), expected)
+        self.assertEqual(get_code_fuzzy(['organic', 'pair', 'bosc']),
+                         get_code(['organic', 'pear', 'bosc']))
+
+        index = _Index({'1111': 'pear', '2222': 'pear peach'})
+        self.assertEqual(index.phonetics,
+                         {'PR': ('pear',), 'PX': ('peach',)})
+        index.add('3333', 'pare')
+        self.assertEqual(index.sounds_like('pair'), 'pear')
+        index.remove('1111')
+        index.remove('2222')
+        self.assertEqual(index.phonetics, {'PR': ('pare',)})
+        self.assertEqual(index.sounds_like('pair'), 'pare')
+
+    def test_edit_distance(self):
+        """Test counting the typos between two strings."""
+        for expected, a, b in [(0, '', ''), (0, 'foo', 'foo'),
+                               (3, '', 'foo'), (3, 'foo', ''),
+                               (1, 'foo', 'fo'), (1, 'foo', 'fooo'),
+                               (1, 'foo', 'fob'), (1, 'foo', 'ofo'),
+                               (2, 'foo', 'oof'), (3, 'foo', 'bar')]:
+            self.assertEqual(_edit_distance(a, b), expected)
+            self.assertEqual(_edit_distance(b, a), expected)
+
+    def test_get_code_fuzzy(self):
+        """Test returning the PLU codes matching misspelled keywords."""
+        for value in [None, 42]:
+            self.assertRaises(TypeError, get_code_fuzzy, value)
+        for value in [[], ['foobar'], ['foo', 'bar', 'baz'],
+                      ['organic'], ['organic', 'foobar']]:
+            self.assertEqual(get_code_fuzzy(value), [])
+        for value in [['bananas'], ['baby', 'white'], ['app']]:
+            self.assertEqual(get_code_fuzzy(value), get_code(value))
+        self.assertEqual(get_code_fuzzy(['Cantalope']),
+                         get_code(['cantaloupe']))
+        self.assertEqual(get_code_fuzzy(['organic', 'avacado']),
+                         get_code(['organic', 'avocados']))
+        self.assertEqual(get_code_fuzzy(['baby', 'xyzzy', 'eggplant']), [])
+        self.assertEqual(get_code_fuzzy(['baby', 'whte', 'eggplnt']),
+                         ['4600'])
+        self.assertEqual(get_code_fuzzy(['baby', 'white', 'egplant']),
+                         ['4600'])
+        self.assertEqual(get_code_fuzzy(['a' * 1200]), [])
+
+    def test_stem(self):
+        """Test returning the singular form of a token."""
+        for expected, values in [
+                ('cherry', ['cherry', 'cherries']),
+                ('tomato', ['tomato', 'tomatoes', 'tomatos']),
+                ('peach', ['peach', 'peaches']),
+                ('radish', ['radish', 'radishes']),
+                ('pea', ['pea', 'peas']),
+                ('pie', ['pie', 'pies']),
+                ('kiwi', ['kiwi', 'kiwis']),
+                ('leek', ['leek', "leek's"]),
+                ('cress', ['cress']),
+                ('asparagus', ['asparagus']),
+                ('pearl', ['pearl', 'pearls']),
+                ('as', ['as'])]:
+            for value in values:
+                self.assertEqual(_stem(value), expected)
+
+    def test_get_code_range(self):
+        """Test returning the PLU codes in a range."""
+        for value in [None, 4200, ['4200']]:
+            self.assertRaises(TypeError, get_code_range, value, '4299')
+            self.assertRaises(TypeError, get_code_range, '4200', value)
+        for value in ['', '420', '42000', '42OO']:
+            self.assertRaises(ValueError, get_code_range, value, '4299')
+            self.assertRaises(ValueError, get_code_range, '4200', value)
+        for first, last in [('4299', '4200'), ('0000', '2999'),
+                            ('5000', '9999')]:
+            self.assertEqual(get_code_range(first, last), [])
+
+        for first, last in [('4200', '4299'), ('3000', '3000'),
+                            ('0000', '9999'), ('4011', '4012')]:
+            expected = sorted([code for code in _PLU_MAP
+                               if first <= code <= last])
+            self.assertEqual(get_code_range(first, last), expected)
+            self.assertEqual(get_code_range(first, last, organic=True),
+                             ['9' + code for code in expected])
+
+    def test_get_code_prefix(self):
+        """Test returning the PLU codes beginning with a prefix."""
+        for value in [None, 30, ['30']]:
+            self.assertRaises(TypeError, get_code_prefix, value)
+        for value in ['30000', '3x', ' 30', '-1']:
+            self.assertRaises(ValueError, get_code_prefix, value)
+        for value in ['0', '5', '9', '3999']:
+            self.assertEqual(get_code_prefix(value), [])
+
+        for value in ['', '3', '30', '301', '4011']:
+            expected = sorted([code for code in _PLU_MAP
+                               if code.startswith(value)])
+            self.assertEqual(get_code_prefix(value), expected)
+            self.assertEqual(get_code_prefix(value, True),
+                             ['9' + code for code in expected])
+
+    def test_complete(self):
+        """Test returning the words or PLU codes beginning with a prefix."""
+        for value in [None, 42, ['app']]:
+            self.assertRaises(TypeError, complete, value)
+        for value in [None, 1.5, '1', True]:
+            self.assertRaises(TypeError, complete, 'app', value)
+        self.assertRaises(ValueError, complete, 'app', -1)
+        for value in ['', ' ', 'qqq', '0', '99']:
+            self.assertEqual(complete(value), [])
+        self.assertEqual(complete('app', 0), [])
+
+        self.assertEqual(complete('appl'), ['apple', 'apples'])
+        self.assertEqual(complete(' APPL '), ['apple', 'apples'])
+        self.assertEqual(complete('cantaloupe'), ['cantaloupe'])
+        self.assertEqual(complete('4011'), ['4011'])
+        self.assertEqual(complete('301', 3), ['3010', '3011', '3012'])
+        completions = complete('c', 50)
+        self.assertEqual(len(completions), 50)
+        self.assertEqual(completions, sorted(completions))
+        for completion in completions:
+            self.assertTrue(completion.startswith('c'))
+        self.assertEqual(completions,
+                         [token for token in sorted(get_catalog().postings)
+                          if token.startswith('c')][:50])
+
+        index = _Index({'1111': 'apple', '2222': 'apricot'})
+        index.add('3333', 'applesauce')
+        index.remove('1111')
+        self.assertEqual(index.complete('ap'), ['applesauce', 'apricot'])
+        self.assertEqual(index.complete('1'), [])
+        self.assertEqual(index.complete('2'), ['2222'])
+
+    def test_get_code_stem(self):
+        """Test returning the PLU code matching whole words of keywords."""
+        for value in [None, 42]:
+            self.assertRaises(TypeError, get_code, value, True)
+        for value in [[], [None, 42, '', []], ['-'],
+                      ['foobar'], ['foo', 'bar'], ['organic'],
+                      ['app'], ['organic', 'app']]:
+            self.assertEqual(get_code(value, stem=True), [])
+        for expected, description in _PLU_MAP.items():
+            keywords = description.split()
+            self.assertIn(expected, get_code(keywords, stem=True))
+            self.assertIn('9' + expected,
+                          get_code(['organic'] + keywords, stem=True))
+
+        for value in [['cherry'], ['Cherries'], ['cherries,']]:
+            self.assertEqual(get_code(value, stem=True),
+                             sorted(set(get_code(['cherry'])) |
+                                    set(get_code(['cherries']))))
+        self.assertEqual(get_code(['tomatos'], stem=True),
+                         get_code(['tomato'], stem=True))
+        for code in get_code(['pear'], stem=True):
+            self.assertNotIn('pearl', _PLU_MAP[code])
+        self.assertEqual(get_code(['baby', 'whites', 'eggplants'], stem=True),
+                         ['4600'])
+
+        index = _Index({'1111': 'cherry', '2222': 'cherries pie'})
+        self.assertEqual(index.stems, {'cherry': ('1111', '2222'),
+                                       'pie': ('2222',)})
+        index.remove('1111')
+        index.add('3333', 'pies')
+        self.assertEqual(index.stems, {'cherry': ('2222',),
+                                       'pie': ('2222', '3333')})
+        self.assertEqual(index.get_code(['pie'], stem=True),
+                         ['2222', '3333'])
+
+    def test_LRUCache(self):
+        """Test the least recently used cache."""
+        for value in [None, 1.5, '1', True]:
+            self.assertRaises(TypeError, _LRUCache, value)
+        self.assertRaises(ValueError, _LRUCache, -1)
+        cache = _LRUCache(2)
+        self.assertEqual(cache.info(), CacheInfo(0, 0, 0, 2, 0))
+        self.assertIsNone(cache.get('foo'))
+        cache.put('foo', 1)
+        cache.put('bar', 2)
+        self.assertEqual(cache.get('foo'), 1)
+        cache.put('baz', 3)
+        self.assertIsNone(cache.get('bar'))
+        self.assertEqual(cache.get('baz'), 3)
+        self.assertEqual(cache.info(), CacheInfo(2, 2, 1, 2, 2))
+        cache.resize(1)
+        self.assertIsNone(cache.get('foo'))
+        self.assertEqual(cache.info(), CacheInfo(2, 3, 2, 1, 1))
+        cache.resize(0)
+        cache.put('foo', 1)
+        self.assertIsNone(cache.get('foo'))
+        self.assertEqual(cache.info(), CacheInfo(2, 4, 3, 0, 0))
+        cache.clear()
+        self.assertEqual(cache.info(), CacheInfo(0, 0, 0, 0, 0))
+
+    def test_cache(self):
+        """Test caching get_code results."""
+        self.assertRaises(TypeError, set_cache_size, None)
+        self.assertRaises(ValueError, set_cache_size, -1)
+        maxsize = cache_info().maxsize
+        try:
+            set_cache_size(2)
+            cache_clear()
+            self.assertEqual(get_code(['napa']), ['4552'])
+            self.assertEqual(get_code([' NAPA ']), ['4552'])
+            self.assertEqual(get_code(['white', 'baby']), ['4600'])
+            self.assertEqual(get_code(['Baby', 'White']), ['4600'])
+            self.assertEqual(get_code(['napa', 'organic']), ['94552'])
+            self.assertEqual(get_code([]), [])
+            self.assertEqual(cache_info(), CacheInfo(2, 3, 1, 2, 2))
+            codes = get_code(['napa', 'organic'])
+            codes.append('foobar')
+            self.assertEqual(get_code(['organic', 'napa']), ['94552'])
+            cache_clear()
+            self.assertEqual(cache_info(), CacheInfo(0, 0, 0, 2, 0))
+        finally:
+            set_cache_size(maxsize)
+
+    def test_get_codes_many(self):
+        """Test returning the PLU codes matching many lists of keywords."""
+        for value in [None, 42, [None], [42]]:
+            self.assertRaises(TypeError, get_codes_many, value)
+        self.assertEqual(get_codes_many([]), [])
+        queries = [['napa'], [], ['Organic', 'NAPA'], ['foobar'], [' napa '],
+                   ['baby', 'white'], ['White', 'Baby', 'white']]
+        expected = [get_code(keywords) for keywords in queries]
+        self.assertEqual(get_codes_many(queries), expected)
+        self.assertEqual(get_codes_many(iter(queries)), expected)
+        codes_list = get_codes_many([['napa'], ['napa']])
+        self.assertEqual(codes_list, [['4552'], ['4552']])
+        codes_list[0].append('foobar')
+        self.assertEqual(codes_list[1], ['4552'])
+        queries = [description.split()
+                   for description in _PLU_MAP.values()]
+        self.assertEqual(get_codes_many(queries),
+                         [get_code(keywords) for keywords in queries])
+
+    def test_search(self):
+        """Test returning the most relevant PLU codes matching keywords."""
+        for value in [None, 42]:
+            self.assertRaises(TypeError, search, value)
+        for value in [None, 1.5, '1', True]:
+            self.assertRaises(TypeError, search, ['napa'], value)
+        self.assertRaises(ValueError, search, ['napa'], -1)
+        for value in [[], ['organic'], ['foobar'], ['foo', 'bar']]:
+            self.assertEqual(search(value), [])
+        self.assertEqual(search(['napa'], 0), [])
+        self.assertEqual(search(['napa']), ['4552'])
+        self.assertEqual(search(['Organic', 'napa']), ['94552'])
+
+        index = _Index({'1111': 'pearl onions', '2222': 'bartlett pear',
+                        '3333': 'asian pear apple', '4444': 'small pears',
+                        '5555': 'large bartlett pears'})
+        self.assertEqual(index.search(['pear']),
+                         ['2222', '4444', '3333', '5555', '1111'])
+        self.assertEqual(index.search(['pear'], 2), ['2222', '4444'])
+        self.assertEqual(index.search(['bartlett', 'pear']), ['2222', '5555'])
+        self.assertGreater(index.score('2222', {'pear'}),
+                           index.score('3333', {'pear'}))
+
+        index = get_catalog()
+        for keywords in [['apples'], ['red'], ['tangerines', 'mandarins'],
+                         ['organic', 'pe']]:
+            keyword_set, is_organic = _normalize_keywords(keywords)
+            expected = sorted(
+                index.match(keyword_set),
+                key=lambda code: (-index.score(code, keyword_set), code))
+            if is_organic:
+                expected = ['9' + code for code in expected]
+            for limit in [1, 7, 1000]:
+                self.assertEqual(search(keywords, limit), expected[:limit])
+
+    def test_rank(self):
+        """Test ranking the PLU codes found by stem or with typos."""
+        for value in [None, 42, ('4011',)]:
+            self.assertRaises(TypeError, rank, value, ['napa'])
+        self.assertRaises(TypeError, rank, ['4552'], None)
+        for value in [None, 1.5, '1', True]:
+            self.assertRaises(TypeError, rank, ['4552'], ['napa'], value)
+        self.assertRaises(ValueError, rank, ['4552'], ['napa'], -1)
+        self.assertEqual(rank([], ['napa']), [])
+        self.assertEqual(rank(['4552'], ['napa'], 0), [])
+
+        index = _Index({'1111': 'pearl onions', '2222': 'bartlett pear',
+                        '3333': 'asian pear apple', '4444': 'small pears',
+                        '5555': 'large bartlett pears'})
+        codes = index.get_code(['pears'], stem=True)
+        self.assertEqual(index.rank(codes, ['pears']),
+                         ['4444', '5555', '2222', '3333'])
+        codes = index.get_code(['organic', 'pears'], stem=True)
+        self.assertEqual(index.rank(codes, ['organic', 'pears'], 2),
+                         ['94444', '95555'])
+        codes = index.get_code_fuzzy(['barlett'])
+        self.assertEqual(index.rank(codes, ['barlett'], 1), ['2222'])
+
+        for keywords in [['napa'], ['apples'], ['organic', 'pe']]:
+            codes = get_code(keywords)
+            self.assertEqual(rank(codes, keywords, len(codes)),
+                             search(keywords, len(codes)))
+
     def test_sanitize_code(self):
         """Test removing non-digit characters."""
         for value in [None, 42, []]:
@@ -1391,8 +4707,13 @@ class _UnitTest(unittest.TestCase):
             ('1 2 3 4', '1234'),
             (' 1 2 3 4', '1234'),
             ('1 2 3 4 ', '1234'),
-            ('foo 42 bar', '42')]:
+            ('foo 42 bar', '42'),
+            ('\u0664\u0660\u0661\u0661', '\u0664\u0660\u0661\u0661'),
+            ('4\u00b2011', '4011'),
+            ('4\t0\n1 1', '4011')]:
             self.assertEqual(_sanitize_code(value), expected)
+            self.assertEqual(_sanitize_code(value),
+                             re.sub(r'[^\d]', '', value))
         for code in _PLU_MAP.keys():
             for value in [' ', '?', '!', 'a', 'foo']:
                 for i in range(len(code) + 1):
@@ -1400,6 +4721,61 @@ class _UnitTest(unittest.TestCase):
                     digits.insert(i, value)
                     self.assertEqual(_sanitize_code(''.join(digits)), code)
 
+    def test_parse_spoken_code(self):
+        """Test reading the digits of a spoken PLU code."""
+        for value in [None, 42, []]:
+            self.assertRaises(TypeError, parse_spoken_code, value)
+        for value, expected in [
+            ('', ''),
+            ('foobar', ''),
+            ('foo 42 bar', '42'),
+            ('1?234', '1234'),
+            ('four zero one one', '4011'),
+            ('Four Zero One One', '4011'),
+            ('nine four zero one one', '94011'),
+            ('nine four oh one one', '94011'),
+            ('4 o 1 1', '4011'),
+            ('forty-eleven', '4011'),
+            ('forty eleven', '4011'),
+            ('nine forty eleven', '94011'),
+            ('forty one eleven', '4111'),
+            ('forty', '40'),
+            ('forty-two', '42'),
+            ('forty 11', '4011'),
+            ('twenty twenty', '2020'),
+            ('hundred', '100'),
+            ('one hundred', '100'),
+            ('forty hundred', '4000'),
+            ('forty one hundred', '4100'),
+            ('forty one hundred eleven', '4111'),
+            ('forty one hundred and eleven', '4111'),
+            ('four thousand eleven', '4011'),
+            ('four thousand and eleven', '4011'),
+            ('four thousand one hundred eleven', '4111'),
+            ('ninety four thousand eleven', '94011'),
+            ('four thousand eleven one', '40111'),
+            ('four thousand 11', ''),
+            ('double oh', '00'),
+            ('four double oh seven', '4007'),
+            ('nine four zero triple one', ''),
+            ('nine four triple one', '94111'),
+            ('123456', ''),
+            ('1' * 5000 + ' hundred', ''),
+            ('thousand ' * 1500, ''),
+            ('one ' * 5000, ''),
+            ('nine ' * 5 + 'thousand', ''),
+            ('ninety nine thousand nine hundred ninety nine', '99999'),
+            ('a hundred thousand', ''),
+            ('forty double one', '40' + '11'),
+            ('code four zero one one please', '4011')]:
+            self.assertEqual(parse_spoken_code(value), expected)
+        for value in _CODE_EXAMPLES:
+            self.assertIn(parse_spoken_code(value), ['4011', '94011'])
+        for code in _PLU_MAP.keys():
+            self.assertEqual(parse_spoken_code(code), code)
+            for value in [' ', '?', '!', 'a', 'foo']:
+                self.assertEqual(parse_spoken_code(value.join(code)), code)
+
     def test_get_description(self):
         """Test returning the description for a PLU code."""
         for value in [None, 42, []]:
@@ -1425,39 +4801,359 @@ class _UnitTest(unittest.TestCase):
             for i in range(5, 10):
                 self.assertEqual(get_description(str(i) + code[1:]), '')
 
+    def test_get_descriptions_many(self):
+        """Test returning the descriptions for many PLU codes."""
+        for value in [None, 42, [None], ['4011', 42], [[]]]:
+            self.assertRaises(TypeError, get_descriptions_many, value)
+        self.assertEqual(get_descriptions_many([]), [])
+        codes = ['4011', '', '94552', '4 0 1 1', 'foobar', '4011', '84552']
+        expected = [get_description(code) for code in codes]
+        self.assertEqual(get_descriptions_many(codes), expected)
+        self.assertEqual(get_descriptions_many(iter(codes)), expected)
+        codes = list(_PLU_MAP.keys()) + ['9' + code for code in _PLU_MAP]
+        self.assertEqual(get_descriptions_many(codes),
+                         [get_description(code) for code in codes])
+
+    def test_CompactCatalog(self):
+        """Test the compact catalog."""
+        for value in [None, [], 42]:
+            self.assertRaises(TypeError, CompactCatalog.from_map, value)
+        for value in [{'123': 'foo'}, {'12345': 'foo'}, {'foob': 'foo'},
+                      {1234: 'foo'}]:
+            self.assertRaises(ValueError, CompactCatalog.from_map, value)
+        self.assertRaises(ValueError, CompactCatalog, [1], [0], b'', [0], b'',
+                          [0], [])
+        self.assertRaises(ValueError, CompactCatalog, [], [0], b'', [0], b'',
+                          [], [])
+
+        catalog = CompactCatalog.from_map({})
+        self.assertEqual(len(catalog), 0)
+        self.assertEqual(catalog.to_map(), {})
+        self.assertEqual(catalog.get_description('4011'), '')
+        self.assertEqual(catalog.get_code(['foo']), [])
+
+        catalog = CompactCatalog.from_map(
+            {'2345': 'bar baz', '1234': "foo's bar", '0123': 'fo\u00f6'})
+        self.assertEqual(list(catalog.codes), [123, 1234, 2345])
+        self.assertEqual(catalog.tokens,
+                         "bar\nbaz\nfoo's\nfo\u00f6\n".encode('utf-8'))
+        self.assertEqual(list(catalog.postings), [1, 2, 2, 1, 0])
+        self.assertEqual(catalog.get_description('0123'), 'fo\u00f6')
+        self.assertEqual(catalog.get_description('90123'), 'organic fo\u00f6')
+        self.assertEqual(catalog.get_code(['ba']), ['1234', '2345'])
+        self.assertEqual(catalog.get_code(['ORGANIC', 'o']),
+                         ['90123', '91234'])
+        self.assertEqual(catalog.get_code(['s bar']), ['1234'])
+        self.assertEqual(catalog.get_code(['qux']), [])
+
+        catalog = CompactCatalog.from_map(_PLU_MAP)
+        self.assertEqual(len(catalog), len(_PLU_MAP))
+        self.assertEqual(catalog.to_map(), _PLU_MAP)
+        for value in [None, 42]:
+            self.assertRaises(TypeError, catalog.get_description, value)
+            self.assertRaises(TypeError, catalog.get_code, value)
+        for code in list(_PLU_MAP.keys()) + ['', 'foobar', '42', '123456',
+                                             '81234', '91234']:
+            for value in [code, '8' + code, '9' + code, '0' + code]:
+                self.assertEqual(catalog.get_description(value),
+                                 get_description(value))
+        for description in _PLU_MAP.values():
+            keywords = description.split()
+            self.assertEqual(catalog.get_code(keywords), get_code(keywords))
+        for keywords in [['app'], ['organic', 'les', 'red'], ['red apples'],
+                         ["d'e"], ["'"], ['e', 'a', 'o'], ['pear'],
+                         ['baby', 'white'], ['napa', 'Organic']]:
+            self.assertEqual(catalog.get_code(keywords), get_code(keywords))
+
+        index = _Index(_PLU_MAP)
+        self.assertEqual(catalog.version(), index.version())
+        for keyword in ['apple', 'apples', 'aples', 'bananna', 'avacados',
+                        'tomatos', 'brocoli', 'fisalis', 'xyzzy', 'a', "'s"]:
+            keywords = [keyword, 'Organic']
+            self.assertEqual(catalog.correct(keyword), index.correct(keyword))
+            self.assertEqual(catalog.sounds_like(keyword),
+                             index.sounds_like(keyword))
+            self.assertEqual(catalog.get_code(keywords, stem=True),
+                             index.get_code(keywords, stem=True))
+            codes = index.get_code_fuzzy(keywords)
+            self.assertEqual(catalog.get_code_fuzzy(keywords), codes)
+            self.assertEqual(catalog.rank(codes, keywords, 3),
+                             index.rank(codes, keywords, 3))
+            self.assertEqual(catalog.search(keywords), index.search(keywords))
+        for prefix in ['a', 'App', 'zz', '4', '401', '4011', '40111', '9',
+                       '\u0663']:
+            self.assertEqual(catalog.complete(prefix), index.complete(prefix))
+        for prefix in ['', '4', '40', '4011']:
+            self.assertEqual(catalog.get_code_prefix(prefix, True),
+                             index.get_code_prefix(prefix, True))
+        self.assertEqual(catalog.get_codes_many([['napa'], ['foo'], ['napa']]),
+                         index.get_codes_many([['napa'], ['foo'], ['napa']]))
+        self.assertEqual(catalog.get_descriptions_many(['4011', '94552']),
+                         index.get_descriptions_many(['4011', '94552']))
+
+    def test_catalog_file(self):
+        """Test writing and loading binary catalog files."""
+        for value in [None, 42, []]:
+            self.assertRaises(TypeError, load_catalog, value)
+            self.assertRaises(TypeError, write_catalog, _PLU_MAP, value)
+        for value in ['', 'foobar', 'fo\u00f6b\u00e4r']:
+            self.assertRaises(ValueError, load_catalog, value)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plu.bin')
+            for value in [b'', b'PLUC', b'\0' * _CATALOG_HEADER.size,
+                          _CATALOG_HEADER.pack(_CATALOG_MAGIC, 42, 0,
+                                               *([0] * 14)),
+                          _CATALOG_HEADER.pack(_CATALOG_MAGIC,
+                                               _CATALOG_VERSION, 0,
+                                               *([0, 42] * 7))]:
+                with open(path, 'wb') as f:
+                    f.write(value)
+                self.assertRaises(ValueError, load_catalog, path)
+
+            write_catalog({}, path)
+            catalog = load_catalog(path)
+            self.assertEqual(len(catalog), 0)
+            self.assertEqual(catalog.get_description('4011'), '')
+            self.assertEqual(catalog.get_code(['foo']), [])
+
+            expected = CompactCatalog.from_map(_PLU_MAP)
+            write_catalog(expected, path)
+            catalog = load_catalog(path)
+            self.assertEqual(os.listdir(directory), ['plu.bin'])
+            for name, typecode in _CATALOG_SECTIONS:
+                self.assertEqual(list(getattr(catalog, name)),
+                                 list(getattr(expected, name)))
+            self.assertEqual(catalog.to_map(), _PLU_MAP)
+            for code in _PLU_MAP:
+                self.assertEqual(catalog.get_description('9' + code),
+                                 get_description('9' + code))
+            for keywords in [['app'], ['organic', 'les', 'red'],
+                             ['baby', 'white'], ['napa']]:
+                self.assertEqual(catalog.get_code(keywords),
+                                 get_code(keywords))
+
     def test_parse_csv(self):
         """Test the guard clauses in parse_csv()."""
         for value in [None, 42, []]:
             self.assertRaises(TypeError, parse_csv, value)
             self.assertRaises(TypeError, parse_csv, 'plucode.py', value)
+            self.assertRaises(TypeError, iter_csv, value)
+            self.assertRaises(TypeError, iter_csv, 'plucode.py', value)
+            self.assertRaises(TypeError, parse_csv, 'plucode.py',
+                              output_format=value)
         for value in ['', 'foobar', 'fo\u00f6b\u00e4r']:
             self.assertRaises(ValueError, parse_csv, value)
             self.assertRaises(ValueError, parse_csv, 'plucode.py', value)
+            self.assertRaises(ValueError, iter_csv, value)
+            self.assertRaises(ValueError, iter_csv, 'plucode.py', value)
+            self.assertRaises(ValueError, parse_csv, 'plucode.py',
+                              output_format=value)
+        for value in [42, []]:
+            self.assertRaises(TypeError, parse_csv, 'plucode.py', ',', value)
+        self.assertRaises(ValueError, parse_csv, 'plucode.py',
+                          output_format='catalog')
+
+    def test_get_output_format(self):
+        """Test implying the output format from the output file."""
+        for expected, value in [('python', None), ('python', 'plu.py'),
+                                ('jsonl', 'plu.jsonl'), ('catalog', 'plu.bin'),
+                                ('catalog', os.path.join('a.py', 'PLU.BIN')),
+                                (None, 'plu'), (None, 'plu.txt'),
+                                (None, 'plu.bin.gz')]:
+            self.assertEqual(_get_output_format(value), expected)
+
+    def test_ingest_csv(self):
+        """Test parsing and merging many CSV text files."""
+        for value in [None, 42, 'plucode.py', [None], [42]]:
+            self.assertRaises(TypeError, ingest_csv, value)
+        for value in [[''], ['foobar'], ['plucode.py', 'foobar']]:
+            self.assertRaises(ValueError, ingest_csv, value)
+        for name, values in [('delimiter', [None, 42]),
+                             ('policy', [None, 42]),
+                             ('processes', ['1', 1.0, True])]:
+            for value in values:
+                self.assertRaises(TypeError, ingest_csv, ['plucode.py'],
+                                  **{name: value})
+        for name, values in [('delimiter', ['', ';;']),
+                             ('policy', ['', 'foobar']),
+                             ('processes', [0, -1])]:
+            for value in values:
+                self.assertRaises(ValueError, ingest_csv, ['plucode.py'],
+                                  **{name: value})
+
+        header = 'PLU,COMMODITY,VARIETY,SIZE,AKA'
+        files = [
+            [header, '4011,Bananas,Yellow,,', '4552,Cabbage,Napa,,',
+             '4011,Bananas,Again,,'],
+            [header, '4011,Bananas,Regional,,', '3283,Apples,Honeycrisp,,'],
+            [header, '4552,Cabbage,Napa,,', '4011,Bananas,Store,,']
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for i, rows in enumerate(files):
+                paths.append(os.path.join(directory, '{0}.csv'.format(i)))
+                with open(paths[-1], 'w', encoding='utf-8', newline='') as f:
+                    f.write('\n'.join(rows))
+            self.assertEqual(ingest_csv([]), ({}, []))
+            self.assertEqual(ingest_csv(paths[:1]), (
+                {'4011': 'again bananas', '4552': 'napa cabbage'},
+                [Duplicate('4011', paths[0], 'again bananas',
+                           paths[0], 'yellow bananas')]))
+            for processes in [None, 1, 2]:
+                self.assertEqual(ingest_csv(paths, processes=processes), (
+                    {'4011': 'store bananas', '4552': 'napa cabbage',
+                     '3283': 'honeycrisp apples'},
+                    [Duplicate('4011', paths[2], 'store bananas',
+                               paths[0], 'yellow bananas'),
+                     Duplicate('4011', paths[2], 'store bananas',
+                               paths[0], 'again bananas'),
+                     Duplicate('4552', paths[2], 'napa cabbage',
+                               paths[0], 'napa cabbage'),
+                     Duplicate('4011', paths[2], 'store bananas',
+                               paths[1], 'regional bananas')]))
+                plu_map, duplicates = ingest_csv(paths, policy='first',
+                                                 processes=processes)
+                self.assertEqual(plu_map, {'4011': 'yellow bananas',
+                                           '4552': 'napa cabbage',
+                                           '3283': 'honeycrisp apples'})
+                self.assertEqual(duplicates[-1], Duplicate(
+                    '4011', paths[0], 'yellow bananas',
+                    paths[2], 'store bananas'))
+            self.assertRaises(ValueError, ingest_csv, paths, policy='error')
+            plu_map, duplicates = ingest_csv([paths[2], paths[2]],
+                                             policy='error')
+            self.assertEqual(plu_map, {'4011': 'store bananas',
+                                       '4552': 'napa cabbage'})
+            self.assertEqual(len(duplicates), 2)
+
+    def test_parse_csv_output(self):
+        """Test parsing a CSV text file into every output format."""
+        rows = [
+            'PLU,COMMODITY,VARIETY,SIZE,AKA',
+            '4552,Cabbage,Napa,,Chinese',
+            '4011,Bananas,Yellow,All Sizes,Cavendish',
+            '3283,Apples,Honeycrisp,Large,',
+            '4011,Bananas,Duplicate,,',
+            '40,Bananas,Short,,',
+            '3170,Retailer Assigned,Retailer Assigned,,'
+        ]
+        expected = [('4552', 'napa chinese cabbage'),
+                    ('4011', 'yellow cavendish bananas'),
+                    ('3283', 'large honeycrisp apples')]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plu.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write('\r\n'.join(rows))
+            self.assertEqual(list(iter_csv(path)), expected)
+            self.assertEqual(parse_csv(path, output_format='map'),
+                             dict(expected))
+
+            output = os.path.join(directory, 'plu.txt')
+            self.assertIsNone(parse_csv(path, output=output))
+            with open(output, encoding='utf-8') as f:
+                self.assertEqual(f.read(), ''.join([
+                    '    "{0}": "{1}",\n'.format(code, description)
+                    for code, description in sorted(expected)]))
+
+            self.assertIsNone(parse_csv(path, output=output,
+                                        output_format='jsonl'))
+            with open(output, encoding='utf-8') as f:
+                self.assertEqual(
+                    [tuple(json.loads(line).values()) for line in f],
+                    expected)
+
+            self.assertIsNone(parse_csv(path, output=output,
+                                        output_format='catalog'))
+            self.assertEqual(load_catalog(output).to_map(), dict(expected))
+
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write('PLU,COMMODITY\n4011,Bananas\n')
+            for output_format in ['python', 'jsonl', 'catalog']:
+                self.assertRaises(ValueError, parse_csv, path, output=output,
+                                  output_format=output_format)
+                self.assertEqual(load_catalog(output).to_map(),
+                                 dict(expected))
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['plu.csv', 'plu.txt'])
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-b', '--benchmark', action='store_true',
+        help='print benchmarks of the hot paths')
     parser.add_argument(
         '-c', '--code', default='',
         help='print the description for the specified PLU code')
     parser.add_argument(
-        '-f', '--file', default='',
-        help='path to the PLU code CSV text file')
+        '-f', '--file', nargs='+', default=[],
+        help='paths to the PLU code CSV text files, in order of precedence')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='number of processes parsing the PLU code CSV text files')
+    parser.add_argument(
+        '-F', '--format', choices=['python', 'jsonl', 'catalog'],
+        default=None,
+        help='output format of the parsed CSV text file, by default implied '
+             'by the extension of --output or python for stdout')
     parser.add_argument(
         '-l', '--lookup', nargs='+', default=[],
         help='print the PLU code matching the specified keywords')
+    parser.add_argument(
+        '-o', '--output', default=None,
+        help='path to the file to write the parsed CSV text file to')
+    parser.add_argument(
+        '-p', '--prefix', default=None,
+        help='print the PLU codes beginning with the specified digits')
+    parser.add_argument(
+        '-r', '--range', nargs=2, default=[], metavar=('FIRST', 'LAST'),
+        help='print the PLU codes from FIRST to LAST')
+    parser.add_argument(
+        '--organic', action='store_true',
+        help='print organic PLU codes with --prefix and --range')
+    parser.add_argument(
+        '--policy', choices=_MERGE_POLICIES, default='last',
+        help='policy for PLU codes defined by more than one CSV text file')
     parser.add_argument(
         '-t', '--training', action='store_true',
         help='print training phrases')
     args = parser.parse_args()
+    output_format = args.format
+    if (len(args.file) > 0) and (output_format is None):
+        output_format = _get_output_format(args.output)
+        if output_format is None:
+            parser.error('-F/--format is required to write {0}.'.format(
+                args.output))
+    if (len(args.file) > 0) and (output_format == 'catalog') and (
+            args.output is None):
+        parser.error('-o/--output is required for the catalog format.')
 
-    if args.code.isdigit() and (len(args.code) > 3):
+    if args.benchmark:
+        _benchmark_sanitize_code()
+    elif args.code.isdigit() and (len(args.code) > 3):
         print(get_description(args.code))
-    elif os.path.isfile(args.file):
-        parse_csv(args.file)
+    elif len(args.file) == 1:
+        parse_csv(args.file[0], output=args.output,
+                  output_format=output_format)
+    elif len(args.file) > 1:
+        plu_map, duplicates = ingest_csv(args.file, policy=args.policy,
+                                         processes=args.jobs)
+        for duplicate in duplicates:
+            print('PLU code {0} in {1} was discarded for {2}.'.format(
+                duplicate.code, duplicate.path, duplicate.kept_path),
+                  file=sys.stderr)
+        _write_records(sorted(plu_map.items()), args.output, output_format)
     elif len(args.lookup) > 0:
         for code in get_code(args.lookup):
             print(code)
+    elif (args.prefix is not None) or (len(args.range) > 0):
+        if args.prefix is not None:
+            codes = get_code_prefix(args.prefix, args.organic)
+        else:
+            codes = get_code_range(args.range[0], args.range[1], args.organic)
+        for code in codes:
+            print('{0}\t{1}'.format(code, get_description(code)))
     elif args.training:
         import itertools
         for carriers, examples in [
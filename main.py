@@ -1,6 +1,13 @@
 """Google Cloud Functions frontend to the plucode module."""
 
+import bisect
+import hashlib
+import hmac
+import ipaddress
+import json
 import os
+import threading
+import time
 try:
     from secrets import choice
 except ImportError:
@@ -17,6 +24,76 @@ _USERNAME = os.environ.get('BASIC_AUTH_USERNAME')
 _PASSWORD = os.environ.get('BASIC_AUTH_PASSWORD')
 """String expected HTTP basic authentication password."""
 
+def _hash_secret(secret):
+    """Return the digest under which a password or API key is stored.
+
+    Args:
+        secret: String password or API key.
+    Returns:
+        Bytes SHA-256 digest of secret.
+    """
+    return hashlib.sha256(secret.encode('utf-8')).digest()
+
+def _parse_credentials(value):
+    """Return the table of HTTP basic authentication credentials in value.
+
+    Args:
+        value: String of whitespace separated username:password pairs, or
+            None.
+    Returns:
+        Dictionary mapping a string username to the bytes digest of its
+        password.
+    """
+    credentials = {}
+    if isinstance(value, str):
+        for pair in value.split():
+            username, separator, password = pair.partition(':')
+            if (len(username) > 0) and (len(separator) > 0):
+                credentials[username] = _hash_secret(password)
+    return credentials
+
+_CREDENTIALS = _parse_credentials(os.environ.get('BASIC_AUTH_CREDENTIALS'))
+"""Dictionary mapping a string username to the bytes digest of its password,
+for credentials other than _USERNAME and _PASSWORD."""
+
+_API_KEYS = frozenset([_hash_secret(key) for key in
+                       os.environ.get('API_KEYS', '').split()])
+"""Frozenset of the bytes digests of the accepted API keys."""
+
+_API_KEY_HEADER = 'X-API-Key'
+"""String name of the request header holding an API key."""
+
+_TRUSTED_NETWORKS = [
+    ipaddress.ip_network(network, strict=False) for network in
+    os.environ.get('TRUSTED_NETWORKS', '').replace(',', ' ').split()]
+"""List of ipaddress networks from which callers need no credentials."""
+
+_UNKNOWN_USER = os.urandom(32)
+"""Bytes digest compared against for unknown usernames, so they take as long
+to reject as wrong passwords."""
+
+_CREDENTIAL_TABLE = None
+"""Tuple of (_USERNAME, _PASSWORD, _CREDENTIALS, dictionary of every
+accepted username and password digest) as last built."""
+
+_CATALOG_PATH = os.environ.get('PLU_CATALOG')
+"""String path of a catalog file replacing the built-in catalog."""
+
+_CATALOG_COMPACT = (os.environ.get('PLU_CATALOG_COMPACT', '').lower() in
+                    ['1', 'true', 'yes'])
+"""Boolean flag to search the catalog file as a plucode.CompactCatalog,
+memory-mapping binary catalog files, instead of indexing it."""
+
+_WATCHER = None
+"""plucode.CatalogWatcher reloading the catalog file when it changes."""
+if isinstance(_CATALOG_PATH, str) and (len(_CATALOG_PATH) > 0):
+    _WATCHER = plucode.CatalogWatcher(_CATALOG_PATH,
+                                      compact=_CATALOG_COMPACT)
+    _WATCHER.check()
+# Index the catalog now rather than during the first request, unless the
+# catalog file is searched as is
+plucode.get_catalog()
+
 _FALLBACKS = [
     "I didn't get that. Can you say it again?",
     "I missed what you said. What was that?",
@@ -54,26 +131,146 @@ _TOO_MANY = [
 ]
 """List of string responses to use when more than _LIMIT matches were found."""
 
-def _build_google_response(text=None, expect_response=False,
-                           choices=_FALLBACKS):
-    """Return a flask.Response object in the Dialogflow webhook format.
+_RANKED = (os.environ.get('RANKED_SEARCH', '').lower() in
+           ['1', 'true', 'yes'])
+"""Boolean flag to answer with the _LIMIT most relevant of too many matches."""
+
+_BATCH_LIMIT = 1000
+"""Integer maximum number of lookups in a single batch request."""
+
+_COMPLETE_LIMIT = 10
+"""Integer maximum number of suggestions for a prefix."""
+
+_CACHE_MAX_AGE = 300
+"""Integer number of seconds plain lookup responses may be cached, as they
+only change with the catalog and carry it as their ETag."""
+
+_STAGES = ['auth', 'parse', 'lookup', 'encode', 'total']
+"""List of string names of the timed stages of a webhook request."""
+
+_OUTCOMES = ['found', 'not_found', 'too_many', 'ranked', 'fallback']
+"""List of string outcomes of a webhook request."""
+
+_LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                    0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+"""List of float upper bounds in seconds of the latency histogram buckets."""
+
+class _ThreadMetrics(object):
+    """Webhook latency histograms and outcome counters of one thread.
+
+    Only its own thread writes to it, so recording takes no lock.
+
+    Attributes:
+        buckets: List per stage of _STAGES of lists of the integer number of
+            requests per bucket of _LATENCY_BUCKETS, the last one counting
+            slower requests.
+        sums: List per stage of _STAGES of the float total seconds.
+        outcomes: Dictionary mapping a string outcome of _OUTCOMES to the
+            integer number of requests.
+    """
+
+    def __init__(self):
+        """Start with no recorded request."""
+        self.buckets = [[0] * (len(_LATENCY_BUCKETS) + 1) for _ in _STAGES]
+        self.sums = [0.0] * len(_STAGES)
+        self.outcomes = {outcome: 0 for outcome in _OUTCOMES}
+
+    def record(self, outcome, durations):
+        """Record a webhook request.
+
+        Args:
+            outcome: String outcome of _OUTCOMES.
+            durations: List of float seconds spent in each stage of _STAGES.
+        """
+        for i, duration in enumerate(durations):
+            self.buckets[i][bisect.bisect_left(_LATENCY_BUCKETS,
+                                               duration)] += 1
+            self.sums[i] += duration
+        self.outcomes[outcome] += 1
+
+_METRICS = {}
+"""Dictionary mapping an integer thread identifier to its _ThreadMetrics.
+Identifiers are reused after threads exit, so it stays as large as the
+largest number of concurrent threads."""
+
+_METRICS_LOCK = threading.Lock()
+"""Lock serializing the registration of _ThreadMetrics in _METRICS."""
+
+def _get_metrics():
+    """Return the _ThreadMetrics of the current thread."""
+    ident = threading.get_ident()
+    metrics = _METRICS.get(ident)
+    if metrics is None:
+        with _METRICS_LOCK:
+            metrics = _METRICS.setdefault(ident, _ThreadMetrics())
+    return metrics
+
+def _format_metrics():
+    """Return the metrics of every thread in the Prometheus text format.
 
-    Args:
-        text: Optional string response text.
-        expect_response: Optional boolean flag indicating whether a user
-            response is expected.
-            Defaults to False which ends the conversation.
-        choices: Optional list of string responses from which to choose when
-            text is not supplied.
     Returns:
-        flask.Response object in the Dialogflow webhook format.
+        String Prometheus text exposition.
     """
-    if not isinstance(text, str):
-        text = choice(choices)
-    if len(text) <= 0:
-        text = choice(choices)
+    with _METRICS_LOCK:
+        all_metrics = list(_METRICS.values())
+    lines = [
+        '# HELP plucode_webhook_stage_seconds '
+        'Time spent in each stage of a webhook request.',
+        '# TYPE plucode_webhook_stage_seconds histogram'
+    ]
+    for i, stage in enumerate(_STAGES):
+        counts = [0] * (len(_LATENCY_BUCKETS) + 1)
+        total = 0.0
+        for metrics in all_metrics:
+            for j, count in enumerate(metrics.buckets[i]):
+                counts[j] += count
+            total += metrics.sums[i]
+        cumulative = 0
+        for bound, count in zip([repr(b) for b in _LATENCY_BUCKETS] +
+                                ['+Inf'], counts):
+            cumulative += count
+            lines.append('plucode_webhook_stage_seconds_bucket'
+                         '{{stage="{0}",le="{1}"}} {2}'.format(
+                             stage, bound, cumulative))
+        lines.append('plucode_webhook_stage_seconds_sum{{stage="{0}"}} '
+                     '{1!r}'.format(stage, total))
+        lines.append('plucode_webhook_stage_seconds_count{{stage="{0}"}} '
+                     '{1}'.format(stage, cumulative))
 
-    response = flask.jsonify({
+    lines.append('# HELP plucode_webhook_requests_total '
+                 'Webhook requests by outcome.')
+    lines.append('# TYPE plucode_webhook_requests_total counter')
+    for outcome in _OUTCOMES:
+        lines.append('plucode_webhook_requests_total{{outcome="{0}"}} '
+                     '{1}'.format(outcome, sum([metrics.outcomes[outcome]
+                                                for metrics in all_metrics])))
+
+    info = plucode.cache_info()
+    for name, value, kind, description in [
+            ('hits_total', info.hits, 'counter',
+             'Lookups found in the cache.'),
+            ('misses_total', info.misses, 'counter',
+             'Lookups missing from the cache.'),
+            ('evictions_total', info.evictions, 'counter',
+             'Results evicted from the cache.'),
+            ('size', info.currsize, 'gauge', 'Results in the cache.')]:
+        lines.append('# HELP plucode_code_cache_{0} {1}'.format(
+            name, description))
+        lines.append('# TYPE plucode_code_cache_{0} {1}'.format(name, kind))
+        lines.append('plucode_code_cache_{0} {1}'.format(name, value))
+    return '\n'.join(lines) + '\n'
+
+def _google_envelope(text, expect_response):
+    """Return the Dialogflow webhook response object for text.
+
+    Args:
+        text: String response text.
+        expect_response: Boolean flag indicating whether a user response is
+            expected.
+    Returns:
+        Dictionary in the Dialogflow webhook format.
+    """
+    return {
         'payload': {
             'google': {
                 'expectUserResponse': expect_response,
@@ -89,64 +286,587 @@ def _build_google_response(text=None, expect_response=False,
                 }
             }
         }
-    })
-    response.content_type = 'application/json; charset=utf-8'
-    return response
+    }
 
-def google(request):
-    """Look up a PLU code or find a PLU code by description.
+def _google_template(expect_response):
+    """Return the encoded Dialogflow webhook response split around the text.
+
+    Args:
+        expect_response: Boolean flag indicating whether a user response is
+            expected.
+    Returns:
+        List of the bytes before, between and after the 2 JSON strings of
+        the response text.
+    """
+    # The placeholder cannot occur elsewhere in the encoded response
+    placeholder = json.dumps('\x00').encode('utf-8')
+    return json.dumps(_google_envelope(
+        '\x00', expect_response)).encode('utf-8').split(placeholder)
+
+_GOOGLE_TEMPLATES = {
+    expect_response: _google_template(expect_response)
+    for expect_response in [False, True]
+}
+"""Dictionary mapping the boolean expect_response flag to the encoded
+Dialogflow webhook response split around the text."""
+
+def _encode_google_response(text, expect_response):
+    """Return the encoded Dialogflow webhook response for text.
+
+    Args:
+        text: String response text.
+        expect_response: Boolean flag indicating whether a user response is
+            expected.
+    Returns:
+        Bytes JSON response body.
+    """
+    before, between, after = _GOOGLE_TEMPLATES[bool(expect_response)]
+    encoded = json.dumps(text).encode('utf-8')
+    return b''.join([before, encoded, between, encoded, after])
+
+_CANNED_RESPONSES = {
+    (text, expect_response): _encode_google_response(text, expect_response)
+    for text in _FALLBACKS + _NOT_FOUND + _TOO_MANY
+    for expect_response in [False, True]
+}
+"""Dictionary mapping (string response text, boolean expect_response flag)
+tuples to the encoded Dialogflow webhook response of every canned reply."""
+
+def _get_credentials():
+    """Return every accepted HTTP basic authentication credential.
+
+    The table is only rebuilt when _USERNAME, _PASSWORD or _CREDENTIALS
+    are replaced.
+
+    Returns:
+        Dictionary mapping a string username to the bytes digest of its
+        password.
+    """
+    global _CREDENTIAL_TABLE
+    table = _CREDENTIAL_TABLE
+    if ((table is None) or (table[0] is not _USERNAME) or
+        (table[1] is not _PASSWORD) or (table[2] is not _CREDENTIALS)):
+        credentials = dict(_CREDENTIALS)
+        if isinstance(_USERNAME, str) and isinstance(_PASSWORD, str):
+            credentials[_USERNAME] = _hash_secret(_PASSWORD)
+        table = (_USERNAME, _PASSWORD, _CREDENTIALS, credentials)
+        _CREDENTIAL_TABLE = table
+    return table[3]
+
+def _check_credentials(username, password):
+    """Return whether HTTP basic authentication credentials are accepted.
+
+    Passwords are compared by digest in constant time.
+
+    Args:
+        username: String username, or None without credentials.
+        password: String password, or None without credentials.
+    Returns:
+        Boolean flag indicating whether the credentials are authorized.
+    """
+    if (not isinstance(username, str)) or (not isinstance(password, str)):
+        return False
+    credentials = _get_credentials()
+    expected = credentials.get(username, _UNKNOWN_USER)
+    return (hmac.compare_digest(_hash_secret(password), expected) and
+            (username in credentials))
+
+def _is_trusted(address):
+    """Return whether a caller address is in a trusted network.
+
+    Args:
+        address: String IP address of the caller, or None if unknown.
+    Returns:
+        Boolean flag indicating whether the caller needs no credentials.
+    """
+    if (len(_TRUSTED_NETWORKS) <= 0) or (not isinstance(address, str)):
+        return False
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    for network in _TRUSTED_NETWORKS:
+        if address in network:
+            return True
+    return False
+
+def _is_allowed(address, username, password, api_key):
+    """Return whether a caller is authorized.
+
+    Without any configured credential or API key every caller is.
+
+    Args:
+        address: String IP address of the caller, or None if unknown.
+        username: String HTTP basic authentication username, or None.
+        password: String HTTP basic authentication password, or None.
+        api_key: String API key, or None.
+    Returns:
+        Boolean flag indicating whether the caller is authorized.
+    """
+    if (len(_get_credentials()) <= 0) and (len(_API_KEYS) <= 0):
+        return True
+    if _is_trusted(address):
+        return True
+    if api_key is not None:
+        return _hash_secret(api_key) in _API_KEYS
+    return _check_credentials(username, password)
+
+def _is_authorized(request):
+    """Return whether request passes authentication.
 
     Args:
         request (flask.Request): The request object.
-        <https://flask.palletsprojects.com/en/1.0.x/api/#flask.Request>
     Returns:
-        The response text, or any set of values that can be turned into a
-        Response object using `make_response`.
-        <https://flask.palletsprojects.com/en/1.0.x/api/#flask.Flask.make_response>
+        Boolean flag indicating whether request is authorized.
     """
-    if isinstance(_USERNAME, str) and isinstance(_PASSWORD, str):
-        # HTTP basic authentication
-        if request.authorization is None:
-            return flask.abort(401)
-        if ((request.authorization.username != _USERNAME) or
-            (request.authorization.password != _PASSWORD)):
-            return flask.abort(401)
+    authorization = request.authorization
+    if authorization is None:
+        username = password = None
+    else:
+        username = authorization.username
+        password = authorization.password
+    return _is_allowed(request.remote_addr, username, password,
+                       request.headers.get(_API_KEY_HEADER))
 
-    if request.method != 'POST':
-        return flask.abort(405)
+def _get_catalog():
+    """Return the current catalog after checking its file for changes.
 
-    request_json = request.get_json(silent=True)
+    Returns:
+        Catalog from plucode.get_catalog(), which stays consistent for the
+        rest of the request even if the catalog is reloaded meanwhile.
+    """
+    if _WATCHER is not None:
+        _WATCHER.check()
+    return plucode.get_catalog()
+
+def _google_response_body(text=None, expect_response=False,
+                          choices=_FALLBACKS):
+    """Return a response body in the Dialogflow webhook format.
+
+    Canned replies are encoded once, other text is escaped into the encoded
+    response around it.
+
+    Args:
+        text: Optional string response text.
+        expect_response: Optional boolean flag indicating whether a user
+            response is expected.
+            Defaults to False which ends the conversation.
+        choices: Optional list of string responses from which to choose when
+            text is not supplied.
+    Returns:
+        Bytes JSON response body.
+    """
+    if not isinstance(text, str):
+        text = choice(choices)
+    if len(text) <= 0:
+        text = choice(choices)
+
+    body = _CANNED_RESPONSES.get((text, bool(expect_response)))
+    if body is None:
+        body = _encode_google_response(text, expect_response)
+    return body
+
+def _build_google_response(text=None, expect_response=False,
+                           choices=_FALLBACKS):
+    """Return a flask.Response object in the Dialogflow webhook format.
+
+    Args:
+        text: Optional string response text.
+        expect_response: Optional boolean flag indicating whether a user
+            response is expected.
+            Defaults to False which ends the conversation.
+        choices: Optional list of string responses from which to choose when
+            text is not supplied.
+    Returns:
+        flask.Response object in the Dialogflow webhook format.
+    """
+    return flask.Response(
+        _google_response_body(text, expect_response, choices),
+        content_type='application/json; charset=utf-8')
+
+def _find_codes(catalog, keywords):
+    """Return the PLU codes matching keywords as the webhook finds them.
+
+    Args:
+        catalog: Catalog from plucode.get_catalog().
+        keywords: List of string lowercase keywords.
+    Returns:
+        List of string numeric PLU codes in ascending order.
+    """
+    # Whole words first, so "pear" does not also find "pearl"
+    codes = catalog.get_code(keywords, stem=True)
+    if len(codes) <= 0:
+        codes = catalog.get_code_fuzzy(keywords)
+    return codes
+
+def _find_codes_many(catalog, queries):
+    """Return the PLU codes matching each query as the webhook finds them.
+
+    Each distinct set of keywords is only matched once.
+
+    Args:
+        catalog: Catalog from plucode.get_catalog().
+        queries: List of lists of string lowercase keywords.
+    Returns:
+        List of lists of string numeric PLU codes in ascending order, one
+        per query in the order of queries.
+    """
+    results = {}
+    codes = []
+    for keywords in queries:
+        key = frozenset(keywords)
+        if key not in results:
+            results[key] = _find_codes(catalog, keywords)
+        codes.append(results[key])
+    return codes
+
+def _answer(request_json, catalog):
+    """Return the reply to a Dialogflow webhook request.
+
+    Args:
+        request_json: Decoded JSON request body, or None if it is not JSON.
+        catalog: Catalog from plucode.get_catalog().
+    Returns:
+        Tuple of (string response text or None, list of string responses
+        from which to choose when the text is None or empty, string outcome
+        of _OUTCOMES).
+    """
     if not isinstance(request_json, dict):
-        # mimetype does not indicate JSON or parsing failed
-        return _build_google_response()
+        return (None, _FALLBACKS, 'fallback')
     query_result = request_json.get('queryResult')
     if not isinstance(query_result, dict):
-        return _build_google_response()
+        return (None, _FALLBACKS, 'fallback')
     parameters = query_result.get('parameters')
     if not isinstance(parameters, dict):
-        return _build_google_response()
+        return (None, _FALLBACKS, 'fallback')
 
     number = parameters.get('number')
     description = parameters.get('description')
     if isinstance(number, str):
-        return _build_google_response(plucode.get_description(number),
-                                      choices=_NOT_FOUND)
+        text = catalog.get_description(plucode.parse_spoken_code(number))
+        if len(text) <= 0:
+            return (None, _NOT_FOUND, 'not_found')
+        return (text, _NOT_FOUND, 'found')
     elif isinstance(description, str) and (len(description) > 0):
         keywords = description.strip().lower().split()
-        codes = plucode.get_code(keywords)
+        codes = _find_codes(catalog, keywords)
         count = len(codes)
         if count <= 0:
-            return _build_google_response(choices=_NOT_FOUND)
+            return (None, _NOT_FOUND, 'not_found')
         elif count > _LIMIT:
-            return _build_google_response(choices=_TOO_MANY)
+            if _RANKED:
+                return (', '.join(catalog.rank(codes, keywords, _LIMIT)),
+                        _FALLBACKS, 'ranked')
+            return (None, _TOO_MANY, 'too_many')
         else:
-            return _build_google_response(', '.join(codes))
+            return (', '.join(codes), _FALLBACKS, 'found')
+    else:
+        return (None, _FALLBACKS, 'fallback')
+
+def google(request):
+    """Look up a PLU code or find a PLU code by description.
+
+    Args:
+        request (flask.Request): The request object.
+        <https://flask.palletsprojects.com/en/1.0.x/api/#flask.Request>
+    Returns:
+        The response text, or any set of values that can be turned into a
+        Response object using `make_response`.
+        <https://flask.palletsprojects.com/en/1.0.x/api/#flask.Flask.make_response>
+    """
+    start = time.perf_counter()
+    if not _is_authorized(request):
+        return flask.abort(401)
+
+    if request.method != 'POST':
+        return flask.abort(405)
+
+    authorized = time.perf_counter()
+    # None when mimetype does not indicate JSON or parsing failed
+    request_json = request.get_json(silent=True)
+    parsed = time.perf_counter()
+    text, choices, outcome = _answer(request_json, _get_catalog())
+    answered = time.perf_counter()
+    response = _build_google_response(text, choices=choices)
+    encoded = time.perf_counter()
+    _get_metrics().record(outcome, [authorized - start, parsed - authorized,
+                                    answered - parsed, encoded - answered,
+                                    encoded - start])
+    return response
+
+def _set_cache_headers(response, etag):
+    """Make a plain lookup response cacheable until the catalog changes.
+
+    Shared caches may only store responses when no credential or API key
+    is configured, and cached responses vary with them either way.
+
+    Args:
+        response (flask.Response): The response object.
+        etag: String version of the catalog the response comes from.
+    Returns:
+        response.
+    """
+    response.set_etag(etag)
+    scope = 'public'
+    if (len(_get_credentials()) > 0) or (len(_API_KEYS) > 0):
+        scope = 'private'
+    response.headers['Cache-Control'] = '{0}, max-age={1}'.format(
+        scope, _CACHE_MAX_AGE)
+    response.headers['Vary'] = 'Authorization, ' + _API_KEY_HEADER
+    return response
+
+def _check_not_modified(request, catalog):
+    """Return an empty response if request already has the current version.
+
+    Only ETags are compared, so the lookup can be skipped. "*" matches any
+    existing result and is left to _build_cached_response().
+
+    Args:
+        request (flask.Request): The request object.
+        catalog: Catalog from plucode.get_catalog() to look up from.
+    Returns:
+        flask.Response object without a body, or None if the lookup is
+        needed.
+    """
+    etag = catalog.version()
+    if request.if_none_match.is_strong(etag):
+        return _set_cache_headers(flask.Response(status=304), etag)
+    return None
+
+def _build_cached_response(request, catalog, result):
+    """Return a compact JSON flask.Response cacheable until catalog changes.
+
+    Args:
+        request (flask.Request): The request object.
+        catalog: Catalog from plucode.get_catalog() that result comes from.
+        result: JSON serializable result.
+    Returns:
+        flask.Response object with the JSON result, or without a body when
+        the request already has the current version.
+    """
+    etag = catalog.version()
+    if request.if_none_match.contains(etag):
+        response = flask.Response(status=304)
     else:
-        return _build_google_response()
+        response = flask.Response(
+            json.dumps(result, separators=(',', ':')),
+            content_type='application/json; charset=utf-8')
+    return _set_cache_headers(response, etag)
+
+def code(request, plu):
+    """Look up the description of a PLU code.
+
+    The response body is a JSON object with the "code" and its
+    "description".
+
+    Args:
+        request (flask.Request): The request object.
+        plu: String numeric PLU code from the URL.
+    Returns:
+        flask.Response object with the JSON result.
+    """
+    if not _is_authorized(request):
+        return flask.abort(401)
+
+    if request.method != 'GET':
+        return flask.abort(405)
+
+    catalog = _get_catalog()
+    response = _check_not_modified(request, catalog)
+    if response is not None:
+        return response
+    description = catalog.get_description(plu)
+    if len(description) <= 0:
+        return flask.abort(404)
+    return _build_cached_response(
+        request, catalog, {'code': plu, 'description': description})
+
+def search(request):
+    """Find the PLU codes matching a description.
+
+    The "q" query parameter holds the description. The response body is a
+    JSON object with the "codes" list in ascending order.
+
+    Args:
+        request (flask.Request): The request object.
+    Returns:
+        flask.Response object with the JSON result.
+    """
+    if not _is_authorized(request):
+        return flask.abort(401)
+
+    if request.method != 'GET':
+        return flask.abort(405)
+
+    query = request.args.get('q')
+    if query is None:
+        return flask.abort(400)
+    catalog = _get_catalog()
+    response = _check_not_modified(request, catalog)
+    if response is not None:
+        return response
+    return _build_cached_response(
+        request, catalog,
+        {'codes': _find_codes(catalog, query.strip().lower().split())})
+
+def batch(request):
+    """Look up many PLU codes and descriptions in a single request.
+
+    The request body is a JSON object with an optional "numbers" list of
+    string PLU codes and an optional "descriptions" list of string
+    descriptions. The response body is a JSON object with the same keys
+    holding the string description for each number and the list of string
+    PLU codes for each description, in request order. Descriptions match
+    like they do in the webhook and search().
+
+    Args:
+        request (flask.Request): The request object.
+    Returns:
+        flask.Response object with the JSON results.
+    """
+    if not _is_authorized(request):
+        return flask.abort(401)
+
+    if request.method != 'POST':
+        return flask.abort(405)
+
+    request_json = request.get_json(silent=True)
+    if not isinstance(request_json, dict):
+        return flask.abort(400)
+    numbers = request_json.get('numbers', [])
+    descriptions = request_json.get('descriptions', [])
+    for values in [numbers, descriptions]:
+        if not isinstance(values, list):
+            return flask.abort(400)
+        for value in values:
+            if not isinstance(value, str):
+                return flask.abort(400)
+    if (len(numbers) + len(descriptions)) > _BATCH_LIMIT:
+        return flask.abort(413)
+
+    catalog = _get_catalog()
+    response = flask.jsonify({
+        'numbers': catalog.get_descriptions_many(numbers),
+        'descriptions': _find_codes_many(
+            catalog, [description.strip().lower().split()
+                      for description in descriptions])
+    })
+    response.content_type = 'application/json; charset=utf-8'
+    return response
+
+def complete(request):
+    """Suggest completions of the last word of a partial query.
+
+    The "q" query parameter holds the partial description or PLU code. The
+    response body is a JSON object with a "suggestions" list of the query
+    with its last word completed, in ascending order.
+
+    Args:
+        request (flask.Request): The request object.
+    Returns:
+        flask.Response object with the JSON suggestions.
+    """
+    if not _is_authorized(request):
+        return flask.abort(401)
+
+    if request.method != 'GET':
+        return flask.abort(405)
+
+    query = request.args.get('q')
+    if query is None:
+        return flask.abort(400)
+    words = query.lower().split()
+    suggestions = []
+    if (len(words) > 0) and (not query[-1].isspace()):
+        leading = ' '.join(words[:-1] + [''])
+        suggestions = [
+            leading + completion for completion in
+            _get_catalog().complete(words[-1], _COMPLETE_LIMIT)]
+    response = flask.jsonify({'suggestions': suggestions})
+    response.content_type = 'application/json; charset=utf-8'
+    return response
+
+def reload(request):
+    """Reload the catalog file now instead of waiting for a change check.
+
+    Args:
+        request (flask.Request): The request object.
+    Returns:
+        flask.Response object with the JSON number of added, changed and
+        removed PLU codes.
+    """
+    if not _is_authorized(request):
+        return flask.abort(401)
+
+    if request.method != 'POST':
+        return flask.abort(405)
+
+    if _WATCHER is None:
+        return flask.abort(404)
+    try:
+        diff = _WATCHER.reload()
+    except (OSError, ValueError):
+        # Keep serving the current catalog
+        return flask.abort(500)
+    response = flask.jsonify({
+        'added': len(diff.added),
+        'changed': len(diff.changed),
+        'removed': len(diff.removed)
+    })
+    response.content_type = 'application/json; charset=utf-8'
+    return response
+
+def metrics(request):
+    """Expose the webhook metrics of every thread to Prometheus.
+
+    Args:
+        request (flask.Request): The request object.
+    Returns:
+        flask.Response object with the metrics in the Prometheus text format.
+    """
+    if not _is_authorized(request):
+        return flask.abort(401)
+
+    if request.method != 'GET':
+        return flask.abort(405)
+
+    return flask.Response(_format_metrics(),
+                          content_type='text/plain; version=0.0.4; '
+                          'charset=utf-8')
 
 def root_view():
     """Call the function with the Flask request."""
     return google(flask.request)
 
+def batch_view():
+    """Call the batch function with the Flask request."""
+    return batch(flask.request)
+
+def code_view(plu):
+    """Call the code function with the Flask request."""
+    return code(flask.request, plu)
+
+def search_view():
+    """Call the search function with the Flask request."""
+    return search(flask.request)
+
+def complete_view():
+    """Call the complete function with the Flask request."""
+    return complete(flask.request)
+
+def metrics_view():
+    """Call the metrics function with the Flask request."""
+    return metrics(flask.request)
+
+def reload_view():
+    """Call the reload function with the Flask request."""
+    return reload(flask.request)
+
 app = flask.Flask(__name__)
 app.add_url_rule('/', 'root', root_view, methods=['POST'])
+app.add_url_rule('/batch', 'batch', batch_view, methods=['POST'])
+app.add_url_rule('/code/<plu>', 'code', code_view, methods=['GET'])
+app.add_url_rule('/search', 'search', search_view, methods=['GET'])
+app.add_url_rule('/complete', 'complete', complete_view, methods=['GET'])
+app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
+app.add_url_rule('/reload', 'reload', reload_view, methods=['POST'])
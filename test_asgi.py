@@ -0,0 +1,231 @@
+"""Test the webhook served by the ASGI application."""
+
+import asyncio
+import base64
+import json
+import unittest
+
+import asgi
+import main
+from lib import plucode
+
+main._USERNAME = 'username'
+main._PASSWORD = 'password'
+
+TEST_PATH = '/'
+"""String path under which the webhook is served."""
+
+def _authorization(username, password):
+    """Return an HTTP basic Authorization header value."""
+    return b'Basic ' + base64.b64encode(
+        '{0}:{1}'.format(username, password).encode('utf-8'))
+
+class ApplicationTest(unittest.TestCase):
+    def setUp(self):
+        self.headers = [
+            (b'authorization', _authorization(main._USERNAME, main._PASSWORD))]
+
+    def request(self, method='POST', path=TEST_PATH, body=b'', headers=None,
+                chunk_size=None, client=None):
+        """Return the (status, headers, body) response of the application."""
+        if headers is None:
+            headers = self.headers
+        if chunk_size is None:
+            chunk_size = max(1, len(body))
+        messages = [{'type': 'http.request',
+                     'body': body[i:i + chunk_size],
+                     'more_body': i + chunk_size < len(body)}
+                    for i in range(0, max(1, len(body)), chunk_size)]
+        sent = []
+
+        async def receive():
+            if len(messages) > 0:
+                return messages.pop(0)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path,
+                 'headers': headers, 'client': client}
+        asyncio.run(asgi.app(scope, receive, send))
+        self.assertEqual([message['type'] for message in sent],
+                         ['http.response.start', 'http.response.body'])
+        response_headers = dict(sent[0]['headers'])
+        self.assertEqual(int(response_headers[b'content-length']),
+                         len(sent[1]['body']))
+        return (sent[0]['status'], response_headers, sent[1]['body'])
+
+    def post_json(self, data):
+        """Return the response text of the application to data."""
+        status, headers, body = self.request(
+            body=json.dumps(data).encode('utf-8'),
+            headers=self.headers + [(b'content-type', b'application/json')])
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'],
+                         b'application/json; charset=utf-8')
+        json_response = json.loads(body.decode('utf-8'))
+        self.assertFalse(
+            json_response['payload']['google']['expectUserResponse'])
+        items = json_response['payload']['google']['richResponse']['items']
+        self.assertEqual(items[0]['simpleResponse']['displayText'],
+                         items[0]['simpleResponse']['textToSpeech'])
+        return items[0]['simpleResponse']['textToSpeech']
+
+    def test_bad_authentication(self):
+        """Test bad HTTP basic authentication."""
+        for value in [[], [(b'authorization', b'Bearer foo')],
+                      [(b'authorization', b'Basic !!!')],
+                      [(b'authorization', b'Basic ' +
+                        base64.b64encode(b'username'))],
+                      [(b'authorization', _authorization('foo', 'bar'))],
+                      [(b'authorization',
+                        _authorization('foo', main._PASSWORD))],
+                      [(b'authorization',
+                        _authorization(main._USERNAME, 'bar'))]]:
+            status, headers, body = self.request(headers=value)
+            self.assertEqual(status, 401)
+            self.assertIn(b'www-authenticate', headers)
+
+    def test_api_key(self):
+        """Test authenticating with an API key."""
+        api_keys = main._API_KEYS
+        try:
+            main._API_KEYS = frozenset([main._hash_secret('secret')])
+            status, headers, body = self.request(
+                headers=[(b'x-api-key', b'secret')])
+            self.assertEqual(status, 200)
+            status, headers, body = self.request(
+                headers=self.headers + [(b'X-API-Key', b'Secret')])
+            self.assertEqual(status, 401)
+        finally:
+            main._API_KEYS = api_keys
+
+    def test_trusted_networks(self):
+        """Test skipping authentication for trusted callers."""
+        trusted_networks = main._TRUSTED_NETWORKS
+        try:
+            main._TRUSTED_NETWORKS = [main.ipaddress.ip_network('10.0.0.0/8')]
+            for client, expected in [(('10.1.2.3', 1234), 200),
+                                     (('11.1.2.3', 1234), 401),
+                                     (None, 401)]:
+                status, headers, body = self.request(headers=[],
+                                                     client=client)
+                self.assertEqual(status, expected)
+        finally:
+            main._TRUSTED_NETWORKS = trusted_networks
+
+    def test_bad_methods(self):
+        """Test incorrect request methods."""
+        for method in ['GET', 'PUT', 'DELETE']:
+            status, headers, body = self.request(method)
+            self.assertEqual(status, 405)
+
+    def test_too_large(self):
+        """Test a request body that is too large."""
+        status, headers, body = self.request(
+            body=b' ' * (asgi._MAX_BODY_SIZE + 1), chunk_size=65536)
+        self.assertEqual(status, 413)
+
+    def test_not_found_path(self):
+        """Test a path not served without a fallback application."""
+        fallback = asgi._FALLBACK_APP
+        try:
+            asgi._FALLBACK_APP = None
+            status, headers, body = self.request(path='/batch')
+            self.assertEqual(status, 404)
+        finally:
+            asgi._FALLBACK_APP = fallback
+
+    def test_lifespan(self):
+        """Test acknowledging the lifespan events."""
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(asgi.app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [{'type': 'lifespan.startup.complete'},
+                                {'type': 'lifespan.shutdown.complete'}])
+
+    def test_not_JSON(self):
+        """Test posting a non-JSON body."""
+        status, headers, body = self.request()
+        self.assertEqual(status, 200)
+        for value in [b'', b'{', b'\xff']:
+            status, headers, body = self.request(
+                body=value,
+                headers=self.headers + [(b'content-type',
+                                         b'application/json')])
+            self.assertEqual(status, 200)
+            self.assertIn(json.loads(body.decode('utf-8'))['payload'][
+                'google']['richResponse']['items'][0]['simpleResponse'][
+                    'textToSpeech'], main._FALLBACKS)
+        status, headers, body = self.request(
+            body=b'{"queryResult": {"parameters": {"number": "4011"}}}',
+            headers=self.headers + [(b'content-type', b'text/plain')])
+        self.assertEqual(status, 200)
+        self.assertIn(json.loads(body.decode('utf-8'))['payload']['google'][
+            'richResponse']['items'][0]['simpleResponse']['textToSpeech'],
+                      main._FALLBACKS)
+        for value in [[], {'queryResult': []},
+                      {'queryResult': {'parameters': []}},
+                      {'queryResult': {'parameters': {'foo': 'bar'}}},
+                      {'queryResult': {'parameters': {'description': ''}}}]:
+            self.assertIn(self.post_json(value), main._FALLBACKS)
+
+    def test_number(self):
+        """Test a request with a numeric PLU code."""
+        for value in ['4011', '94011', 'four zero one one']:
+            self.assertEqual(
+                self.post_json({'queryResult': {'parameters': {
+                    'number': value}}}),
+                plucode.get_description(plucode.parse_spoken_code(value)))
+
+    def test_description(self):
+        """Test a request with a description."""
+        for value, expected in [('foobar', main._NOT_FOUND),
+                                ('apples', main._TOO_MANY)]:
+            self.assertIn(self.post_json({'queryResult': {'parameters': {
+                'description': value}}}), expected)
+        for code in ['4011', '4552', '4600']:
+            self.assertIn(code, self.post_json({'queryResult': {'parameters': {
+                'description': plucode._PLU_MAP[code]}}}))
+
+    def test_metrics(self):
+        """Test recording webhook latencies and outcomes."""
+        metrics = main._get_metrics()
+        outcomes = dict(metrics.outcomes)
+        counts = [sum(buckets) for buckets in metrics.buckets]
+        self.post_json({'queryResult': {'parameters': {'number': '4011'}}})
+        self.post_json({'queryResult': {'parameters': {'foo': 'bar'}}})
+        self.assertEqual(metrics.outcomes['found'] - outcomes['found'], 1)
+        self.assertEqual(metrics.outcomes['fallback'] - outcomes['fallback'],
+                         1)
+        self.assertEqual([sum(buckets) - count for buckets, count in
+                          zip(metrics.buckets, counts)],
+                         [2] * len(main._STAGES))
+
+    def test_same_as_flask(self):
+        """Test answering like the Flask application."""
+        import webtest
+        flask_app = webtest.TestApp(main.app)
+        flask_app.authorization = ('Basic', (main._USERNAME, main._PASSWORD))
+        for parameters in [{'number': '4011'}, {'number': '9 4 0 1 1'},
+                           {'description': 'hass avocados'},
+                           {'description': 'bosc pair'},
+                           {'description': 'cantalope'}]:
+            data = {'queryResult': {'parameters': parameters}}
+            self.assertEqual(self.post_json(data),
+                             flask_app.post_json('/', data).json['payload'][
+                                 'google']['richResponse']['items'][0][
+                                     'simpleResponse']['textToSpeech'])
+
+if __name__ == '__main__':
+    suite = unittest.defaultTestLoader.loadTestsFromTestCase(ApplicationTest)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,5 +1,10 @@
 """Test the function wrapped in the Flask application."""
 
+import json
+import os.path
+import re
+import tempfile
+import threading
 import unittest
 
 import flask
@@ -14,6 +19,24 @@ main._PASSWORD = 'password'
 TEST_URL = '/'
 """String URL under which the function is mapped."""
 
+BATCH_URL = '/batch'
+"""String URL under which the batch function is mapped."""
+
+RELOAD_URL = '/reload'
+"""String URL under which the reload function is mapped."""
+
+COMPLETE_URL = '/complete'
+"""String URL under which the complete function is mapped."""
+
+CODE_URL = '/code/{0}'
+"""String URL format under which the code function is mapped."""
+
+SEARCH_URL = '/search'
+"""String URL under which the search function is mapped."""
+
+METRICS_URL = '/metrics'
+"""String URL under which the metrics function is mapped."""
+
 class FunctionTest(unittest.TestCase):
     def setUp(self):
         # Enable Flask debugging
@@ -31,6 +54,91 @@ class FunctionTest(unittest.TestCase):
             self.app.authorization = value
             response = self.app.post(TEST_URL, status=401)
             self.assertEqual(response.status_int, 401)
+            response = self.app.post_json(BATCH_URL, {}, status=401)
+            self.assertEqual(response.status_int, 401)
+            response = self.app.post(RELOAD_URL, status=401)
+            self.assertEqual(response.status_int, 401)
+            response = self.app.get(COMPLETE_URL, {'q': 'app'}, status=401)
+            self.assertEqual(response.status_int, 401)
+            response = self.app.get(CODE_URL.format('4011'), status=401)
+            self.assertEqual(response.status_int, 401)
+            response = self.app.get(SEARCH_URL, {'q': 'app'}, status=401)
+            self.assertEqual(response.status_int, 401)
+            response = self.app.get(METRICS_URL, status=401)
+            self.assertEqual(response.status_int, 401)
+
+    def test_credentials(self):
+        """Test authenticating with any of several credentials."""
+        credentials = main._CREDENTIALS
+        try:
+            main._CREDENTIALS = main._parse_credentials(
+                'foo:bar baz:qu:ux invalid :empty')
+            self.assertEqual(sorted(main._CREDENTIALS), ['baz', 'foo'])
+            for value in [(main._USERNAME, main._PASSWORD), ('foo', 'bar'),
+                          ('baz', 'qu:ux')]:
+                self.app.authorization = ('Basic', value)
+                response = self.app.get(CODE_URL.format('4011'))
+                self.assertEqual(response.status_int, 200)
+            for value in [('foo', 'qu:ux'), ('baz', 'bar'), ('invalid', ''),
+                          ('', 'empty'), ('foo', 'BAR'), ('Foo', 'bar')]:
+                self.app.authorization = ('Basic', value)
+                response = self.app.get(CODE_URL.format('4011'), status=401)
+                self.assertEqual(response.status_int, 401)
+        finally:
+            main._CREDENTIALS = credentials
+
+    def test_api_key(self):
+        """Test authenticating with an API key."""
+        api_keys = main._API_KEYS
+        try:
+            main._API_KEYS = frozenset([main._hash_secret('secret')])
+            self.app.authorization = None
+            response = self.app.get(
+                CODE_URL.format('4011'),
+                headers={main._API_KEY_HEADER: 'secret'})
+            self.assertEqual(response.status_int, 200)
+            for value in ['', 'Secret', 'secret ', main._PASSWORD]:
+                self.app.authorization = ('Basic', (main._USERNAME,
+                                                    main._PASSWORD))
+                response = self.app.get(
+                    CODE_URL.format('4011'),
+                    headers={main._API_KEY_HEADER: value}, status=401)
+                self.assertEqual(response.status_int, 401)
+        finally:
+            main._API_KEYS = api_keys
+
+    def test_trusted_networks(self):
+        """Test skipping authentication for trusted callers."""
+        trusted_networks = main._TRUSTED_NETWORKS
+        try:
+            main._TRUSTED_NETWORKS = [main.ipaddress.ip_network('10.0.0.0/8'),
+                                      main.ipaddress.ip_network('::1')]
+            self.app.authorization = None
+            for value in ['10.1.2.3', '::1']:
+                response = self.app.get(CODE_URL.format('4011'),
+                                        extra_environ={'REMOTE_ADDR': value})
+                self.assertEqual(response.status_int, 200)
+            for value in ['11.1.2.3', '::2', 'localhost', '']:
+                response = self.app.get(CODE_URL.format('4011'),
+                                        extra_environ={'REMOTE_ADDR': value},
+                                        status=401)
+                self.assertEqual(response.status_int, 401)
+        finally:
+            main._TRUSTED_NETWORKS = trusted_networks
+
+    def test_no_authentication(self):
+        """Test serving every caller without configured credentials."""
+        username = main._USERNAME
+        password = main._PASSWORD
+        try:
+            main._USERNAME = None
+            main._PASSWORD = None
+            self.app.authorization = None
+            response = self.app.get(CODE_URL.format('4011'))
+            self.assertEqual(response.status_int, 200)
+        finally:
+            main._USERNAME = username
+            main._PASSWORD = password
 
     def test_bad_methods(self):
         """Test incorrect request methods."""
@@ -43,6 +151,16 @@ class FunctionTest(unittest.TestCase):
         response = self.app.delete(TEST_URL, status=405)
         self.assertEqual(response.status_int, 405)
 
+        for method in [self.app.get, self.app.put, self.app.delete]:
+            for url in [BATCH_URL, RELOAD_URL]:
+                response = method(url, status=405)
+                self.assertEqual(response.status_int, 405)
+        for method in [self.app.post, self.app.put, self.app.delete]:
+            for url in [COMPLETE_URL, CODE_URL.format('4011'), SEARCH_URL,
+                        METRICS_URL]:
+                response = method(url, status=405)
+                self.assertEqual(response.status_int, 405)
+
     def assertResponse(self, response, expected=None):
         """Test response contains a JSON response."""
         self.assertEqual(response.status_int, 200)
@@ -90,6 +208,22 @@ class FunctionTest(unittest.TestCase):
             TEST_URL, {'queryResult': {'parameters': {'description': ''}}})
         self.assertResponse(response, main._FALLBACKS)
 
+    def test_response_body(self):
+        """Test encoding responses in the Dialogflow webhook format."""
+        for text in main._FALLBACKS + main._NOT_FOUND + main._TOO_MANY + [
+                '4011, 94011', 'organic napa cabbage. Over 9000!', "foo's",
+                '"quoted" \\ back\nslash', 'caf\u00e9 \U0001f34c', '\x00']:
+            for expect_response in [False, True]:
+                body = main._google_response_body(text, expect_response)
+                self.assertIsInstance(body, bytes)
+                self.assertEqual(json.loads(body.decode('utf-8')),
+                                 main._google_envelope(text, expect_response))
+        for text in [None, '']:
+            body = json.loads(main._google_response_body(
+                text, choices=main._NOT_FOUND).decode('utf-8'))
+            self.assertIn(body['payload']['google']['richResponse']['items'][
+                0]['simpleResponse']['textToSpeech'], main._NOT_FOUND)
+
     def test_number(self):
         """Test a request with a numeric PLU code."""
         for code in plucode._PLU_MAP:
@@ -98,6 +232,20 @@ class FunctionTest(unittest.TestCase):
                 response = self.app.post_json(TEST_URL, data)
                 self.assertResponse(response, plucode.get_description(value))
 
+    def test_spoken_number(self):
+        """Test a request with a spoken PLU code."""
+        for value, code in [('four zero one one', '4011'),
+                            ('forty-eleven', '4011'),
+                            ('nine four oh one one', '94011'),
+                            ('four thousand five hundred fifty two', '4552')]:
+            data = {'queryResult': {'parameters': {'number': value}}}
+            response = self.app.post_json(TEST_URL, data)
+            self.assertResponse(response, plucode.get_description(code))
+        for value in ['foobar', '1' * 5000 + ' hundred', 'thousand ' * 1500]:
+            data = {'queryResult': {'parameters': {'number': value}}}
+            response = self.app.post_json(TEST_URL, data)
+            self.assertResponse(response, main._NOT_FOUND)
+
     def test_description(self):
         """Test a request with a description."""
         for code, description in plucode._PLU_MAP.items():
@@ -121,6 +269,22 @@ class FunctionTest(unittest.TestCase):
                 {'queryResult': {'parameters': {'description': value}}})
             self.assertResponse(response, main._NOT_FOUND)
 
+    def test_misspelled(self):
+        """Test a request with a misspelled description."""
+        for value in ['cantalope', 'zuchini', 'avacado hass', 'brockolee']:
+            response = self.app.post_json(
+                TEST_URL,
+                {'queryResult': {'parameters': {'description': value}}})
+            self.assertResponse(response)
+            self.assertNotIn(
+                response.json['payload']['google']['richResponse']['items'][
+                    0]['simpleResponse']['textToSpeech'],
+                main._NOT_FOUND + main._TOO_MANY)
+        response = self.app.post_json(
+            TEST_URL,
+            {'queryResult': {'parameters': {'description': 'a' * 1200}}})
+        self.assertResponse(response, main._NOT_FOUND)
+
     def test_too_many(self):
         """Test a request with too many matches."""
         for value in ['apples', 'ORANGES', 'Grapes', 'pEARS',
@@ -130,6 +294,355 @@ class FunctionTest(unittest.TestCase):
                 {'queryResult': {'parameters': {'description': value}}})
             self.assertResponse(response, main._TOO_MANY)
 
+    def test_ranked(self):
+        """Test a request with too many matches answered by relevance."""
+        try:
+            main._RANKED = True
+            catalog = plucode.get_catalog()
+            for value in ['apples', 'ORANGES', 'Grapes', 'pEARS',
+                          'tangerines mandarins', 'aples', 'bananna',
+                          'avacados', 'tomatos', 'cherries']:
+                response = self.app.post_json(
+                    TEST_URL,
+                    {'queryResult': {'parameters': {'description': value}}})
+                keywords = value.lower().split()
+                found = main._find_codes(catalog, keywords)
+                codes = catalog.rank(found, keywords, main._LIMIT)
+                self.assertEqual(len(codes), main._LIMIT)
+                self.assertTrue(set(codes).issubset(found))
+                self.assertResponse(response, ', '.join(codes))
+            # Plurals rank the codes found by stem, not only by substring
+            self.assertIn('3039', codes)
+            response = self.app.post_json(
+                TEST_URL,
+                {'queryResult': {'parameters': {'description': 'napa'}}})
+            self.assertResponse(response, '4552')
+        finally:
+            main._RANKED = False
+
+    def test_batch(self):
+        """Test a batch request with numbers and descriptions."""
+        for value in ['', [], {'numbers': '4011'}, {'numbers': [4011]},
+                      {'descriptions': 'napa'}, {'descriptions': [None]},
+                      {'numbers': None}]:
+            if isinstance(value, str):
+                response = self.app.post(BATCH_URL, value, status=400)
+            else:
+                response = self.app.post_json(BATCH_URL, value, status=400)
+            self.assertEqual(response.status_int, 400)
+        response = self.app.post_json(
+            BATCH_URL, {'numbers': ['4011'] * (main._BATCH_LIMIT + 1)},
+            status=413)
+        self.assertEqual(response.status_int, 413)
+
+        response = self.app.post_json(BATCH_URL, {})
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertEqual(response.charset, 'utf-8')
+        self.assertEqual(response.json, {'numbers': [], 'descriptions': []})
+
+        numbers = list(plucode._PLU_MAP) + ['9' + code
+                                            for code in plucode._PLU_MAP]
+        for i in range(0, len(numbers), main._BATCH_LIMIT):
+            values = numbers[i:i + main._BATCH_LIMIT]
+            response = self.app.post_json(BATCH_URL, {'numbers': values})
+            self.assertEqual(response.json['numbers'], [
+                plucode.get_description(value) for value in values])
+        descriptions = list(plucode._PLU_MAP.values())
+        for i in range(0, len(descriptions), main._BATCH_LIMIT):
+            values = descriptions[i:i + main._BATCH_LIMIT]
+            response = self.app.post_json(BATCH_URL, {'descriptions': values})
+            self.assertEqual(response.json['descriptions'], [
+                main._find_codes(plucode.get_catalog(), value.split())
+                for value in values])
+
+        response = self.app.post_json(BATCH_URL, {
+            'numbers': ['4011', 'foobar', '94552', '4011'],
+            'descriptions': ['Organic NAPA', 'foo bar', ' napa ', 'tomatos',
+                             'aples', 'pear', 'napa organic']
+        })
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.json['numbers'], [
+            plucode.get_description('4011'), '',
+            plucode.get_description('94552'), plucode.get_description('4011')])
+        catalog = plucode.get_catalog()
+        self.assertEqual(response.json['descriptions'][:3],
+                         [['94552'], [], ['4552']])
+        for value, codes in zip(['tomatos', 'aples', 'pear'],
+                                response.json['descriptions'][3:6]):
+            self.assertGreater(len(codes), 0)
+            self.assertEqual(codes, main._find_codes(catalog, [value]))
+            response_json = self.app.get(SEARCH_URL, {'q': value}).json
+            self.assertEqual(codes, response_json['codes'])
+        self.assertEqual(response.json['descriptions'][6], ['94552'])
+
+    def test_reload(self):
+        """Test reloading the catalog file."""
+        response = self.app.post(RELOAD_URL, status=404)
+        self.assertEqual(response.status_int, 404)
+
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'plu.bin')
+                main._WATCHER = plucode.CatalogWatcher(path, 3600)
+                response = self.app.post(RELOAD_URL, status=500)
+                self.assertEqual(response.status_int, 500)
+
+                plu_map = dict(plucode._PLU_MAP)
+                plu_map['3999'] = 'test napa'
+                del plu_map['4011']
+                plu_map['4552'] = 'napa cabbage'
+                plucode.write_catalog(plu_map, path)
+                response = self.app.post(RELOAD_URL)
+                self.assertEqual(response.status_int, 200)
+                self.assertEqual(response.content_type, 'application/json')
+                self.assertEqual(response.json,
+                                 {'added': 1, 'changed': 1, 'removed': 1})
+
+                response = self.app.post_json(TEST_URL, {'queryResult': {
+                    'parameters': {'description': 'napa'}}})
+                self.assertResponse(response, '3999, 4552')
+                response = self.app.post_json(TEST_URL, {'queryResult': {
+                    'parameters': {'number': '4011'}}})
+                self.assertResponse(response, main._NOT_FOUND)
+                response = self.app.post_json(BATCH_URL, {
+                    'numbers': ['4552', '3999']})
+                self.assertEqual(response.json['numbers'],
+                                 ['napa cabbage', 'test napa'])
+
+                plucode.write_catalog({}, path)
+                response = self.app.post(RELOAD_URL, status=500)
+                self.assertEqual(response.status_int, 500)
+                with open(path, 'wb') as f:
+                    f.write(b'foobar')
+                response = self.app.post(RELOAD_URL, status=500)
+                self.assertEqual(response.status_int, 500)
+                response = self.app.post_json(TEST_URL, {'queryResult': {
+                    'parameters': {'number': '3999'}}})
+                self.assertResponse(response, 'test napa')
+        finally:
+            main._WATCHER = None
+            plucode.update_catalog(plucode._PLU_MAP.items())
+
+    def test_reload_compact(self):
+        """Test serving a memory-mapped catalog file."""
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'plu.bin')
+                main._WATCHER = plucode.CatalogWatcher(path, 3600, True)
+                plu_map = dict(plucode._PLU_MAP)
+                plu_map['3999'] = 'test napa'
+                plucode.write_catalog(plu_map, path)
+                response = self.app.post(RELOAD_URL)
+                self.assertEqual(response.json,
+                                 {'added': 1, 'changed': 0, 'removed': 0})
+                catalog = plucode.get_catalog()
+                self.assertIsInstance(catalog, plucode.CompactCatalog)
+
+                response = self.app.post_json(TEST_URL, {'queryResult': {
+                    'parameters': {'description': 'napa'}}})
+                self.assertResponse(response, '3999, 4552')
+                response = self.app.post_json(TEST_URL, {'queryResult': {
+                    'parameters': {'description': 'napas'}}})
+                self.assertResponse(response, '3999, 4552')
+                response = self.app.post_json(TEST_URL, {'queryResult': {
+                    'parameters': {'number': '93999'}}})
+                self.assertResponse(response,
+                                    'organic test napa. Over 9000!')
+                response = self.app.post_json(BATCH_URL, {
+                    'numbers': ['3999'], 'descriptions': ['aples']})
+                self.assertEqual(response.json['numbers'], ['test napa'])
+                self.assertEqual(response.json['descriptions'],
+                                 [main._find_codes(catalog, ['aples'])])
+                response = self.app.get(SEARCH_URL, {'q': 'napa'})
+                self.assertEqual(response.json['codes'], ['3999', '4552'])
+                self.assertCached(response)
+                response = self.app.get(COMPLETE_URL, {'q': '399'})
+                self.assertEqual(response.json, {'suggestions': ['3999']})
+                self.assertIs(plucode.get_catalog(), catalog)
+        finally:
+            main._WATCHER = None
+            plucode.update_catalog(plucode._PLU_MAP.items())
+
+    def test_complete(self):
+        """Test suggesting completions of a partial query."""
+        response = self.app.get(COMPLETE_URL, status=400)
+        self.assertEqual(response.status_int, 400)
+        for value, expected in [
+                ('', []), (' ', []), ('appl ', []), ('qqq', []),
+                ('appl', ['apple', 'apples']),
+                ('Red APPL', ['red apple', 'red apples']),
+                ('401', plucode.complete('401', main._COMPLETE_LIMIT))]:
+            response = self.app.get(COMPLETE_URL, {'q': value})
+            self.assertEqual(response.status_int, 200)
+            self.assertEqual(response.content_type, 'application/json')
+            self.assertEqual(response.charset, 'utf-8')
+            self.assertEqual(response.json, {'suggestions': expected})
+        response = self.app.get(COMPLETE_URL, {'q': 'c'})
+        self.assertEqual(len(response.json['suggestions']),
+                         main._COMPLETE_LIMIT)
+
+    def assertCached(self, response, scope='private'):
+        """Test response carries the catalog version for caching."""
+        self.assertEqual(response.headers['ETag'],
+                         '"{0}"'.format(plucode.get_catalog().version()))
+        self.assertEqual(response.headers['Cache-Control'],
+                         '{0}, max-age={1}'.format(scope, main._CACHE_MAX_AGE))
+        self.assertEqual(response.headers['Vary'], 'Authorization, X-API-Key')
+
+    def test_code(self):
+        """Test looking up the description of a PLU code."""
+        for value in ['0000', '123', 'foo', '5000']:
+            response = self.app.get(CODE_URL.format(value), status=404)
+            self.assertEqual(response.status_int, 404)
+        for value in ['4011', '94011', '04552']:
+            response = self.app.get(CODE_URL.format(value))
+            self.assertEqual(response.status_int, 200)
+            self.assertEqual(response.content_type, 'application/json')
+            self.assertEqual(response.charset, 'utf-8')
+            self.assertNotIn(b' ', response.body.replace(
+                plucode.get_description(value).encode('utf-8'), b''))
+            self.assertEqual(response.json, {
+                'code': value, 'description': plucode.get_description(value)})
+            self.assertCached(response)
+
+            for etag in [response.headers['ETag'], '*',
+                         '"foo", ' + response.headers['ETag']]:
+                cached = self.app.get(CODE_URL.format(value),
+                                      headers={'If-None-Match': etag},
+                                      status=304)
+                self.assertEqual(cached.status_int, 304)
+                self.assertEqual(cached.body, b'')
+                self.assertCached(cached)
+            for etag in ['"foo"', 'W/' + response.headers['ETag']]:
+                response = self.app.get(CODE_URL.format(value),
+                                        headers={'If-None-Match': etag})
+                self.assertEqual(response.status_int, 200)
+
+        # The current version is answered before looking the code up
+        etag = response.headers['ETag']
+        response = self.app.get(CODE_URL.format('5000'),
+                                headers={'If-None-Match': etag}, status=304)
+        self.assertEqual(response.status_int, 304)
+        response = self.app.get(CODE_URL.format('5000'),
+                                headers={'If-None-Match': '*'}, status=404)
+        self.assertEqual(response.status_int, 404)
+
+        username = main._USERNAME
+        try:
+            main._USERNAME = None
+            response = self.app.get(CODE_URL.format('4011'))
+            self.assertCached(response, 'public')
+        finally:
+            main._USERNAME = username
+
+    def test_search(self):
+        """Test finding the PLU codes matching a description."""
+        response = self.app.get(SEARCH_URL, status=400)
+        self.assertEqual(response.status_int, 400)
+        for value in ['', 'foobar', 'pear', 'Bosc Pair', 'cantalope', 'apple']:
+            response = self.app.get(SEARCH_URL, {'q': value})
+            self.assertEqual(response.status_int, 200)
+            self.assertEqual(response.content_type, 'application/json')
+            self.assertEqual(response.json, {'codes': main._find_codes(
+                plucode.get_catalog(), value.lower().split())})
+            self.assertCached(response)
+            cached = self.app.get(
+                SEARCH_URL, {'q': value},
+                headers={'If-None-Match': response.headers['ETag']},
+                status=304)
+            self.assertEqual(cached.status_int, 304)
+        self.assertEqual(self.app.get(SEARCH_URL, {'q': 'foobar'}).json,
+                         {'codes': []})
+
+        etag = response.headers['ETag']
+        try:
+            plucode.update_catalog([('4011', 'bananas')])
+            response = self.app.get(SEARCH_URL, {'q': 'bananas'},
+                                    headers={'If-None-Match': etag})
+            self.assertEqual(response.status_int, 200)
+            self.assertEqual(response.json, {'codes': ['4011']})
+            self.assertNotEqual(response.headers['ETag'], etag)
+        finally:
+            plucode.update_catalog(plucode._PLU_MAP.items())
+        response = self.app.get(SEARCH_URL, {'q': 'bananas'},
+                                headers={'If-None-Match': etag}, status=304)
+        self.assertEqual(response.status_int, 304)
+
+    def get_metrics(self):
+        """Return the exposed metrics as a dictionary of sample values."""
+        response = self.app.get(METRICS_URL)
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.content_type, 'text/plain')
+        self.assertEqual(response.charset, 'utf-8')
+        samples = {}
+        for line in response.text.splitlines():
+            if line.startswith('#'):
+                self.assertRegex(line, r'^# (HELP|TYPE) plucode_\w+ .+$')
+                continue
+            match = re.match(r'^(plucode_\w+(?:\{[^}]*\})?) (\S+)$', line)
+            self.assertIsNotNone(match, line)
+            samples[match.group(1)] = float(match.group(2))
+        return samples
+
+    def test_metrics(self):
+        """Test exposing webhook latencies and outcomes."""
+        before = self.get_metrics()
+        for parameters in [{'number': '4011'}, {'number': '1234'},
+                           {'description': 'hass avocados'},
+                           {'description': 'foobar'},
+                           {'description': 'apples'}, {'foo': 'bar'}]:
+            self.app.post_json(TEST_URL,
+                               {'queryResult': {'parameters': parameters}})
+        self.app.post(TEST_URL, '')
+        after = self.get_metrics()
+
+        for outcome, count in [('found', 2), ('not_found', 2),
+                               ('too_many', 1), ('ranked', 0),
+                               ('fallback', 2)]:
+            name = 'plucode_webhook_requests_total{{outcome="{0}"}}'.format(
+                outcome)
+            self.assertEqual(after[name] - before[name], count)
+        for stage in main._STAGES:
+            name = 'plucode_webhook_stage_seconds_{0}{{stage="{1}"}}'
+            self.assertEqual(after[name.format('count', stage)] -
+                             before[name.format('count', stage)], 7)
+            self.assertGreater(after[name.format('sum', stage)],
+                               before[name.format('sum', stage)])
+            buckets = [after['plucode_webhook_stage_seconds_bucket'
+                             '{{stage="{0}",le="{1}"}}'.format(stage, bound)]
+                       for bound in [repr(b) for b in main._LATENCY_BUCKETS] +
+                       ['+Inf']]
+            self.assertEqual(buckets, sorted(buckets))
+            self.assertEqual(buckets[-1], after[name.format('count', stage)])
+        self.assertGreaterEqual(after['plucode_code_cache_size'], 0)
+
+    def test_thread_metrics(self):
+        """Test aggregating the metrics recorded by many threads."""
+        metrics = main._ThreadMetrics()
+        metrics.record('found', [0.0, 0.0001, 0.00011, 1.0, 2.0])
+        self.assertEqual([buckets.index(1) for buckets in metrics.buckets],
+                         [0, 0, 1, len(main._LATENCY_BUCKETS) - 1,
+                          len(main._LATENCY_BUCKETS)])
+        self.assertEqual(metrics.sums, [0.0, 0.0001, 0.00011, 1.0, 2.0])
+        self.assertEqual(metrics.outcomes['found'], 1)
+
+        name = 'plucode_webhook_requests_total{outcome="fallback"}'
+        before = self.get_metrics()[name]
+        app = webtest.TestApp(main.app)
+        app.authorization = self.app.authorization
+
+        def post():
+            for _ in range(10):
+                app.post(TEST_URL, '')
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.get_metrics()[name] - before, 40)
+
 if __name__ == '__main__':
     suite = unittest.defaultTestLoader.loadTestsFromTestCase(FunctionTest)
     unittest.TextTestRunner(verbosity=2).run(suite)